@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_html_edit.py - html_edit.py 性能基准测试
+
+生成 10KB ~ 50MB 的合成页面（可控制DOM深度、元素数量、内联脚本和图片数量），
+连同真实的 poco index.html 一起，对每种解析器和注入方式分别测量：
+读取、解析、注入、序列化、写入各阶段耗时（流式注入不区分解析器，
+只测量 stream 和 write 两个阶段），以及峰值RSS和tracemalloc峰值。
+
+每个用例在独立子进程中运行，保证峰值内存互不影响。
+结果写入JSON文件，并与保存的基线比较，超出阈值的用例视为性能回退。
+
+用法:
+    python bench_html_edit.py [--sizes 10k,100k,1m,10m,50m] [--parsers html.parser,lxml]
+                              [--modes tree,stream] [--depth 8] [--scripts 20] [--images 200]
+                              [--repeat 3] [--output bench-results.json]
+                              [--baseline bench-baseline.json] [--save-baseline] [--threshold 0.2]
+
+存在回退时退出码为 1。仓库中的 bench-baseline.json 是在 meta 记录的机器上生成的基线，
+换一台机器比较前先用 --save-baseline 重新生成。
+
+一次性的开销（导入bs4和解析器、准备编辑器载荷）在计时前完成，不计入各阶段耗时，
+这部分开销由下面的启动预算检查负责。
+
+启动预算检查:
+    python bench_html_edit.py --startup [--startup-budget 50]
+
+用 python -X importtime 统计导入 html_edit 的累计耗时，并确认bs4等重依赖没有被提前导入，
+同时测量 html_edit.py --help 的整体耗时。超出预算时退出码为 1
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REAL_PAGE = os.path.join(SCRIPT_DIR, 'index.html')
+DEFAULT_BASELINE = os.path.join(SCRIPT_DIR, 'bench-baseline.json')
+
+DEFAULT_SIZES = '10k,100k,1m,10m,50m'
+DEFAULT_PARSERS = 'html.parser,lxml,html5lib'
+PHASES = ('read', 'parse', 'inject', 'serialize', 'write')
+# 不使用解析器的注入方式，每个页面只运行一次
+PARSERLESS_MODES = ('stream',)
+
+# 耗时差值小于它（秒）的不算回退：毫秒级用例的相对波动很大
+TIME_NOISE = 0.005
+
+# 导入 html_edit 时不应该加载的模块
+DEFERRED_MODULES = ('bs4', 'html_edit_payload', 'tempfile')
+
+# 合成页面使用的文本片段
+WORDS = ('poco', 'global', 'smartphone', 'camera', 'battery', 'display', 'charging',
+         'performance', 'design', 'price', 'offer', 'review', 'series', 'ultra', 'pro')
+
+
+# 解析 10k / 1m 这样的大小写法
+def parse_size(text):
+    text = text.strip().lower()
+    units = {'k': 1024, 'm': 1024 * 1024, 'g': 1024 * 1024 * 1024}
+    if text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+# 格式化大小，用作用例名称
+def size_label(n):
+    if n >= 1024 * 1024:
+        return f"{n / 1024 / 1024:g}m"
+    return f"{n / 1024:g}k"
+
+
+# 生成合成页面
+def generate_page(target_bytes, depth=8, fanout=4, scripts=20, images=200, seed=0):
+    rng = random.Random(seed)
+    parts = ['<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n',
+             '<title>Synthetic benchmark page</title>\n',
+             '<link rel="stylesheet" href="css/main.css">\n</head>\n<body>\n']
+    state = {'size': sum(len(p) for p in parts), 'scripts': 0, 'images': 0, 'blocks': 0}
+
+    def text(n):
+        return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+    def emit(fragment):
+        parts.append(fragment)
+        state['size'] += len(fragment)
+
+    # 生成一个嵌套区块，超出目标大小后不再继续展开子区块
+    def block(level):
+        state['blocks'] += 1
+        emit(f'<div class="section level-{level}" id="b{state["blocks"]}">')
+        emit(f'<h3>{text(4)}</h3><p>{text(30)} <span>{text(5)}</span> <a href="#">{text(2)}</a></p>')
+        if state['images'] < images:
+            state['images'] += 1
+            emit(f'<img src="images/img-{state["images"]}.jpg" alt="{text(2)}">')
+        if level < depth:
+            for _ in range(rng.randint(1, fanout)):
+                if state['size'] >= target_bytes:
+                    break
+                block(level + 1)
+        else:
+            emit(f'<ul>{"".join(f"<li>{text(6)}</li>" for _ in range(3))}</ul>')
+        emit('</div>')
+
+    # 内联脚本和图片均匀分布在页面中
+    while state['size'] < target_bytes:
+        block(1)
+        if state['scripts'] < scripts:
+            state['scripts'] += 1
+            emit(f'<script>window.__bench{state["scripts"]} = {{ items: {list(range(20))}, label: "{text(3)}" }};</script>')
+        emit('\n')
+
+    emit('</body>\n</html>\n')
+    return ''.join(parts)
+
+
+# 当前进程的峰值RSS（KB）
+# Linux上读 /proc/self/status 中的 VmHWM，它在 exec 时清零；ru_maxrss 会跨 fork/exec 带上父进程的峰值
+# （父进程生成过大页面后，每个小用例都会报告父进程的峰值），只在没有 /proc 的平台上使用
+def peak_rss_kb():
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    rss_kb = peak_rss_kb()
+    return rss_kb
+
+
+# 在子进程中执行单个用例
+def run_case(case):
+    import tracemalloc
+    sys.path.insert(0, SCRIPT_DIR)
+    import html_edit
+
+    input_path = case['input']
+    output_path = case['output']
+    parser = case['parser']
+
+    # 流式注入不解析文档：阶段为 stream（读取+注入+写出）和 write（落盘）
+    def stream_pipeline(timings):
+        t0 = time.perf_counter()
+        with open(input_path, 'rb') as infile, html_edit.AtomicFileWriter(output_path) as writer:
+            html_edit.run_stream(infile, writer, input_path=input_path)
+            t1 = time.perf_counter()
+            writer.commit()
+        t2 = time.perf_counter()
+        if timings is not None:
+            for name, value in zip(('stream', 'write'), (t1 - t0, t2 - t1)):
+                timings.setdefault(name, []).append(value)
+
+    def tree_pipeline(timings):
+        t0 = time.perf_counter()
+        content = html_edit.read_bytes(input_path)
+        t1 = time.perf_counter()
+        soup, charset = html_edit.parse_document(content, parser)
+        del content
+        t2 = time.perf_counter()
+        html_edit.inject_editor(soup, charset=charset)
+        t3 = time.perf_counter()
+        with html_edit.AtomicFileWriter(output_path) as writer:
+            html_edit.stream_html(soup, writer, charset=charset)
+            t4 = time.perf_counter()
+            writer.commit()
+        t5 = time.perf_counter()
+        if timings is not None:
+            for name, value in zip(PHASES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+                timings.setdefault(name, []).append(value)
+
+    pipeline = stream_pipeline if case['mode'] == 'stream' else tree_pipeline
+
+    # 计时前导入bs4和解析器、准备编辑器载荷，否则 --repeat 1 时第一次的解析阶段会包含这些一次性开销
+    if case['mode'] in PARSERLESS_MODES:
+        html_edit.stream_payload()
+    else:
+        html_edit.beautiful_soup('', parser)
+        html_edit.parse_fragments()
+
+    # 计时（取多次运行中的最小值）
+    timings = {}
+    for _ in range(case['repeat']):
+        pipeline(timings)
+    rss_kb = peak_rss_kb()
+
+    # 单独运行一次测量Python分配峰值（tracemalloc会拖慢计时）
+    tracemalloc.start()
+    pipeline(None)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    phases = {name: min(values) for name, values in timings.items()}
+    return {
+        'phases': phases,
+        'total': sum(phases.values()),
+        'peak_rss_kb': rss_kb,
+        'tracemalloc_peak': traced_peak,
+        'output_bytes': os.path.getsize(output_path),
+    }
+
+
+# 解析 -X importtime 的输出，返回 {模块名: 累计微秒}
+def parse_importtime(stderr):
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports[name.strip()] = int(cumulative)
+    return imports
+
+
+# 检查启动耗时是否在预算内，返回 (是否通过, 结果)
+def check_startup(budget_ms, repeat=5):
+    script = os.path.join(SCRIPT_DIR, 'html_edit.py')
+    env = dict(os.environ, PYTHONPATH=SCRIPT_DIR)
+
+    # 导入耗时取多次运行中的最小值
+    import_ms = None
+    imported = {}
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import html_edit'],
+                              capture_output=True, text=True, env=env)
+        imported = parse_importtime(proc.stderr)
+        value = imported.get('html_edit', 0) / 1000
+        import_ms = value if import_ms is None else min(import_ms, value)
+    eager = [m for m in DEFERRED_MODULES if m in imported]
+
+    # --help 的整体耗时（包含解释器启动）
+    help_ms = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, script, '--help'], capture_output=True)
+        value = (time.perf_counter() - t0) * 1000
+        help_ms = value if help_ms is None else min(help_ms, value)
+
+    result = {'import_ms': import_ms, 'help_ms': help_ms, 'budget_ms': budget_ms, 'eager_imports': eager}
+    return import_ms <= budget_ms and not eager, result
+
+
+# 检查解析器是否可用
+def parser_available(parser):
+    if parser == 'html.parser':
+        return True
+    module = {'lxml': 'lxml', 'html5lib': 'html5lib'}.get(parser, parser)
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+# 用例唯一标识，用于和基线对比
+def case_key(result):
+    return f"{result['case']}|{result['parser']}|{result['mode']}"
+
+
+# 与基线比较，返回回退列表
+def compare_with_baseline(results, baseline, threshold):
+    base_map = {case_key(r): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        base = base_map.get(case_key(result))
+        if not base:
+            continue
+        for metric in ('total', 'peak_rss_kb', 'tracemalloc_peak'):
+            old, new = base.get(metric), result.get(metric)
+            if metric == 'total' and old and new and new - old < TIME_NOISE:
+                continue
+            if old and new and new > old * (1 + threshold):
+                regressions.append({
+                    'case': case_key(result),
+                    'metric': metric,
+                    'baseline': old,
+                    'current': new,
+                    'ratio': new / old,
+                })
+    return regressions
+
+
+# 构建命令行参数解析器
+def build_parser():
+    parser = argparse.ArgumentParser(description='html_edit.py 性能基准测试')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='合成页面大小列表，如 10k,1m,50m')
+    parser.add_argument('--parsers', default=DEFAULT_PARSERS, help='要测试的BeautifulSoup解析器')
+    parser.add_argument('--modes', default=None, help='要测试的注入方式（默认全部）')
+    parser.add_argument('--depth', type=int, default=8, help='合成页面的DOM嵌套深度')
+    parser.add_argument('--fanout', type=int, default=4, help='每层最多子区块数')
+    parser.add_argument('--scripts', type=int, default=20, help='内联脚本数量')
+    parser.add_argument('--images', type=int, default=200, help='图片数量')
+    parser.add_argument('--no-real', action='store_true', help='不测试真实的 poco index.html')
+    parser.add_argument('--repeat', type=int, default=3, help='每个用例的计时次数')
+    parser.add_argument('--output', default='bench-results.json', help='结果JSON文件')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线JSON文件')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--threshold', type=float, default=0.2, help='判定回退的相对阈值')
+    parser.add_argument('--startup', action='store_true', help='只检查启动耗时是否在预算内')
+    parser.add_argument('--startup-budget', type=float, default=50, help='导入 html_edit 的耗时预算（毫秒）')
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    return parser
+
+
+# 主函数
+def main():
+    args = build_parser().parse_args()
+
+    # 子进程模式：执行单个用例并输出JSON
+    if args.case:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return
+
+    if args.startup:
+        ok, result = check_startup(args.startup_budget, args.repeat)
+        print(f"导入 html_edit: {result['import_ms']:.1f}ms（预算 {result['budget_ms']:g}ms）")
+        print(f"html_edit.py --help: {result['help_ms']:.1f}ms")
+        if result['eager_imports']:
+            print(f"导入时提前加载了: {', '.join(result['eager_imports'])}")
+        if not ok:
+            print("启动耗时超出预算")
+            sys.exit(1)
+        print("启动耗时在预算内")
+        return
+
+    sys.path.insert(0, SCRIPT_DIR)
+    import html_edit
+
+    modes = args.modes.split(',') if args.modes else list(html_edit.INJECT_MODES)
+    parsers = [p for p in args.parsers.split(',') if p]
+    for p in parsers:
+        if not parser_available(p):
+            print(f"跳过不可用的解析器: {p}", file=sys.stderr)
+    parsers = [p for p in parsers if parser_available(p)]
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='bench-html-edit-') as tmp:
+        # 准备输入页面
+        pages = []
+        if not args.no_real and os.path.exists(REAL_PAGE):
+            pages.append(('poco-index', REAL_PAGE))
+        for size in (parse_size(s) for s in args.sizes.split(',') if s):
+            path = os.path.join(tmp, f"synthetic-{size_label(size)}.html")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(generate_page(size, args.depth, args.fanout, args.scripts, args.images))
+            pages.append((f"synthetic-{size_label(size)}", path))
+
+        combos = [(parser, mode) for mode in modes for parser in parsers if mode not in PARSERLESS_MODES]
+        combos += [('-', mode) for mode in modes if mode in PARSERLESS_MODES]
+        for name, path in pages:
+            for parser, mode in combos:
+                case = {
+                    'input': path,
+                    'output': os.path.join(tmp, 'out.html'),
+                    'parser': parser,
+                    'mode': mode,
+                    'repeat': args.repeat,
+                }
+                proc = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--case', json.dumps(case)],
+                    capture_output=True, text=True,
+                )
+                if proc.returncode != 0:
+                    print(f"用例失败: {name} {parser} {mode}\n{proc.stderr}", file=sys.stderr)
+                    continue
+                result = json.loads(proc.stdout)
+                result.update({'case': name, 'input_bytes': os.path.getsize(path), 'parser': parser, 'mode': mode})
+                results.append(result)
+                phases = ' '.join(f"{k}={v * 1000:.1f}ms" for k, v in result['phases'].items())
+                print(f"{name:<20} {parser:<12} {mode:<8} total={result['total'] * 1000:.1f}ms "
+                      f"rss={result['peak_rss_kb'] / 1024:.1f}MB traced={result['tracemalloc_peak'] / 1024 / 1024:.1f}MB  {phases}")
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'bs4': __import__('bs4').__version__,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"结果已写入: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"基线已保存: {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_with_baseline(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n发现 {len(regressions)} 项性能回退:")
+            for r in regressions:
+                print(f"  {r['case']} {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} (x{r['ratio']:.2f})")
+            sys.exit(1)
+        print("与基线相比没有性能回退")
+
+
+# 运行主函数
+if __name__ == "__main__":
+    main()
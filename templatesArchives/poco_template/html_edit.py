@@ -11,3563 +11,311 @@ html_edit.py - HTML页面编辑工具
 4. 图片编辑：上传新图片替换现有图片
 
 用法:
-    python html_edit.py <input_html_file> [<output_html_file>]
+    python html_edit.py <input_html_file> [<output_html_file>] [--mode tree|stream]
+                        [--features text,image,region,inspect]
+                        [--profile] [--cprofile DIR] [--report json]
 
 如果没有指定输出文件，则会在输入文件名基础上添加"-editable"后缀
+
+页面编码:
+    按字节序标记、<meta charset> 或 http-equiv 声明识别页面编码（默认UTF-8），
+    输出保持原来的编码；编辑器载荷中该编码无法表示的字符按CSS/HTML/JavaScript各自的转义写入
+
+在其他Python程序中使用:
+    from html_edit import instrument, Instrumenter
+    output = instrument(html_bytes)                  # 返回注入后的bytes
+    output = instrument(html_text)                   # str 视为已经解码的页面，按UTF-8输出
+    output = instrument(html_bytes, features='text') # 只注入文本编辑
+    instrumenter = Instrumenter(mode='stream')       # 批量处理时复用同一个注入器
+    instrumenter.instrument_file('index.html', 'index-editable.html')
+
+管道模式:
+    输入或输出文件写作 "-" 表示标准输入/标准输出，例如:
+        exporter | python html_edit.py - - | gzip > page.html.gz
+    输入为 "-" 且未指定输出时，结果写到标准输出。
+
+选择功能:
+    --features 只注入所列功能的模块（样式、元素和脚本），例如只做文案修改时用 --features text，
+    可选 inspect、region、text、image，默认全部注入。每种组合的载荷只组装和编码一次
+
+注入方式:
+    tree    用BeautifulSoup解析整个文档后注入（输入输出均为文件时的默认方式）
+    stream  不解析文档，逐块扫描字节流，在</head>和</body>前插入编辑器，
+            其余内容原样透传（使用管道时的默认方式）
+
+重复注入:
+    载荷的样式和脚本标签带有 data-editor-version 版本标记。对已经注入过编辑器的页面再次运行时，
+    按ID识别已有的编辑器块并在原位置替换为当前版本，重复的块会被删除；版本相同时不做改动。
+
+页面标识:
+    启动脚本标签上的 data-editor-page 记录页面标识：输入文件绝对路径的摘要加上页面内容（</body>之前的部分）的摘要，
+    如 "3f0c2a9d41b7-8e51d0c6a2f4"；没有输入路径（标准输入）时只有内容摘要。内容摘要在流式注入时边读边计算，
+    不缓存输入，两种注入方式对同一页面得到相同的标识。
+    编辑器按页面标识分开保存各页面的修改，同一地址上先后打开的不同模板不会互相读到对方的修改。
+    重复注入时沿用页面中已有的标识。
+
+按需加载:
+    页面加载时只执行很小的启动脚本，它只添加编辑器按钮。各模式的实现作为带内容指纹的脚本块
+    <script type="text/x-editor-chunk" id="editor-chunk-模式名" data-editor-chunk="指纹">
+    注入在启动脚本之后，浏览器不解析这些块，模式第一次启用（或有保存的修改需要恢复）时才执行。
+
+性能分析:
+    --profile       输出每个阶段（读取、解析、三个片段解析、注入、序列化、写入）的耗时和内存分配
+    --cprofile DIR  把解析和序列化阶段的cProfile数据写入DIR/parse.prof、DIR/serialize.prof
+    --report json   以JSON格式输出本次运行的统计数据，便于流水线按模板长期跟踪
 """
 
+import io
 import os
+import copy
 import sys
 import re
-from bs4 import BeautifulSoup
-
-# 编辑工具的CSS样式
-EDITOR_STYLES = """
-<style id="editor-styles">
-/* 编辑器按钮样式 */
-.editor-button {
-  position: fixed;
-  bottom: 20px;
-  z-index: 10000;
-  padding: 10px 15px;
-  background-color: #4285f4;
-  color: #fff;
-  border: none;
-  border-radius: 4px;
-  cursor: pointer;
-  box-shadow: 0 2px 5px rgba(0,0,0,0.3);
-  font-size: 14px;
-  font-weight: bold;
-  transition: background-color 0.2s;
-}
-
-/* 元素高亮样式 */
-.element-highlight {
-  position: absolute;
-  z-index: 9999;
-  pointer-events: none;
-  border: 2px solid #ea4335;
-  background-color: rgba(234, 67, 53, 0.1);
-  box-sizing: border-box;
-}
-
-/* 元素检查器样式 */
-#elementInspector {
-  position: fixed;
-  display: none;
-  z-index: 10000;
-  padding: 10px 15px;
-  background-color: #fff;
-  border: 1px solid #ddd;
-  border-radius: 4px;
-  box-shadow: 0 2px 10px rgba(0,0,0,0.2);
-  font-size: 12px;
-  max-width: 300px;
-  word-break: break-all;
-}
-
-/* 编辑按钮容器 */
-#divEditorButtons {
-  position: absolute;
-  display: none;
-  z-index: 10000;
-  gap: 5px;
-}
-
-/* 编辑按钮样式 */
-#editDuplicateBtn {
-  padding: 0 !important;
-  background-color: #34a853 !important;
-  color: white !important;
-  font-weight: bold !important;
-  display: flex !important;
-  align-items: center !important;
-  justify-content: center !important;
-  width: 36px !important;
-  height: 36px !important;
-  text-align: center !important;
-  font-size: 20px !important;
-  border-radius: 4px !important;
-  margin: 0 4px !important;
-  border: none !important;
-}
-
-#editRemoveBtn {
-  padding: 0 !important;
-  background-color: #ea4335 !important;
-  color: white !important;
-  font-weight: bold !important;
-  display: flex !important;
-  align-items: center !important;
-  justify-content: center !important;
-  width: 36px !important;
-  height: 36px !important;
-  text-align: center !important;
-  font-size: 20px !important;
-  border-radius: 4px !important;
-  margin: 0 4px !important;
-  border: none !important;
-}
-
-/* 选中的div元素样式 */
-.div-selected {
-  outline: 2px dashed #4285f4 !important;
-  outline-offset: 1px !important;
-  position: relative;
-}
-
-/* 文本和图片编辑样式 - 完全不影响布局的版本 */
-.text-editable:after {
-  content: "";
-  position: absolute;
-  top: 0;
-  left: 0;
-  right: 0;
-  bottom: 0;
-  outline: 1px dashed #34a853;
-  pointer-events: none;
-  z-index: 9998;
-}
-
-.text-editable:hover:after {
-  background-color: rgba(52, 168, 83, 0.1);
-}
-
-.text-editable:focus:after {
-  outline: 1px solid #34a853;
-  background-color: rgba(52, 168, 83, 0.05);
-}
-
-.text-editable {
-  cursor: text !important;
-}
-
-.image-editable:after {
-  content: "";
-  position: absolute;
-  top: 0;
-  left: 0;
-  right: 0;
-  bottom: 0;
-  outline: 2px dashed #fbbc05;
-  pointer-events: none;
-  z-index: 9998;
-}
-
-.image-editable:hover:after {
-  background-color: rgba(251, 188, 5, 0.1);
-}
-
-.image-editable {
-  cursor: pointer !important;
-}
-
-/* 带有背景图的可编辑元素样式 */
-.bg-image-editable:after {
-  content: "";
-  position: absolute;
-  top: 0;
-  left: 0;
-  right: 0;
-  bottom: 0;
-  outline: 2px dashed #fbbc05;
-  pointer-events: none;
-  z-index: 9998;
-}
-
-.bg-image-editable:hover:after {
-  background-color: rgba(251, 188, 5, 0.1);
-}
-
-.bg-image-editable:before {
-  content: "🖼️";
-  position: absolute;
-  top: 5px;
-  right: 5px;
-  background-color: rgba(251, 188, 5, 0.8);
-  color: #333;
-  padding: 2px 5px;
-  border-radius: 3px;
-  font-size: 12px;
-  z-index: 9999;
-  pointer-events: none;
-}
-
-.bg-image-editable {
-  cursor: pointer !important;
-}
-
-/* 轮播图容器样式 */
-.carousel-container-editable:after {
-  content: "";
-  position: absolute;
-  top: 0;
-  left: 0;
-  right: 0;
-  bottom: 0;
-  outline: 2px dashed #4285f4;
-  pointer-events: none;
-  z-index: 9998;
-}
-
-.carousel-container-editable:hover:after {
-  background-color: rgba(66, 133, 244, 0.1);
-}
-
-.carousel-container-editable:before {
-  content: "🎞️";
-  position: absolute;
-  top: 5px;
-  right: 5px;
-  background-color: rgba(66, 133, 244, 0.8);
-  color: white;
-  padding: 2px 5px;
-  border-radius: 3px;
-  font-size: 12px;
-  z-index: 9999;
-  pointer-events: none;
-}
-
-.carousel-container-editable {
-  cursor: pointer !important;
-}
-
-/* 图片上传模态框样式 */
-#imageUploadModal {
-  position: fixed;
-  top: 0;
-  left: 0;
-  width: 100%;
-  height: 100%;
-  background-color: rgba(0,0,0,0.7);
-  display: none;
-  align-items: center;
-  justify-content: center;
-  z-index: 10001;
-}
-
-.modal-content {
-  background-color: #fff;
-  padding: 20px;
-  border-radius: 8px;
-  width: 80%;
-  max-width: 500px;
-  max-height: 80vh;
-  overflow-y: auto;
-}
-
-.modal-title {
-  margin-top: 0;
-  color: #333;
-}
-
-.modal-buttons {
-  display: flex;
-  justify-content: flex-end;
-  margin-top: 20px;
-  gap: 10px;
-}
-
-.modal-button {
-  padding: 8px 16px;
-  border: none;
-  border-radius: 4px;
-  cursor: pointer;
-}
-
-#cancelImageUpload {
-  background-color: #f2f2f2;
-  color: #333;
-}
-
-#applyImageUpload {
-  background-color: #4285f4;
-  color: #fff;
-}
-
-#imagePreview {
-  margin-top: 15px;
-  text-align: center;
-}
-
-#imagePreview img {
-  max-width: 100%;
-  max-height: 300px;
-  border: 1px solid #ddd;
-}
-</style>
-"""
-
-# 编辑工具的HTML元素
-EDITOR_ELEMENTS = """
-<!-- 元素检查器 -->
-<div id="elementInspector"></div>
-
-<!-- 区域编辑按钮容器 -->
-<div id="divEditorButtons">
-  <button id="editDuplicateBtn" style="font-size: 20px; font-weight: bold; width: 36px; height: 36px; display: flex; align-items: center; justify-content: center; padding: 0; background-color: #34a853; color: white; border: none;">+</button>
-  <button id="editRemoveBtn" style="font-size: 20px; font-weight: bold; width: 36px; height: 36px; display: flex; align-items: center; justify-content: center; padding: 0; background-color: #ea4335; color: white; border: none;">-</button>
-</div>
-
-<!-- 图片上传模态框 -->
-<div id="imageUploadModal">
-  <div class="modal-content">
-    <h3 class="modal-title">上传新图片</h3>
-    <p id="imageUploadDescription">选择一个图片文件上传替换当前图片。</p>
-    <div id="uploadTypeToggle" style="margin-bottom: 15px; display: none;">
-      <label><input type="radio" name="uploadType" value="single" checked> 单张上传</label>
-      <label style="margin-left: 15px;"><input type="radio" name="uploadType" value="multiple"> 多张上传(轮播)</label>
-    </div>
-    <input type="file" id="imageFileInput" accept="image/*">
-    <input type="file" id="multipleImageFileInput" accept="image/*" multiple style="display: none;">
-    <div id="imagePreview"></div>
-    <div id="multipleImagePreview" style="display: none; margin-top: 15px;"></div>
-    <div class="modal-buttons">
-      <button id="cancelImageUpload" class="modal-button">取消</button>
-      <button id="applyImageUpload" class="modal-button">应用</button>
-    </div>
-  </div>
-</div>
-"""
-
-# 编辑工具的JavaScript代码
-EDITOR_SCRIPTS = """
-<script id="editor-script">
-// 全局共享变量
-window.editorVars = {
-  isTextEditMode: false,
-  isImageEditMode: false,
-  isInspecting: false,
-  isEditMode: false,
-  editedTextElements: {},
-  editedImages: {},
-  editedBackgroundImages: {},
-  editedCarouselImages: {},
-  currentEditingImage: null,
-  currentEditingElement: null,
-  currentEditingType: 'single', // 'single', 'background', 'carousel', 'container'
-  selectedElement: null,
-  hoverElement: null,
-  hoveredHighlight: null,
-  highlightElement: null,
-  uploadedMultipleImages: [],
-  containerImages: [], // 存储容器内的所有图片
-  selectedImageIndex: -1, // 当前选中的图片索引
-  selectedSingleFile: null, // 存储单个选择的文件
-  selectedMultipleFiles: null, // 存储多个选择的文件
-  buttons: null // 存储编辑器按钮引用
-};
-
-// 获取元素路径的函数
-function getElementPath(element) {
-  if (!element) return '';
-  
-  let path = [];
-  let current = element;
-  
-  while (current && current !== document.documentElement) {
-    let selector = current.tagName.toLowerCase();
-    
-    if (current.id) {
-      selector += '#' + current.id;
-    } else {
-      // 获取元素在其父元素中的索引
-      let index = 0;
-      let sibling = current;
-      while (sibling) {
-        if (sibling.tagName === current.tagName) {
-          index++;
-        }
-        sibling = sibling.previousElementSibling;
-      }
-      selector += `:nth-of-type(${index})`;
-    }
-    
-    path.unshift(selector);
-    current = current.parentElement;
-  }
-  
-  return path.join(' > ');
-}
-
-// 保存页面状态函数
-function savePageState() {
-  localStorage.setItem('pageLastModified', new Date().getTime().toString());
-}
-
-// 添加编辑器按钮
-function addEditorButtons() {
-  // 文本编辑按钮
-  const toggleTextEditButton = document.createElement('button');
-  toggleTextEditButton.innerText = '启用文本编辑';
-  toggleTextEditButton.className = 'editor-button';
-  toggleTextEditButton.style.right = '350px';
-  document.body.appendChild(toggleTextEditButton);
-  
-  // 图片编辑按钮
-  const toggleImageEditButton = document.createElement('button');
-  toggleImageEditButton.innerText = '启用图片编辑';
-  toggleImageEditButton.className = 'editor-button';
-  toggleImageEditButton.style.right = '580px';
-  document.body.appendChild(toggleImageEditButton);
-  
-  // 区域编辑按钮
-  const toggleEditButton = document.createElement('button');
-  toggleEditButton.innerText = '启用区域编辑模式';
-  toggleEditButton.className = 'editor-button';
-  toggleEditButton.style.right = '180px';
-  document.body.appendChild(toggleEditButton);
-  
-  // 元素检查按钮
-  const toggleInspectButton = document.createElement('button');
-  toggleInspectButton.innerText = '启用元素检查';
-  toggleInspectButton.className = 'editor-button';
-  toggleInspectButton.style.right = '30px';
-  document.body.appendChild(toggleInspectButton);
-  
-  return {
-    textEditBtn: toggleTextEditButton,
-    imageEditBtn: toggleImageEditButton,
-    editBtn: toggleEditButton,
-    inspectBtn: toggleInspectButton
-  };
-}
-
-// 初始化编辑器功能
-function initEditor() {
-  console.log('[DEBUG] 开始初始化编辑器');
-  const v = window.editorVars;
-  console.log('[DEBUG] 编辑器变量状态:', JSON.stringify({
-    isTextEditMode: v.isTextEditMode,
-    isImageEditMode: v.isImageEditMode,
-    isInspecting: v.isInspecting,
-    isEditMode: v.isEditMode
-  }));
-  
-  // 获取DOM元素
-  const inspector = document.getElementById('elementInspector');
-  const editorButtons = document.getElementById('divEditorButtons');
-  const duplicateBtn = document.getElementById('editDuplicateBtn');
-  const removeBtn = document.getElementById('editRemoveBtn');
-  const imageUploadModal = document.getElementById('imageUploadModal');
-  const imageFileInput = document.getElementById('imageFileInput');
-  const imagePreview = document.getElementById('imagePreview');
-  const cancelImageUploadBtn = document.getElementById('cancelImageUpload');
-  const applyImageUploadBtn = document.getElementById('applyImageUpload');
-  
-  console.log('[DEBUG] DOM元素加载状态:', {
-    inspector: !!inspector,
-    editorButtons: !!editorButtons,
-    duplicateBtn: !!duplicateBtn,
-    removeBtn: !!removeBtn,
-    imageUploadModal: !!imageUploadModal
-  });
-  
-  // 添加编辑器按钮
-  const buttons = addEditorButtons();
-  // 保存按钮到全局变量
-  v.buttons = buttons;
-  
-  console.log('[DEBUG] 编辑器按钮创建:', {
-    textEditBtn: !!buttons.textEditBtn,
-    imageEditBtn: !!buttons.imageEditBtn,
-    editBtn: !!buttons.editBtn,
-    inspectBtn: !!buttons.inspectBtn
-  });
-  
-  // 初始化高亮元素
-  ensureHighlightElementsCreated();
-  
-  // 绑定按钮事件
-  bindButtonEvents();
-  
-  // 确保复制和删除按钮文本显示正确
-  function fixActionButtons() {
-    if (duplicateBtn) {
-      duplicateBtn.innerHTML = '+';
-      duplicateBtn.style.fontSize = '20px';
-      duplicateBtn.style.backgroundColor = '#34a853';
-      duplicateBtn.style.color = 'white';
-    }
-    
-    if (removeBtn) {
-      removeBtn.innerHTML = '-';
-      removeBtn.style.fontSize = '20px';
-      removeBtn.style.backgroundColor = '#ea4335';
-      removeBtn.style.color = 'white';
-    }
-  }
-  
-  // 定期执行确保按钮显示正确
-  fixActionButtons();
-  setInterval(fixActionButtons, 500);
-  
-  // 复制按钮点击事件
-  duplicateBtn.addEventListener('click', function(e) {
-    e.preventDefault();
-    e.stopPropagation();
-    
-    if (v.selectedElement) {
-      duplicateElement(v.selectedElement);
-    }
-  });
-  
-  // 删除按钮点击事件
-  removeBtn.addEventListener('click', function(e) {
-    e.preventDefault();
-    e.stopPropagation();
-    
-    if (v.selectedElement) {
-      removeElement(v.selectedElement);
-    }
-  });
-  
-  // 阻止编辑按钮冒泡
-  editorButtons.addEventListener('click', function(e) {
-    e.stopPropagation();
-  });
-  
-  // 在页面加载时应用保存的修改
-  document.addEventListener('DOMContentLoaded', function() {
-    console.log('[DEBUG] DOM内容加载完成');
-    setTimeout(() => {
-      console.log('[DEBUG] 开始应用保存的修改');
-      try {
-        // 加载文本编辑
-        v.editedTextElements = JSON.parse(localStorage.getItem('editedTexts') || '{}');
-        applyTextEdits();
-        
-        // 加载图片编辑
-        v.editedImages = JSON.parse(localStorage.getItem('editedImages') || '{}');
-        v.editedBackgroundImages = JSON.parse(localStorage.getItem('editedBackgroundImages') || '{}');
-        v.editedCarouselImages = JSON.parse(localStorage.getItem('editedCarouselImages') || '{}');
-        applyImageEdits();
-        
-        // 应用页面修改
-        applyPageModifications();
-        
-        // 确保高亮元素已创建
-        ensureHighlightElementsCreated();
-        console.log('[DEBUG] 保存的修改应用完成');
-      } catch (error) {
-        console.error('[ERROR] 应用保存的修改失败:', error);
-      }
-    }, 500);
-  });
-
-  console.log('[DEBUG] 编辑器初始化完成');
-}
-
-// 确保创建和显示高亮元素
-function ensureHighlightElementsCreated() {
-  console.log('[DEBUG] 确保高亮元素已创建');
-  const v = window.editorVars;
-  
-  // 检查检查高亮元素
-  if (!document.querySelector('.element-highlight[data-highlight-type="inspect"]')) {
-    console.log('[DEBUG] 创建检查高亮元素');
-    const highlight = document.createElement('div');
-    highlight.className = 'element-highlight';
-    highlight.setAttribute('data-highlight-type', 'inspect');
-    highlight.style.position = 'absolute';
-    highlight.style.zIndex = '9999';
-    highlight.style.pointerEvents = 'none';
-    highlight.style.border = '2px solid #ea4335';
-    highlight.style.backgroundColor = 'rgba(234, 67, 53, 0.1)';
-    highlight.style.boxSizing = 'border-box';
-    highlight.style.display = 'none';
-    document.body.appendChild(highlight);
-    v.highlightElement = highlight;
-    console.log('[DEBUG] 检查高亮元素已创建');
-  } else {
-    console.log('[DEBUG] 检查高亮元素已存在');
-    v.highlightElement = document.querySelector('.element-highlight[data-highlight-type="inspect"]');
-  }
-  
-  // 检查悬停高亮元素
-  if (!document.querySelector('.element-highlight[data-highlight-type="hover"]')) {
-    console.log('[DEBUG] 创建悬停高亮元素');
-    const hover = document.createElement('div');
-    hover.className = 'element-highlight';
-    hover.setAttribute('data-highlight-type', 'hover');
-    hover.style.position = 'absolute';
-    hover.style.zIndex = '9998';
-    hover.style.pointerEvents = 'none';
-    hover.style.backgroundColor = 'rgba(66, 133, 244, 0.2)';
-    hover.style.border = '2px solid #4285f4';
-    hover.style.boxSizing = 'border-box';
-    hover.style.display = 'none';
-    document.body.appendChild(hover);
-    v.hoveredHighlight = hover;
-    console.log('[DEBUG] 悬停高亮元素已创建');
-  } else {
-    console.log('[DEBUG] 悬停高亮元素已存在');
-    v.hoveredHighlight = document.querySelector('.element-highlight[data-highlight-type="hover"]');
-  }
-  
-  console.log('[DEBUG] 高亮元素创建完成', {
-    highlightElement: !!v.highlightElement,
-    hoveredHighlight: !!v.hoveredHighlight
-  });
-}
-
-// 绑定按钮事件处理
-function bindButtonEvents() {
-  const v = window.editorVars;
-  const buttons = v.buttons;
-  
-  if (!buttons) {
-    console.error('[ERROR] 按钮未定义，无法绑定事件');
-    return;
-  }
-  
-  console.log('[DEBUG] 开始绑定按钮事件');
-
-  // 切换元素检查模式
-  buttons.inspectBtn.addEventListener('click', function(e) {
-    console.log('[DEBUG] 元素检查按钮被点击', e.type);
-    console.log('[DEBUG] 点击前状态:', { 
-      isInspecting: v.isInspecting,
-      isTextEditMode: v.isTextEditMode,
-      isImageEditMode: v.isImageEditMode,
-      isEditMode: v.isEditMode
-    });
-    
-    // 清除可能的旧事件处理程序
-    document.removeEventListener('mousemove', handleInspectorMouseMove);
-    document.removeEventListener('mousemove', handleMouseMove);
-    console.log('[DEBUG] 旧事件处理程序已清除');
-    
-    // 如果其他模式已开启，先关闭
-    if (v.isTextEditMode) {
-      console.log('[DEBUG] 关闭文本编辑模式');
-      v.isTextEditMode = false;
-      removeTextEditability();
-      buttons.textEditBtn.innerText = '启用文本编辑';
-      buttons.textEditBtn.style.backgroundColor = '#4285f4';
-    }
-    
-    if (v.isImageEditMode) {
-      console.log('[DEBUG] 关闭图片编辑模式');
-      v.isImageEditMode = false;
-      completelyRemoveImageEditability();
-      buttons.imageEditBtn.innerText = '启用图片编辑';
-      buttons.imageEditBtn.style.backgroundColor = '#4285f4';
-      buttons.imageEditBtn.style.color = '#fff';
-    }
-    
-    if (v.isEditMode) {
-      console.log('[DEBUG] 关闭区域编辑模式');
-      v.isEditMode = false;
-      removeEditModeFromDivs();
-      buttons.editBtn.innerText = '启用区域编辑模式';
-      buttons.editBtn.style.backgroundColor = '#4285f4';
-    }
-    
-    // 切换检查模式状态
-    v.isInspecting = !v.isInspecting;
-    console.log('[DEBUG] 检查模式切换为:', v.isInspecting);
-    
-    if (v.isInspecting) {
-      console.log('[DEBUG] 启用元素检查');
-      this.innerText = '禁用元素检查';
-      this.style.backgroundColor = '#ea4335';
-      
-      try {
-        // 绑定鼠标移动事件处理程序
-        console.log('[DEBUG] 尝试绑定检查器鼠标移动事件');
-        document.addEventListener('mousemove', handleInspectorMouseMove);
-        console.log('[DEBUG] 检查器鼠标移动事件绑定成功');
-      } catch (error) {
-        console.error('[ERROR] 绑定检查器鼠标移动事件失败:', error);
-      }
-    } else {
-      console.log('[DEBUG] 禁用元素检查');
-      this.innerText = '启用元素检查';
-      this.style.backgroundColor = '#4285f4';
-      
-      try {
-        // 隐藏检查器和高亮
-        console.log('[DEBUG] 尝试隐藏检查器和高亮');
-        hideInspector();
-        hideHighlight();
-        console.log('[DEBUG] 检查器和高亮隐藏成功');
-        
-        // 解绑鼠标移动事件处理程序
-        document.removeEventListener('mousemove', handleInspectorMouseMove);
-        console.log('[DEBUG] 检查器鼠标移动事件解绑成功');
-      } catch (error) {
-        console.error('[ERROR] 隐藏检查器或解绑事件失败:', error);
-      }
-    }
-    console.log('[DEBUG] 元素检查模式切换完成');
-  });
-  
-  // 切换区域编辑模式
-  buttons.editBtn.addEventListener('click', function(e) {
-    console.log('[DEBUG] 区域编辑按钮被点击', e.type);
-    console.log('[DEBUG] 点击前状态:', { 
-      isEditMode: v.isEditMode,
-      isInspecting: v.isInspecting, 
-      isTextEditMode: v.isTextEditMode,
-      isImageEditMode: v.isImageEditMode
-    });
-    
-    // 清除可能的旧事件处理程序
-    document.removeEventListener('mousemove', handleInspectorMouseMove);
-    document.removeEventListener('mousemove', handleMouseMove);
-    console.log('[DEBUG] 旧事件处理程序已清除');
-    
-    // 如果其他模式已开启，先关闭
-    if (v.isInspecting) {
-      console.log('[DEBUG] 关闭元素检查模式');
-      v.isInspecting = false;
-      hideInspector();
-      hideHighlight();
-      buttons.inspectBtn.innerText = '启用元素检查';
-      buttons.inspectBtn.style.backgroundColor = '#4285f4';
-    }
-    
-    if (v.isTextEditMode) {
-      console.log('[DEBUG] 关闭文本编辑模式');
-      v.isTextEditMode = false;
-      removeTextEditability();
-      buttons.textEditBtn.innerText = '启用文本编辑';
-      buttons.textEditBtn.style.backgroundColor = '#4285f4';
-    }
-    
-    if (v.isImageEditMode) {
-      console.log('[DEBUG] 关闭图片编辑模式');
-      v.isImageEditMode = false;
-      completelyRemoveImageEditability();
-      buttons.imageEditBtn.innerText = '启用图片编辑';
-      buttons.imageEditBtn.style.backgroundColor = '#4285f4';
-      buttons.imageEditBtn.style.color = '#fff';
-    }
-    
-    // 切换区域编辑状态
-    v.isEditMode = !v.isEditMode;
-    console.log('[DEBUG] 区域编辑模式切换为:', v.isEditMode);
-    
-    if (v.isEditMode) {
-      console.log('[DEBUG] 启用区域编辑模式');
-      this.innerText = '禁用区域编辑模式';
-      this.style.backgroundColor = '#ea4335';
-      
-      try {
-        // 应用区域编辑模式
-        console.log('[DEBUG] 尝试应用区域编辑模式');
-        applyEditModeToDivs();
-        console.log('[DEBUG] 区域编辑模式应用成功');
-        
-        // 绑定鼠标移动事件处理程序
-        console.log('[DEBUG] 尝试绑定鼠标移动事件');
-        document.addEventListener('mousemove', handleMouseMove);
-        console.log('[DEBUG] 鼠标移动事件绑定成功');
-      } catch (error) {
-        console.error('[ERROR] 应用区域编辑模式失败:', error);
-      }
-    } else {
-      console.log('[DEBUG] 禁用区域编辑模式');
-      this.innerText = '启用区域编辑模式';
-      this.style.backgroundColor = '#4285f4';
-      
-      try {
-        // 移除区域编辑模式
-        console.log('[DEBUG] 尝试移除区域编辑模式');
-        removeEditModeFromDivs();
-        console.log('[DEBUG] 区域编辑模式移除成功');
-        
-        // 解绑鼠标移动事件处理程序
-        document.removeEventListener('mousemove', handleMouseMove);
-        console.log('[DEBUG] 鼠标移动事件解绑成功');
-      } catch (error) {
-        console.error('[ERROR] 移除区域编辑模式失败:', error);
-      }
-    }
-    console.log('[DEBUG] 区域编辑模式切换完成');
-  });
-  
-  // 切换文本编辑模式
-  buttons.textEditBtn.addEventListener('click', function() {
-    // 清除可能的旧事件处理程序
-    document.removeEventListener('mousemove', handleInspectorMouseMove);
-    document.removeEventListener('mousemove', handleMouseMove);
-    document.removeEventListener('mousemove', handleImageEditMouseMove);
-    
-    // 清理所有样式残留
-    clearAllEditModes();
-    
-    // 如果其他模式已开启，先关闭
-    if (v.isImageEditMode) {
-      v.isImageEditMode = false;
-      completelyRemoveImageEditability();
-      buttons.imageEditBtn.innerText = '启用图片编辑';
-      buttons.imageEditBtn.style.backgroundColor = '#4285f4';
-      buttons.imageEditBtn.style.color = '#fff';
-    }
-    
-    if (v.isInspecting) {
-      v.isInspecting = false;
-      hideInspector();
-      hideHighlight();
-      buttons.inspectBtn.innerText = '启用元素检查';
-      buttons.inspectBtn.style.backgroundColor = '#4285f4';
-    }
-    
-    if (v.isEditMode) {
-      v.isEditMode = false;
-      removeEditModeFromDivs();
-      buttons.editBtn.innerText = '启用区域编辑模式';
-      buttons.editBtn.style.backgroundColor = '#4285f4';
-    }
-    
-    v.isTextEditMode = !v.isTextEditMode;
-    
-    if (v.isTextEditMode) {
-      // 启用文本编辑模式
-      this.innerText = '禁用文本编辑';
-      this.style.backgroundColor = '#34a853';
-      
-      // 使所有文本元素可编辑
-      makeElementEditable(document.body);
-    } else {
-      // 禁用文本编辑模式
-      this.innerText = '启用文本编辑';
-      this.style.backgroundColor = '#4285f4';
-      
-      // 移除可编辑属性
-      removeTextEditability();
-    }
-  });
-  
-  // 切换图片编辑模式
-  buttons.imageEditBtn.addEventListener('click', function() {
-    // 清除可能的旧事件处理程序
-    document.removeEventListener('mousemove', handleInspectorMouseMove);
-    document.removeEventListener('mousemove', handleMouseMove);
-    document.removeEventListener('mousemove', handleImageEditMouseMove);
-    
-    // 清理所有样式残留
-    clearAllEditModes();
-    
-    // 如果其他模式已开启，先关闭
-    if (v.isTextEditMode) {
-      v.isTextEditMode = false;
-      removeTextEditability();
-      buttons.textEditBtn.innerText = '启用文本编辑';
-      buttons.textEditBtn.style.backgroundColor = '#4285f4';
-    }
-    
-    if (v.isInspecting) {
-      v.isInspecting = false;
-      hideInspector();
-      hideHighlight();
-      buttons.inspectBtn.innerText = '启用元素检查';
-      buttons.inspectBtn.style.backgroundColor = '#4285f4';
-    }
-    
-    if (v.isEditMode) {
-      v.isEditMode = false;
-      removeEditModeFromDivs();
-      buttons.editBtn.innerText = '启用区域编辑模式';
-      buttons.editBtn.style.backgroundColor = '#4285f4';
-    }
-    
-    v.isImageEditMode = !v.isImageEditMode;
-    
-    if (v.isImageEditMode) {
-      // 启用图片编辑模式
-      this.innerText = '禁用图片编辑';
-      this.style.backgroundColor = '#fbbc05';
-      this.style.color = '#000';
-      
-      console.log('[DEBUG] 正在启用图片编辑模式...');
-      
-      // 使所有图片元素可编辑
-      makeImagesEditable();
-      
-      // 阻止链接点击事件
-      document.querySelectorAll('a[data-image-editable-container="true"]').forEach(link => {
-        link.addEventListener('click', preventLinkClick);
-      });
-      
-      // 显示容器编辑图标
-      document.querySelectorAll('[data-container-editable="true"] .container-edit-icon').forEach(icon => {
-        if (icon) {
-          icon.style.display = 'block';
-        }
-      });
-      
-      // 添加鼠标移动事件来高亮div
-      document.addEventListener('mousemove', handleImageEditMouseMove);
-      
-      console.log('[DEBUG] 图片编辑模式已启用，可以点击div或图片');
-    } else {
-      // 禁用图片编辑模式
-      this.innerText = '启用图片编辑';
-      this.style.backgroundColor = '#4285f4';
-      this.style.color = '#fff';
-      
-      // 使用增强的清理函数
-      completelyRemoveImageEditability();
-      
-      // 恢复链接点击行为
-      document.querySelectorAll('a[data-image-editable-container="true"]').forEach(link => {
-        link.removeEventListener('click', preventLinkClick);
-        link.removeAttribute('data-image-editable-container');
-      });
-      
-      // 移除鼠标移动事件监听
-      document.removeEventListener('mousemove', handleImageEditMouseMove);
-      
-      // 隐藏高亮
-      hideHoverHighlight();
-      
-      // 移除所有div-hover-highlight类
-      document.querySelectorAll('.div-hover-highlight').forEach(div => {
-        div.classList.remove('div-hover-highlight');
-        div.style.cursor = '';
-      });
-      
-      // 移除所有div-image-container类
-      document.querySelectorAll('.div-image-container').forEach(div => {
-        div.classList.remove('div-image-container');
-        div.removeAttribute('data-images-count');
-      });
-    }
-  });
-  
-  console.log('[DEBUG] 按钮事件绑定完成');
-}
-
-// 显示检查器提示
-function showInspector(x, y, element) {
-  const v = window.editorVars;
-  console.log('[DEBUG] 显示检查器:', { x, y, element: element ? element.tagName : 'null' });
-  
-  if (!element) {
-    console.log('[DEBUG] 无元素可检查');
-    return;
-  }
-  
-  // 获取DOM元素
-  const inspector = document.getElementById('elementInspector');
-  if (!inspector) {
-    console.error('[ERROR] 找不到检查器元素');
-    return;
-  }
-  
-  // 查找元素所在的最近的div
-  let containingDiv = element;
-  while (containingDiv && containingDiv.tagName.toLowerCase() !== 'div' && containingDiv !== document.body) {
-    containingDiv = containingDiv.parentElement;
-  }
-  
-  if (!containingDiv || containingDiv === document.body) {
-    containingDiv = element; // 如果找不到包含的div，则显示元素本身
-  }
-  
-  console.log('[DEBUG] 找到包含元素:', containingDiv ? containingDiv.tagName : 'null');
-  
-  // 获取元素名称
-  let info = '';
-  if (containingDiv.tagName) {
-    info = containingDiv.tagName.toLowerCase();
-    
-    if (containingDiv.id) {
-      info += `#${containingDiv.id}`;
-    }
-    
-    if (containingDiv.className && typeof containingDiv.className === 'string' && containingDiv.className.trim()) {
-      const classNames = containingDiv.className.split(' ').filter(cls => cls.trim());
-      if (classNames.length > 0) {
-        info += `.${classNames.join('.')}`;
-      }
-    }
-  }
-  
-  console.log('[DEBUG] 元素信息:', info);
-  
-  inspector.innerHTML = `<div><strong>${info}</strong></div>`;
-  inspector.style.display = 'block';
-  
-  // 确保提示框在视窗内
-  const inspectorRect = inspector.getBoundingClientRect();
-  let left = x + 15;
-  let top = y;
-  
-  if (left + inspectorRect.width > window.innerWidth) {
-    left = x - inspectorRect.width - 5;
-  }
-  
-  if (top + inspectorRect.height > window.innerHeight) {
-    top = window.innerHeight - inspectorRect.height - 5;
-  }
-  
-  inspector.style.left = `${left}px`;
-  inspector.style.top = `${top}px`;
-  
-  try {
-    // 高亮显示div元素
-    console.log('[DEBUG] 尝试高亮显示元素');
-    highlightTargetElement(containingDiv);
-    console.log('[DEBUG] 元素高亮成功');
-  } catch (error) {
-    console.error('[ERROR] 元素高亮失败:', error);
-  }
-}
-
-// 高亮显示元素
-function highlightTargetElement(element) {
-  const v = window.editorVars;
-  console.log('[DEBUG] 高亮显示元素:', element ? element.tagName : 'null');
-  
-  if (!element) {
-    console.log('[DEBUG] 无元素可高亮');
-    return;
-  }
-  
-  if (!v.highlightElement) {
-    console.log('[DEBUG] 高亮元素不存在，尝试创建');
-    ensureHighlightElementsCreated();
-  }
-  
-  const highlight = v.highlightElement;
-  console.log('[DEBUG] 高亮元素状态:', !!highlight);
-  
-  if (!highlight) {
-    console.error('[ERROR] 高亮元素创建失败');
-    return;
-  }
-  
-  const rect = element.getBoundingClientRect();
-  console.log('[DEBUG] 元素位置:', { 
-    top: rect.top, 
-    left: rect.left, 
-    width: rect.width, 
-    height: rect.height 
-  });
-  
-  highlight.style.top = (rect.top + window.scrollY) + 'px';
-  highlight.style.left = (rect.left + window.scrollX) + 'px';
-  highlight.style.width = rect.width + 'px';
-  highlight.style.height = rect.height + 'px';
-  highlight.style.display = 'block';
-}
-
-// 处理鼠标移动事件 - 元素检查模式
-function handleInspectorMouseMove(e) {
-  console.log('[DEBUG] 处理检查器鼠标移动:', { x: e.clientX, y: e.clientY });
-  const x = e.clientX;
-  const y = e.clientY;
-  const element = document.elementFromPoint(x, y);
-  console.log('[DEBUG] 鼠标下元素:', element ? element.tagName : 'null');
-  
-  // 忽略编辑器自身的元素
-  if (element && (
-      element.id === 'elementInspector' || 
-      element.classList.contains('element-highlight') ||
-      element.classList.contains('editor-button'))) {
-    console.log('[DEBUG] 忽略编辑器自身元素');
-    return;
-  }
-  
-  try {
-    console.log('[DEBUG] 尝试显示检查器');
-    showInspector(x, y, element);
-    console.log('[DEBUG] 检查器显示成功');
-  } catch (error) {
-    console.error('[ERROR] 显示检查器失败:', error);
-  }
-}
-
-// 隐藏高亮
-function hideHighlight() {
-  console.log('[DEBUG] 隐藏高亮元素');
-  if (window.editorVars.highlightElement) {
-    window.editorVars.highlightElement.style.display = 'none';
-    console.log('[DEBUG] 高亮元素已隐藏');
-  } else {
-    console.log('[DEBUG] 无高亮元素可隐藏');
-  }
-}
-
-// 隐藏检查器提示
-function hideInspector() {
-  console.log('[DEBUG] 隐藏检查器');
-  const inspector = document.getElementById('elementInspector');
-  if (inspector) {
-    inspector.style.display = 'none';
-    console.log('[DEBUG] 检查器已隐藏');
-  } else {
-    console.log('[DEBUG] 无检查器可隐藏');
-  }
-  hideHighlight();
-}
-
-// 鼠标移动事件处理
-function handleMouseMove(e) {
-  console.log('[DEBUG] 处理鼠标移动事件');
-  
-  if (!window.editorVars.isEditMode) {
-    console.log('[DEBUG] 编辑模式未启用，不处理鼠标移动');
-    return;
-  }
-  
-  const element = document.elementFromPoint(e.clientX, e.clientY);
-  console.log('[DEBUG] 鼠标下元素:', element ? element.tagName : 'null');
-  
-  // 忽略我们的UI元素
-  if (element && (
-      element.id === 'elementInspector' || 
-      element.id === 'divEditorButtons' || 
-      element.classList.contains('element-highlight') ||
-      element.classList.contains('editor-button') ||
-      element === document.getElementById('editDuplicateBtn') ||
-      element === document.getElementById('editRemoveBtn'))) {
-    console.log('[DEBUG] 忽略UI元素');
-    hideHoverHighlight();
-    return;
-  }
-  
-  // 查找最近的div元素
-  let targetDiv = element;
-  while (targetDiv && targetDiv.tagName.toLowerCase() !== 'div' && targetDiv !== document.body) {
-    targetDiv = targetDiv.parentElement;
-  }
-  
-  console.log('[DEBUG] 目标DIV:', targetDiv ? targetDiv.tagName : 'null');
-  
-  if (!targetDiv || targetDiv === document.body || targetDiv === window.editorVars.selectedElement) {
-    console.log('[DEBUG] 无效目标或已选中，隐藏高亮');
-    hideHoverHighlight();
-    return;
-  }
-  
-  // 更新当前悬停元素
-  window.editorVars.hoverElement = targetDiv;
-  console.log('[DEBUG] 更新悬停元素:', window.editorVars.hoverElement.tagName);
-  
-  try {
-    // 显示高亮
-    console.log('[DEBUG] 尝试高亮悬停元素');
-    highlightHoverElement(window.editorVars.hoverElement);
-    console.log('[DEBUG] 悬停元素高亮成功');
-  } catch (error) {
-    console.error('[ERROR] 悬停元素高亮失败:', error);
-  }
-}
-
-// 隐藏悬停高亮
-function hideHoverHighlight() {
-  console.log('[DEBUG] 隐藏悬停高亮');
-  if (window.editorVars.hoveredHighlight) {
-    window.editorVars.hoveredHighlight.style.display = 'none';
-    console.log('[DEBUG] 悬停高亮已隐藏');
-  } else {
-    console.log('[DEBUG] 无悬停高亮可隐藏');
-  }
-}
-
-// 高亮显示悬停元素
-function highlightHoverElement(element) {
-  const v = window.editorVars;
-  console.log('[DEBUG] 高亮显示悬停元素:', element ? element.tagName : 'null');
-  
-  if (!element) {
-    console.log('[DEBUG] 无元素可高亮');
-    return;
-  }
-  
-  if (!v.hoveredHighlight) {
-    console.log('[DEBUG] 悬停高亮元素不存在，尝试创建');
-    ensureHighlightElementsCreated();
-  }
-  
-  const hover = v.hoveredHighlight;
-  console.log('[DEBUG] 悬停高亮元素状态:', !!hover);
-  
-  if (!hover) {
-    console.error('[ERROR] 悬停高亮元素创建失败');
-    return;
-  }
-  
-  const rect = element.getBoundingClientRect();
-  console.log('[DEBUG] 元素位置:', { 
-    top: rect.top, 
-    left: rect.left, 
-    width: rect.width, 
-    height: rect.height 
-  });
-  
-  hover.style.top = (rect.top + window.scrollY) + 'px';
-  hover.style.left = (rect.left + window.scrollX) + 'px';
-  hover.style.width = rect.width + 'px';
-  hover.style.height = rect.height + 'px';
-  hover.style.display = 'block';
-}
-
-// 应用编辑模式到所有div
-function applyEditModeToDivs() {
-  console.log('[DEBUG] 应用编辑模式到所有DIV');
-  const v = window.editorVars;
-  const divs = document.querySelectorAll('div');
-  console.log('[DEBUG] 找到DIV元素数量:', divs.length);
-  
-  let appliedCount = 0;
-  divs.forEach(div => {
-    // 排除我们自己的元素
-    if (div.id === 'elementInspector' || 
-        div.id === 'divEditorButtons' || 
-        div.classList.contains('element-highlight') ||
-        div.classList.contains('editor-button')) {
-      return;
-    }
-    
-    try {
-      // 移除可能存在的旧事件监听器
-      div.removeEventListener('click', handleElementClick);
-      
-      // 添加点击事件
-      div.addEventListener('click', handleElementClick);
-      
-      // 如果图片编辑模式和区域编辑模式同时开启，添加图片编辑功能
-      if (v.isImageEditMode) {
-        div.addEventListener('click', function(e) {
-          // 只有在选中状态下才允许编辑图片
-          if (v.selectedElement === this) {
-            handleImageEditClick.call(this, e);
-          }
-        });
-      }
-      
-      // 添加样式
-      div.style.cursor = 'pointer';
-      appliedCount++;
-    } catch (error) {
-      console.error('[ERROR] 为DIV应用编辑模式失败:', error);
-    }
-  });
-}
-
-// 完全移除图片编辑功能
-function completelyRemoveImageEditability() {
-  const v = window.editorVars;
-  console.log('[DEBUG] 完全移除图片编辑功能');
-  
-  try {
-    // 移除所有图片的可编辑状态
-    document.querySelectorAll('img.image-editable').forEach(img => {
-      img.classList.remove('image-editable');
-      img.style.cursor = '';
-      img.style.border = '';
-      img.style.padding = '';
-      img.style.margin = '';
-      img.style.outline = '';
-      img.removeEventListener('click', handleImageEditClick);
-    });
-    
-    // 移除所有背景图片的可编辑状态
-    document.querySelectorAll('.bg-image-editable, [data-bg-editable]').forEach(el => {
-      el.classList.remove('bg-image-editable');
-      el.removeAttribute('data-bg-editable');
-      el.style.cursor = '';
-      el.style.outline = '';
-      el.removeEventListener('click', handleImageEditClick);
-    });
-    
-    // 移除轮播图容器的可编辑状态
-    document.querySelectorAll('.carousel-container-editable, [data-carousel-editable]').forEach(carousel => {
-      carousel.classList.remove('carousel-container-editable');
-      carousel.removeAttribute('data-carousel-editable');
-      carousel.style.outline = '';
-      
-      // 移除提示标记
-      const hint = carousel.querySelector('[data-carousel-hint]');
-      if (hint && hint.parentElement) {
-        hint.parentElement.removeChild(hint);
-      }
-    });
-    
-    // 移除容器编辑标记和事件
-    document.querySelectorAll('[data-container-editable="true"]').forEach(container => {
-      container.removeAttribute('data-container-editable');
-      
-      // 移除编辑图标
-      const icon = container.querySelector('.container-edit-icon');
-      if (icon) {
-        icon.style.display = 'none';
-      }
-    });
-    
-    // 移除所有容器提示
-    document.querySelectorAll('[data-container-hint]').forEach(hint => {
-      if (hint.parentElement) {
-        hint.parentElement.removeChild(hint);
-      }
-    });
-    
-    // 移除所有div-image-container类和高亮
-    document.querySelectorAll('.div-image-container, .div-hover-highlight').forEach(div => {
-      div.classList.remove('div-image-container');
-      div.classList.remove('div-hover-highlight');
-      div.style.cursor = '';
-      div.style.outline = '';
-      div.style.border = '';
-      div.removeAttribute('data-images-count');
-    });
-    
-    // 恢复链接点击行为
-    document.querySelectorAll('a[data-image-editable-container="true"]').forEach(link => {
-      link.removeEventListener('click', preventLinkClick);
-      link.removeAttribute('data-image-editable-container');
-    });
-    
-    // 为所有div移除点击事件
-    document.querySelectorAll('div').forEach(div => {
-      div.removeEventListener('click', handleImageEditClick);
-    });
-    
-    // 关闭图片上传模态框
-    closeImageUploadModal();
-    
-    // 重置变量
-    v.currentEditingImage = null;
-    v.currentEditingElement = null;
-    v.currentEditingType = 'single';
-    v.containerImages = [];
-    v.selectedSingleFile = null;
-    v.selectedMultipleFiles = null;
-    v.currentImageIndex = 0;
-    
-    // 隐藏高亮
-    hideHighlight();
-    hideHoverHighlight();
-    
-    console.log('[DEBUG] 图片编辑功能已完全移除');
-  } catch (error) {
-    console.error('[ERROR] 移除图片编辑功能时出错:', error);
-  }
-}
-
-// 移除图片编辑功能
-function removeImageEditability() {
-  // 移除所有图片的编辑状态
-  document.querySelectorAll('img.image-editable').forEach(img => {
-    img.classList.remove('image-editable');
-    img.style.cursor = '';
-    img.style.border = '';
-    img.style.padding = '';
-    img.style.margin = '';
-    img.style.outline = '';
-    img.removeEventListener('click', handleImageEditClick);
-  });
-  
-  // 移除所有背景图片的编辑状态
-  document.querySelectorAll('.bg-image-editable, [data-bg-editable]').forEach(el => {
-    el.classList.remove('bg-image-editable');
-    el.removeAttribute('data-bg-editable');
-    el.style.cursor = '';
-    el.style.outline = '';
-    el.removeEventListener('click', handleImageEditClick);
-  });
-  
-  // 移除轮播图容器的编辑状态
-  document.querySelectorAll('.carousel-container-editable, [data-carousel-editable]').forEach(carousel => {
-    carousel.classList.remove('carousel-container-editable');
-    carousel.removeAttribute('data-carousel-editable');
-    
-    // 移除提示标记
-    const hint = carousel.querySelector('[data-carousel-hint]');
-    if (hint) {
-      carousel.removeChild(hint);
-    }
-  });
-  
-  // 移除区域容器中的图片编辑提示
-  document.querySelectorAll('[data-container-hint]').forEach(hint => {
-    if (hint.parentElement) {
-      hint.parentElement.removeChild(hint);
-    }
-  });
-  
-  // 关闭图片上传模态框
-  const imageUploadModal = document.getElementById('imageUploadModal');
-  if (imageUploadModal) {
-    imageUploadModal.style.display = 'none';
-  }
-  
-  console.log('[DEBUG] 已移除所有图片编辑功能');
-}
-
-// 处理图片编辑点击事件
-function handleImageEditClick(e) {
-  const v = window.editorVars;
-  console.log('[DEBUG] 处理图片编辑点击事件', e.currentTarget.tagName);
-  
-  if (!v.isImageEditMode) {
-    console.log('[DEBUG] 图片编辑模式未启用，不处理点击');
-    return;
-  }
-  
-  // 阻止事件冒泡和默认行为
-  e.preventDefault();
-  e.stopPropagation();
-  
-  // 获取点击的元素
-  const element = e.currentTarget;
-  console.log('[DEBUG] 点击的元素类型:', element.tagName);
-  
-  // 记录当前编辑的元素
-  v.currentEditingElement = element;
-  
-  // 确定编辑类型
-  if (element.tagName === 'IMG') {
-    v.currentEditingType = 'single';
-    v.currentEditingImage = element; // 保存当前编辑的图片元素
-    console.log('[DEBUG] 识别为单图片编辑');
-  } else if (element.classList.contains('bg-image-editable')) {
-    v.currentEditingType = 'background';
-    console.log('[DEBUG] 识别为背景图片编辑');
-  } else if (element.classList.contains('carousel-container-editable')) {
-    v.currentEditingType = 'carousel';
-    console.log('[DEBUG] 识别为轮播图编辑');
-    
-    // 找到容器内的所有图片
-    v.containerImages = Array.from(element.querySelectorAll('img'));
-  } else if (element.tagName.toLowerCase() === 'div') {
-    // div容器中的图片 - 不再需要v.isEditMode检查，因为现在直接在图片编辑模式下可以点击div
-    v.currentEditingType = 'container';
-    console.log('[DEBUG] 识别为容器图片编辑');
-    
-    // 清空之前的容器图片列表
-    v.containerImages = [];
-    
-    // 直接找到当前div内的所有图片
-    const images = element.querySelectorAll('img');
-    console.log('[DEBUG] 找到原始图片数量:', images.length);
-    
-    // 转为数组并过滤掉编辑器自身的图片
-    v.containerImages = Array.from(images).filter(img => {
-      // 检查图片是否属于编辑器元素
-      const isEditorElement = img.closest('#elementInspector') || 
-                            img.closest('#divEditorButtons') || 
-                            img.closest('#imageUploadModal') ||
-                            img.closest('.editor-button');
-      return !isEditorElement;
-    });
-    
-    console.log('[DEBUG] 过滤后的图片数量:', v.containerImages.length);
-    
-    if (v.containerImages.length === 0) {
-      alert('所选区域内没有可替换的图片');
-      return;
-    }
-    
-    console.log(`[DEBUG] 发现区域内有 ${v.containerImages.length} 张图片可替换`);
-  }
-  
-  // 显示上传模态框
-  console.log('[DEBUG] 准备显示上传模态框');
-  createImageUploadModal();
-}
-
-// 阻止链接点击事件函数
-function preventLinkClick(e) {
-  const v = window.editorVars;
-  if (v.isImageEditMode) {
-    e.preventDefault();
-    e.stopPropagation();
-    return false;
-  }
-}
-
-// 创建图片上传模态框
-function createImageUploadModal() {
-  const v = window.editorVars;
-  
-  const modal = document.getElementById('imageUploadModal');
-  const description = document.getElementById('imageUploadDescription');
-  const uploadTypeToggle = document.getElementById('uploadTypeToggle');
-  const singleFileInput = document.getElementById('imageFileInput');
-  const multipleFileInput = document.getElementById('multipleImageFileInput');
-  const imagePreview = document.getElementById('imagePreview');
-  const multipleImagePreview = document.getElementById('multipleImagePreview');
-  const cancelBtn = document.getElementById('cancelImageUpload');
-  const applyBtn = document.getElementById('applyImageUpload');
-  
-  // 清空文件输入和预览
-  singleFileInput.value = '';
-  multipleFileInput.value = '';
-  imagePreview.innerHTML = '';
-  multipleImagePreview.innerHTML = '';
-  v.selectedSingleFile = null;
-  v.selectedMultipleFiles = null;
-  
-  // 移除之前的图片预览区域
-  const oldDivPreview = document.getElementById('divImagesPreview');
-  if (oldDivPreview) {
-    oldDivPreview.remove();
-  }
-  
-  // 移除之前的选择器
-  const oldSelector = document.getElementById('carousel-image-selector');
-  if (oldSelector) {
-    oldSelector.remove();
-  }
-  
-  // 根据编辑类型设置描述和显示/隐藏元素
-  if (v.currentEditingType === 'single') {
-    description.textContent = '选择一个图片文件上传替换当前图片。';
-    uploadTypeToggle.style.display = 'none';
-    singleFileInput.style.display = 'block';
-    multipleFileInput.style.display = 'none';
-    imagePreview.style.display = 'block';
-    multipleImagePreview.style.display = 'none';
-  } else if (v.currentEditingType === 'background') {
-    description.textContent = '选择一个图片文件上传替换当前背景图片。';
-    uploadTypeToggle.style.display = 'none';
-    singleFileInput.style.display = 'block';
-    multipleFileInput.style.display = 'none';
-    imagePreview.style.display = 'block';
-    multipleImagePreview.style.display = 'none';
-  } else if (v.currentEditingType === 'carousel' || v.currentEditingType === 'container') {
-    let containerType = v.currentEditingType === 'carousel' ? '轮播图' : '区域';
-    let title = document.querySelector('.modal-title');
-    title.textContent = `上传图片替换${containerType}内容`;
-    
-    description.textContent = `选择图片上传替换${containerType}中的图片（共有${v.containerImages.length}张图片）。`;
-    uploadTypeToggle.style.display = 'block';
-    
-    // 验证containerImages是否正确
-    console.log(`[DEBUG] 准备替换的图片数量: ${v.containerImages.length}`);
-    
-    // 默认选择多张上传模式，更符合批量替换的场景
-    document.querySelector('input[name="uploadType"][value="multiple"]').checked = true;
-    singleFileInput.style.display = 'none';
-    multipleFileInput.style.display = 'block';
-    imagePreview.style.display = 'none';
-    multipleImagePreview.style.display = 'block';
-    
-    // 创建图片选择器 - 仅在单张模式下才需要
-    createImageSelector(v.containerImages);
-    
-    // 显示div中的所有图片预览
-    const divPreview = document.createElement('div');
-    divPreview.id = 'divImagesPreview';
-    divPreview.style.marginBottom = '15px';
-    divPreview.style.border = '1px solid #ddd';
-    divPreview.style.borderRadius = '4px';
-    divPreview.style.padding = '10px';
-    
-    const previewTitle = document.createElement('h4');
-    previewTitle.textContent = `${containerType}中的图片:`;
-    previewTitle.style.margin = '0 0 10px 0';
-    divPreview.appendChild(previewTitle);
-    
-    const imagesWrapper = document.createElement('div');
-    imagesWrapper.style.display = 'flex';
-    imagesWrapper.style.flexWrap = 'wrap';
-    imagesWrapper.style.gap = '10px';
-    
-    v.containerImages.forEach((img, index) => {
-      const imgContainer = document.createElement('div');
-      imgContainer.style.textAlign = 'center';
-      
-      const imgEl = document.createElement('img');
-      imgEl.src = img.src;
-      imgEl.style.maxHeight = '80px';
-      imgEl.style.maxWidth = '120px';
-      imgEl.style.objectFit = 'contain';
-      imgEl.style.border = '1px solid #eee';
-      
-      const imgLabel = document.createElement('div');
-      imgLabel.textContent = `图片 ${index + 1}`;
-      imgLabel.style.fontSize = '12px';
-      imgLabel.style.marginTop = '5px';
-      
-      imgContainer.appendChild(imgEl);
-      imgContainer.appendChild(imgLabel);
-      imagesWrapper.appendChild(imgContainer);
-    });
-    
-    divPreview.appendChild(imagesWrapper);
-    
-    // 在模态框的描述下方添加图片预览
-    description.parentNode.insertBefore(divPreview, description.nextSibling);
-  }
-  
-  // 显示模态框
-  modal.style.display = 'flex';
-  
-  // 绑定事件
-  cancelBtn.onclick = closeImageUploadModal;
-  applyBtn.onclick = applyImageUpload;
-  
-  // 单个文件输入变化事件
-  singleFileInput.onchange = function(e) {
-    const file = e.target.files[0];
-    if (file) {
-      v.selectedSingleFile = file;
-      
-      const reader = new FileReader();
-      reader.onload = function(e) {
-        imagePreview.innerHTML = '';
-        const img = document.createElement('img');
-        img.src = e.target.result;
-        img.style.maxHeight = '200px';
-        img.style.marginBottom = '10px';
-        imagePreview.appendChild(img);
+import json
+import time
+import argparse
+from contextlib import contextmanager
+
+# bs4、tempfile 和编辑器载荷都比较重，只在用到它们的代码路径上才导入，
+# 使 --help、流式注入等路径的启动时间保持在几十毫秒以内
+# 启动预算可以用 python bench_html_edit.py --startup 检查
+
+# 编辑器载荷的三段字符串，定义在 html_edit_payload.py 中
+PAYLOAD_NAMES = ('EDITOR_STYLES', 'EDITOR_ELEMENTS', 'EDITOR_SCRIPTS')
+
+# 可选的编辑功能，按注入顺序排列（与 html_edit_payload.py 中的 FEATURES 保持一致）
+EDITOR_FEATURES = ('inspect', 'region', 'text', 'image')
+# 各功能注入的块ID（元素和按需加载的脚本块）
+FEATURE_BLOCK_IDS = {
+    'inspect': ('elementInspector', 'editor-chunk-inspect'),
+    'region': ('divEditorButtons', 'editor-chunk-region'),
+    'text': ('editor-chunk-text',),
+    'image': ('imageUploadModal', 'editor-chunk-image'),
+}
+# 各功能的说明
+FEATURE_DESCRIPTIONS = {
+    'inspect': '元素检查: 查看页面元素的结构和样式',
+    'region': '区域编辑: 复制或删除页面上的区域',
+    'text': '文本编辑: 直接编辑页面上的文本内容',
+    'image': '图片编辑: 上传新图片替换现有图片',
+}
+
+# 规范化功能列表：接受逗号分隔的字符串或名称序列，返回按注入顺序排列的元组
+# None 表示全部功能
+def normalize_features(features=None):
+    if features is None:
+        return EDITOR_FEATURES
+    if isinstance(features, str):
+        features = [name.strip() for name in features.split(',') if name.strip()]
+    unknown = [name for name in features if name not in EDITOR_FEATURES]
+    if unknown:
+        raise ValueError(f"不支持的编辑功能: {', '.join(unknown)}（可选: {', '.join(EDITOR_FEATURES)}）")
+    if not features:
+        raise ValueError('至少需要选择一个编辑功能')
+    return tuple(name for name in EDITOR_FEATURES if name in features)
+
+# 导入编辑器载荷模块（使用 __pycache__ 中预编译的缓存）
+def load_payload():
+    import html_edit_payload
+    return html_edit_payload
+
+# 兼容以前直接访问 html_edit.EDITOR_STYLES 等常量的代码
+def __getattr__(name):
+    if name in PAYLOAD_NAMES:
+        return getattr(load_payload(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 延迟导入BeautifulSoup
+def beautiful_soup(*args, **kwargs):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(*args, **kwargs)
+
+# 分阶段计时和内存统计
+class PhaseProfiler:
+    def __init__(self, enabled=False, track_memory=False, cprofile_dir=None, cprofile_phases=('parse', 'serialize')):
+        self.enabled = enabled or track_memory or bool(cprofile_dir)
+        self.track_memory = track_memory
+        self.cprofile_dir = cprofile_dir
+        self.cprofile_phases = cprofile_phases
+        self.phases = []
+    
+    # 开始统计（内存统计需要启动tracemalloc）
+    def start(self):
+        if self.track_memory:
+            import tracemalloc
+            tracemalloc.start()
+        return self
+    
+    # 结束统计
+    def stop(self):
+        if self.track_memory:
+            import tracemalloc
+            tracemalloc.stop()
+    
+    # 统计一个阶段
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
         
-        // 显示替换信息
-        const info = document.createElement('p');
-        
-        if (v.currentEditingType === 'single' && v.currentEditingImage) {
-          const originalSrc = v.currentEditingImage.src.split('/').pop();
-          info.innerHTML = `将替换: <strong>${originalSrc}</strong> → <strong>${file.name}</strong>`;
-        } else if (v.currentEditingType === 'background') {
-          const bgUrl = getBackgroundImageUrl(v.currentEditingElement);
-          const originalSrc = bgUrl ? bgUrl.split('/').pop() : '背景图';
-          info.innerHTML = `将替换背景图: <strong>${originalSrc}</strong> → <strong>${file.name}</strong>`;
-        } else if ((v.currentEditingType === 'carousel' || v.currentEditingType === 'container') && v.selectedImageIndex >= 0) {
-          const originalImg = v.containerImages[v.selectedImageIndex];
-          const originalSrc = originalImg.src.split('/').pop();
-          info.innerHTML = `将替换第 ${v.selectedImageIndex + 1} 张图片: <strong>${originalSrc}</strong> → <strong>${file.name}</strong>`;
-        }
-        
-        imagePreview.appendChild(info);
-      };
-      
-      reader.readAsDataURL(file);
-    }
-  };
-  
-  // 多个文件输入变化事件
-  multipleFileInput.onchange = function(e) {
-    const files = e.target.files;
-    if (files && files.length > 0) {
-      v.selectedMultipleFiles = files;
-      
-      multipleImagePreview.innerHTML = '';
-      
-      // 检查文件数量
-      if (files.length > v.containerImages.length) {
-        const warning = document.createElement('p');
-        warning.style.color = 'red';
-        warning.textContent = `警告: 您选择了${files.length}张图片，但${v.currentEditingType === 'carousel' ? '轮播图' : '区域'}中只有${v.containerImages.length}张图片。只有前${v.containerImages.length}张将被使用。`;
-        multipleImagePreview.appendChild(warning);
-      }
-      
-      // 显示替换预览
-      const previewContainer = document.createElement('div');
-      previewContainer.style.display = 'flex';
-      previewContainer.style.flexDirection = 'column';
-      previewContainer.style.gap = '15px';
-      
-      const maxToShow = Math.min(files.length, v.containerImages.length);
-      
-      // 添加标题
-      const title = document.createElement('h4');
-      title.textContent = '替换预览:';
-      title.style.margin = '10px 0';
-      previewContainer.appendChild(title);
-      
-      for (let i = 0; i < maxToShow; i++) {
-        const file = files[i];
-        const originalImg = v.containerImages[i];
+        tracemalloc = None
+        if self.track_memory:
+            import tracemalloc
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
         
-        const itemContainer = document.createElement('div');
-        itemContainer.style.width = '100%';
-        itemContainer.style.padding = '10px';
-        itemContainer.style.border = '1px solid #ddd';
-        itemContainer.style.borderRadius = '4px';
-        itemContainer.style.backgroundColor = '#f9f9f9';
+        profile = None
+        if self.cprofile_dir and name in self.cprofile_phases:
+            import cProfile
+            profile = cProfile.Profile()
+            profile.enable()
         
-        const originalSrc = originalImg.src.split('/').pop();
-        
-        const reader = new FileReader();
-        reader.onload = (function(index, origSrc, f) {
-          return function(e) {
-            const content = `
-              <div style="display: flex; align-items: center; gap: 15px;">
-                <div style="flex: 1; text-align: center;">
-                  <img src="${originalImg.src}" style="max-height: 100px; max-width: 100%; border: 1px solid #ddd;">
-                  <p style="margin: 5px 0 0 0; font-size: 12px; font-weight: bold;">${origSrc}</p>
-                </div>
-                <div style="font-size: 24px; color: #4285f4;">→</div>
-                <div style="flex: 1; text-align: center;">
-                  <img src="${e.target.result}" style="max-height: 100px; max-width: 100%; border: 1px solid #ddd;">
-                  <p style="margin: 5px 0 0 0; font-size: 12px; font-weight: bold;">${f.name}</p>
-                </div>
-              </div>
-              <p style="margin: 10px 0 0 0; text-align: center; background-color: #e8f0fe; padding: 5px; border-radius: 4px;">
-                替换第 ${index + 1} 张图片
-              </p>
-            `;
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            record = {'name': name, 'seconds': elapsed}
             
-            itemContainer.innerHTML = content;
-          };
-        })(i, originalSrc, file);
-        
-        reader.readAsDataURL(file);
-        previewContainer.appendChild(itemContainer);
-      }
-      
-      multipleImagePreview.appendChild(previewContainer);
-    }
-  };
-  
-  // 上传类型切换
-  const radioButtons = document.querySelectorAll('input[name="uploadType"]');
-  radioButtons.forEach(radio => {
-    radio.onchange = function() {
-      if (this.value === 'single') {
-        singleFileInput.style.display = 'block';
-        multipleFileInput.style.display = 'none';
-        imagePreview.style.display = 'block';
-        multipleImagePreview.style.display = 'none';
-        
-        // 显示图片选择器
-        const selector = document.getElementById('carousel-image-selector');
-        if (selector) selector.style.display = 'block';
-        
-        // 清空已选文件
-        multipleFileInput.value = '';
-        multipleImagePreview.innerHTML = '';
-        v.selectedMultipleFiles = null;
-      } else {
-        singleFileInput.style.display = 'none';
-        multipleFileInput.style.display = 'block';
-        imagePreview.style.display = 'none';
-        multipleImagePreview.style.display = 'block';
-        
-        // 隐藏图片选择器
-        const selector = document.getElementById('carousel-image-selector');
-        if (selector) selector.style.display = 'none';
-        
-        // 清空已选文件
-        singleFileInput.value = '';
-        imagePreview.innerHTML = '';
-        v.selectedSingleFile = null;
-      }
-    };
-  });
-  
-  // 如果是多张上传模式，触发change事件以初始化界面
-  if (v.currentEditingType === 'carousel' || v.currentEditingType === 'container') {
-    document.querySelector('input[name="uploadType"]:checked').dispatchEvent(new Event('change'));
-  }
-}
-
-// 创建轮播图选择器
-function createImageSelector(images) {
-  if (!images || images.length === 0) return;
-  
-  const v = window.editorVars;
-  const imagePreview = document.getElementById('imagePreview');
-  
-  // 清空选择器
-  const existingSelector = document.getElementById('carousel-image-selector');
-  if (existingSelector) {
-    existingSelector.remove();
-  }
-  
-  // 创建选择器容器
-  const selectorContainer = document.createElement('div');
-  selectorContainer.id = 'carousel-image-selector';
-  selectorContainer.style.marginBottom = '15px';
-  
-  // 添加标题
-  const title = document.createElement('p');
-  title.textContent = '选择要替换的图片:';
-  selectorContainer.appendChild(title);
-  
-  // 创建图片选择区
-  const selector = document.createElement('div');
-  selector.style.display = 'flex';
-  selector.style.flexWrap = 'wrap';
-  selector.style.gap = '10px';
-  
-  // 添加图片选项
-  images.forEach((img, index) => {
-    const option = document.createElement('div');
-    option.style.border = '2px solid transparent';
-    option.style.padding = '5px';
-    option.style.cursor = 'pointer';
-    option.style.borderRadius = '4px';
-    option.dataset.index = index;
-    
-    const thumbnail = document.createElement('img');
-    thumbnail.src = img.src;
-    thumbnail.style.height = '60px';
-    thumbnail.style.maxWidth = '100px';
-    thumbnail.style.objectFit = 'contain';
-    
-    const label = document.createElement('div');
-    label.textContent = `图片 ${index + 1}`;
-    label.style.fontSize = '12px';
-    label.style.textAlign = 'center';
-    label.style.marginTop = '5px';
-    
-    option.appendChild(thumbnail);
-    option.appendChild(label);
-    
-    // 点击事件
-    option.onclick = function() {
-      // 移除所有选中样式
-      selector.querySelectorAll('div[data-index]').forEach(el => {
-        el.style.border = '2px solid transparent';
-        el.style.backgroundColor = 'transparent';
-      });
-      
-      // 设置选中样式
-      this.style.border = '2px solid #4285f4';
-      this.style.backgroundColor = 'rgba(66, 133, 244, 0.1)';
-      
-      // 保存选中的索引
-      v.selectedImageIndex = parseInt(this.dataset.index);
-      
-      // 清空已选文件
-      document.getElementById('imageFileInput').value = '';
-      imagePreview.innerHTML = '';
-      v.selectedSingleFile = null;
-    };
-    
-    selector.appendChild(option);
-  });
-  
-  // 添加选择器到容器
-  selectorContainer.appendChild(selector);
-  
-  // 插入到模态框中
-  const uploadTypeToggle = document.getElementById('uploadTypeToggle');
-  uploadTypeToggle.parentNode.insertBefore(selectorContainer, uploadTypeToggle.nextSibling);
-  
-  // 默认选择第一张图片
-  selector.querySelector('div[data-index="0"]').click();
-}
-
-// 关闭图片上传模态框
-function closeImageUploadModal() {
-  const modal = document.getElementById('imageUploadModal');
-  if (modal) {
-    modal.style.display = 'none';
-  }
-  
-  // 清空临时变量
-  const v = window.editorVars;
-  v.selectedSingleFile = null;
-  v.selectedMultipleFiles = null;
-  
-  // 移除选择器
-  const selector = document.getElementById('carousel-image-selector');
-  if (selector) {
-    selector.remove();
-  }
-}
-
-// 应用图片上传事件
-function applyImageUpload() {
-  const v = window.editorVars;
-  const imageFileInput = document.getElementById('imageFileInput');
-  const multipleImageFileInput = document.getElementById('multipleImageFileInput');
-  
-  // 获取选中的单选按钮
-  const uploadType = document.querySelector('input[name="uploadType"]:checked')?.value || 'single';
-  
-  // 验证是否有选择文件
-  if (uploadType === 'single') {
-    // 使用v.selectedSingleFile而不是检查文件输入，因为我们已经在onchange中设置了它
-    if (!v.selectedSingleFile) {
-      alert('请选择图片');
-      return;
-    }
-    
-    const reader = new FileReader();
-    
-    reader.onload = function(e) {
-      if (v.currentEditingType === 'single' && v.currentEditingImage) {
-        // 保存原始图片路径
-        const originalSrc = v.currentEditingImage.src;
-        // 更新图片
-        v.currentEditingImage.src = e.target.result;
-        console.log(`已成功替换图片: ${originalSrc} -> ${v.selectedSingleFile.name}`);
-        
-        // 保存编辑的图片到本地存储
-        saveEditedImage(originalSrc, v.selectedSingleFile);
-      } else if (v.currentEditingType === 'background') {
-        // 更新背景图
-        v.currentEditingElement.style.backgroundImage = `url('${e.target.result}')`;
-        
-        // 保存编辑的背景图到本地存储
-        const bgUrl = getBackgroundImageUrl(v.currentEditingElement);
-        saveEditedImage(bgUrl, v.selectedSingleFile);
-        
-        console.log(`已成功替换背景图`);
-      } else if ((v.currentEditingType === 'carousel' || v.currentEditingType === 'container') && v.selectedImageIndex >= 0) {
-        // 保存原始图片路径
-        const originalSrc = v.containerImages[v.selectedImageIndex].src;
-        // 更新图片
-        v.containerImages[v.selectedImageIndex].src = e.target.result;
-        console.log(`已成功替换第 ${v.selectedImageIndex + 1} 张图片: ${originalSrc} -> ${v.selectedSingleFile.name}`);
-        
-        // 保存编辑的图片到本地存储
-        saveEditedImage(originalSrc, v.selectedSingleFile);
-      }
-      
-      // 关闭模态框
-      closeImageUploadModal();
-    };
-    
-    reader.readAsDataURL(v.selectedSingleFile);
-    
-  } else if (uploadType === 'multiple') {
-    // 检查是否有选中的多个文件
-    const files = multipleImageFileInput.files;
-    
-    if (!files || files.length === 0) {
-      alert('请选择图片');
-      return;
-    }
-    
-    // 检查选择的图片数量是否与容器图片数量匹配
-    if (files.length > v.containerImages.length) {
-      alert(`您选择了${files.length}张图片，但${v.currentEditingType === 'carousel' ? '轮播图' : '区域'}中只有${v.containerImages.length}张图片，只会使用前${v.containerImages.length}张图片`);
-    }
-    
-    // 处理多张图片上传
-    let processedCount = 0;
-    for (let i = 0; i < Math.min(files.length, v.containerImages.length); i++) {
-      const file = files[i];
-      const reader = new FileReader();
-      
-      reader.onload = (function(index) {
-        return function(e) {
-          // 保存原始图片路径
-          const originalSrc = v.containerImages[index].src;
-          // 更新图片
-          v.containerImages[index].src = e.target.result;
-          console.log(`已成功替换图片 ${index + 1}: ${originalSrc} -> ${files[index].name}`);
-          
-          // 保存编辑的图片到本地存储
-          saveEditedImage(originalSrc, files[index]);
-          
-          processedCount++;
-          // 如果所有图片都处理完毕，关闭模态框
-          if (processedCount === Math.min(files.length, v.containerImages.length)) {
-            closeImageUploadModal();
-          }
-        };
-      })(i);
-      
-      reader.readAsDataURL(file);
-    }
-  }
-}
-
-// 获取背景图URL
-function getBackgroundImageUrl(element) {
-  if (!element) return null;
-  
-  const bgImage = window.getComputedStyle(element).backgroundImage;
-  if (bgImage && bgImage !== 'none') {
-    // 提取url中的实际链接
-    const match = bgImage.match(/url\(['"]?(.*?)['"]?\)/);
-    if (match && match[1]) {
-      return match[1];
-    }
-  }
-  
-  return null;
-}
-
-// 初始化编辑器
-document.addEventListener('DOMContentLoaded', function() {
-  console.log('初始化编辑器...');
-  initEditor();
-});
-
-function makeElementEditable(root) {
-  console.log('[DEBUG] 使元素可编辑:', root ? root.tagName : 'null');
-  
-  if (!root) {
-    console.error('[ERROR] 无法使空元素可编辑');
-    return;
-  }
-  
-  // 获取所有文本元素
-  const textElements = root.querySelectorAll('p, h1, h2, h3, h4, h5, h6, span, div > strong, div > em, div > u, li, td, th, button, a');
-  console.log('[DEBUG] 找到文本元素数量:', textElements.length);
-  
-  // 保存元素原始样式以便恢复
-  const originalStyles = new Map();
-  
-  textElements.forEach(el => {
-    // 排除已经是可编辑的元素或编辑器自身的元素
-    if (el.contentEditable === 'true' || 
-        el.classList.contains('editor-button') ||
-        el.id === 'elementInspector' ||
-        el.id === 'imageUploadModal' ||
-        el.id === 'divEditorButtons' ||
-        el.parentElement && (
-          el.parentElement.id === 'elementInspector' ||
-          el.parentElement.id === 'imageUploadModal' ||
-          el.parentElement.id === 'divEditorButtons' ||
-          el.parentElement.classList.contains('editor-button')
-        )) {
-      return;
-    }
-    
-    // 检查元素是否包含实际文本内容（排除空白内容或只包含HTML元素的情况）
-    const text = el.textContent.trim();
-    if (!text) {
-      return; // 跳过没有文本内容的元素
-    }
-    
-    // 跳过包含大量子元素但自身文本内容很少的元素（可能是容器而非文本元素）
-    if (el.children.length > 5 && el.childNodes.length > 10 && text.length < 20) {
-      return;
-    }
-    
-    // 跳过包含表单元素的元素
-    if (el.querySelector('input, select, textarea, button')) {
-      return;
-    }
-    
-    try {
-      // 确保元素是相对定位，以支持伪元素
-      ensureRelativePosition(el);
-      
-      // 使元素可编辑，不修改其布局
-      el.contentEditable = 'true';
-      el.classList.add('text-editable');
-      
-      // 添加输入事件处理
-      el.addEventListener('input', function() {
-        // 保存编辑后的文本
-        const v = window.editorVars;
-        const path = getElementPath(this);
-        v.editedTextElements[path] = this.innerHTML;
-        localStorage.setItem('editedTexts', JSON.stringify(v.editedTextElements));
-        
-        // 更新页面修改时间
-        savePageState();
-      });
-      
-      // 添加焦点事件处理
-      el.addEventListener('focus', function() {
-        this.dataset.originalText = this.innerHTML;
-      });
-      
-      el.addEventListener('blur', function() {
-        // 如果文本已更改，记录更改
-        if (this.dataset.originalText !== this.innerHTML) {
-          console.log('[DEBUG] 文本已更改:', this.innerHTML);
-        }
-      });
-    } catch (error) {
-      console.error('[ERROR] 使元素可编辑失败:', error);
-    }
-  });
-  
-  // 保存原始样式以便稍后恢复
-  window.editorVars.originalTextStyles = originalStyles;
-  
-  console.log('[DEBUG] 文本编辑已启用');
-}
-
-// 移除文本编辑功能
-function removeTextEditability() {
-  console.log('[DEBUG] 移除文本编辑功能');
-  
-  // 获取所有可编辑的文本元素（包括可能遗漏的元素）
-  const editableElements = document.querySelectorAll('[contenteditable="true"], .text-editable');
-  console.log('[DEBUG] 找到可编辑文本元素数量:', editableElements.length);
-  
-  editableElements.forEach(el => {
-    try {
-      // 移除可编辑属性
-      el.contentEditable = 'false';
-      el.classList.remove('text-editable');
-      
-      // 清除所有样式修改
-      el.style.outline = '';
-      el.style.border = '';
-      el.style.padding = '';
-      el.style.margin = '';
-      el.style.cursor = '';
-      el.style.backgroundColor = '';
-      
-      // 移除所有事件监听器
-      const clone = el.cloneNode(true);
-      if (el.parentNode) {
-        el.parentNode.replaceChild(clone, el);
-      }
-      
-      // 确保克隆后的元素也不是可编辑的
-      clone.contentEditable = 'false';
-      clone.removeAttribute('contenteditable');
-    } catch (error) {
-      console.error('[ERROR] 移除文本编辑功能失败:', error);
-    }
-  });
-  
-  // 强制全局清除
-  document.querySelectorAll('[contenteditable], [style*="outline"], [style*="border"]').forEach(el => {
-    // 排除编辑器自身的元素
-    if (el.id === 'elementInspector' || 
-        el.classList.contains('editor-button') ||
-        el.id === 'imageUploadModal' ||
-        el.id === 'divEditorButtons' ||
-        el.closest('#imageUploadModal')) {
-      return;
-    }
-    
-    el.removeAttribute('contenteditable');
-    el.contentEditable = 'false';
-    
-    // 检查并清除可能影响布局的样式
-    if (el.getAttribute('style') && 
-        (el.getAttribute('style').includes('outline') || 
-         el.getAttribute('style').includes('border') || 
-         el.getAttribute('style').includes('margin') || 
-         el.getAttribute('style').includes('padding'))) {
-      el.style.outline = '';
-      el.style.border = '';
-      el.style.padding = '';
-      el.style.margin = '';
-    }
-  });
-  
-  console.log('[DEBUG] 文本编辑功能已移除');
-}
-
-// 应用保存的文本编辑
-function applyTextEdits() {
-  const v = window.editorVars;
-  console.log('[DEBUG] 应用保存的文本编辑');
-  
-  try {
-    // 遍历所有保存的文本编辑
-    for (const path in v.editedTextElements) {
-      try {
-        // 查找元素
-        const elements = document.querySelectorAll(path);
-        if (elements && elements.length > 0) {
-          // 更新第一个匹配的元素的内容
-          elements[0].innerHTML = v.editedTextElements[path];
-          console.log('[DEBUG] 已更新文本元素:', path);
-        } else {
-          console.warn('[WARN] 找不到路径对应的元素:', path);
-        }
-      } catch (error) {
-        console.error('[ERROR] 应用文本编辑失败:', error, path);
-      }
-    }
-  } catch (error) {
-    console.error('[ERROR] 应用保存的文本编辑失败:', error);
-  }
-}
-
-// 处理元素点击事件
-function handleElementClick(e) {
-  const v = window.editorVars;
-  console.log('[DEBUG] 处理元素点击事件');
-  
-  if (!v.isEditMode) {
-    console.log('[DEBUG] 编辑模式未启用，不处理点击');
-    return;
-  }
-  
-  // 阻止默认行为和事件冒泡
-  e.preventDefault();
-  e.stopPropagation();
-  
-  // 确保高亮元素存在
-  ensureHighlightElementsCreated();
-  
-  // 如果点击的是编辑器元素，不做任何处理
-  if (e.target.id === 'elementInspector' || 
-      e.target.id === 'divEditorButtons' || 
-      e.target.classList.contains('element-highlight') || 
-      e.target.classList.contains('editor-button') ||
-      e.target === document.getElementById('editDuplicateBtn') ||
-      e.target === document.getElementById('editRemoveBtn')) {
-    console.log('[DEBUG] 点击的是编辑器元素，忽略');
-    return;
-  }
-  
-  // 获取点击的div
-  const clickedElement = e.currentTarget;
-  console.log('[DEBUG] 点击的元素:', clickedElement.tagName);
-  
-  // 如果已经有选中的元素，移除选中状态
-  if (v.selectedElement) {
-    v.selectedElement.style.border = '';
-    v.selectedElement.style.boxShadow = '';
-    
-    // 隐藏编辑按钮
-    const editorButtons = document.getElementById('divEditorButtons');
-    if (editorButtons) {
-      editorButtons.style.display = 'none';
-    }
-    
-    console.log('[DEBUG] 移除先前选中元素的样式');
-  }
-  
-  // 更新选中的元素
-  if (v.selectedElement === clickedElement) {
-    // 如果再次点击同一个元素，取消选择
-    v.selectedElement = null;
-    hideEditorButtons();
-    console.log('[DEBUG] 取消选择元素');
-    return;
-  }
-  
-  // 设置新选中的元素
-  v.selectedElement = clickedElement;
-  
-  // 高亮显示选中的元素
-  v.selectedElement.style.border = '2px solid #34a853';
-  v.selectedElement.style.boxShadow = '0 0 10px rgba(52, 168, 83, 0.5)';
-  
-  // 显示编辑按钮
-  showEditorButtons(v.selectedElement);
-  
-  console.log('[DEBUG] 选中新元素，应用样式和显示按钮');
-}
-
-// 显示编辑按钮
-function showEditorButtons(element) {
-  console.log('[DEBUG] 显示编辑按钮');
-  if (!element) return;
-  
-  const buttons = document.getElementById('divEditorButtons');
-  if (!buttons) {
-    console.error('[ERROR] 找不到编辑按钮容器');
-    return;
-  }
-  
-  // 获取元素位置
-  const rect = element.getBoundingClientRect();
-  
-  // 设置按钮位置到右下角
-  buttons.style.display = 'flex';
-  buttons.style.position = 'absolute';
-  buttons.style.top = (rect.bottom + window.scrollY + 5) + 'px'; // 元素底部下方5px
-  buttons.style.left = (rect.right + window.scrollX - 90) + 'px'; // 元素右侧偏左90px
-  
-  console.log('[DEBUG] 编辑按钮已显示');
-}
-
-// 隐藏编辑按钮
-function hideEditorButtons() {
-  console.log('[DEBUG] 隐藏编辑按钮');
-  const buttons = document.getElementById('divEditorButtons');
-  if (buttons) {
-    buttons.style.display = 'none';
-    console.log('[DEBUG] 编辑按钮已隐藏');
-  }
-}
-
-// 复制元素
-function duplicateElement(element) {
-  console.log('[DEBUG] 复制元素');
-  if (!element) return;
-  
-  try {
-    // 创建元素的副本
-    const clone = element.cloneNode(true);
-    
-    // 移除可能的ID以避免重复ID
-    if (clone.id) {
-      clone.id = clone.id + '-copy';
-    }
-    
-    // 插入副本到原元素之后
-    if (element.parentNode) {
-      element.parentNode.insertBefore(clone, element.nextSibling);
-      console.log('[DEBUG] 元素已成功复制');
-      
-      // 保存页面修改状态
-      savePageState();
-    }
-  } catch (error) {
-    console.error('[ERROR] 复制元素失败:', error);
-  }
-}
-
-// 移除元素
-function removeElement(element) {
-  console.log('[DEBUG] 移除元素');
-  if (!element) return;
-  
-  try {
-    // 隐藏编辑按钮
-    hideEditorButtons();
-    
-    // 移除元素（不再需要确认）
-    if (element.parentNode) {
-      element.parentNode.removeChild(element);
-      console.log('[DEBUG] 元素已成功移除');
-      
-      // 重置选中的元素
-      window.editorVars.selectedElement = null;
-      
-      // 保存页面修改状态
-      savePageState();
-    }
-  } catch (error) {
-    console.error('[ERROR] 移除元素失败:', error);
-  }
-}
-
-// 应用页面修改
-function applyPageModifications() {
-  // 实现保存的页面修改逻辑
-  console.log('[DEBUG] 应用页面修改');
-}
-
-// 使所有图片可编辑
-function makeImagesEditable() {
-  console.log('[DEBUG] 使所有图片可编辑');
-  
-  // 清除之前的事件监听器
-  document.querySelectorAll('.image-editable').forEach(img => {
-    img.removeEventListener('click', handleImageEditClick);
-    img.classList.remove('image-editable');
-  });
-  
-  document.querySelectorAll('.bg-image-editable').forEach(el => {
-    el.removeEventListener('click', handleImageEditClick);
-    el.classList.remove('bg-image-editable');
-    el.removeAttribute('data-bg-editable');
-  });
-  
-  document.querySelectorAll('div').forEach(div => {
-    div.removeEventListener('click', handleImageEditClick);
-  });
-  
-  // 处理普通图片
-  let imageCount = 0;
-  document.querySelectorAll('img').forEach(img => {
-    // 排除编辑器元素的图片
-    if (img.closest('#elementInspector') || 
-        img.closest('#divEditorButtons') || 
-        img.closest('#imageUploadModal') ||
-        img.closest('.editor-button')) {
-      return;
-    }
-    
-    // 确保图片父元素是相对定位，以支持伪元素
-    if (img.parentElement) {
-      ensureRelativePosition(img.parentElement);
-    }
-    
-    // 仅添加类和事件监听器，不修改直接样式
-    img.classList.add('image-editable');
-    img.addEventListener('click', handleImageEditClick);
-    imageCount++;
-  });
-  
-  console.log(`[DEBUG] 添加了 ${imageCount} 张可编辑图片`);
-  
-  // 处理背景图片
-  let bgImageCount = 0;
-  document.querySelectorAll('*').forEach(el => {
-    // 排除已处理的元素和编辑器元素
-    if (el.classList.contains('bg-image-editable') || 
-        el.id === 'elementInspector' || 
-        el.id === 'divEditorButtons' ||
-        el.classList.contains('element-highlight') ||
-        el.classList.contains('editor-button') ||
-        el.closest('#imageUploadModal')) {
-      return;
-    }
-    
-    const style = window.getComputedStyle(el);
-    const bgImage = style.backgroundImage;
-    
-    if (bgImage && bgImage !== 'none' && !bgImage.includes('gradient')) {
-      // 确保元素是相对定位，以支持伪元素
-      ensureRelativePosition(el);
-      
-      el.classList.add('bg-image-editable');
-      el.setAttribute('data-bg-editable', 'true');
-      el.addEventListener('click', handleImageEditClick);
-      bgImageCount++;
-    }
-  });
-  
-  console.log(`[DEBUG] 添加了 ${bgImageCount} 个可编辑背景`);
-  
-  // 处理轮播图容器
-  const carouselContainers = [];
-  
-  // 查找可能的轮播图容器
-  document.querySelectorAll('.carousel, .swiper, .slider, [id*="carousel"], [id*="slider"], [class*="carousel"], [class*="slider"]').forEach(container => {
-    // 排除编辑器元素
-    if (container.closest('#elementInspector') || 
-        container.closest('#divEditorButtons') || 
-        container.closest('#imageUploadModal') ||
-        container.classList.contains('editor-button')) {
-      return;
-    }
-    
-    if (container.querySelectorAll('img').length > 1) {
-      carouselContainers.push(container);
-    }
-  });
-  
-  console.log(`[DEBUG] 找到 ${carouselContainers.length} 个轮播图`);
-  
-  // 标记轮播图容器
-  carouselContainers.forEach(container => {
-    container.classList.add('carousel-container-editable');
-    container.setAttribute('data-carousel-editable', 'true');
-    container.addEventListener('click', handleImageEditClick);
-    
-    // 添加提示标记
-    if (!container.querySelector('[data-carousel-hint]')) {
-      const hint = document.createElement('div');
-      hint.setAttribute('data-carousel-hint', 'true');
-      hint.style.position = 'absolute';
-      hint.style.top = '5px';
-      hint.style.right = '5px';
-      hint.style.backgroundColor = 'rgba(66, 133, 244, 0.8)';
-      hint.style.color = 'white';
-      hint.style.padding = '2px 5px';
-      hint.style.borderRadius = '3px';
-      hint.style.fontSize = '12px';
-      hint.style.zIndex = '1000';
-      hint.textContent = '轮播图 - 点击编辑';
-      
-      // 如果容器是相对定位，直接添加提示；否则，先设置相对定位
-      const containerStyle = window.getComputedStyle(container);
-      if (containerStyle.position === 'static') {
-        container.style.position = 'relative';
-      }
-      
-      container.appendChild(hint);
-    }
-  });
-  
-  // 处理包含图片的div容器 - 添加可点击编辑功能
-  let divWithImagesCount = 0;
-  document.querySelectorAll('div').forEach(div => {
-    // 排除已处理的元素和编辑器元素
-    if (div.id === 'elementInspector' || 
-        div.id === 'divEditorButtons' ||
-        div.classList.contains('element-highlight') ||
-        div.classList.contains('editor-button') ||
-        div.id === 'imageUploadModal' ||
-        div.closest('#imageUploadModal')) {
-      return;
-    }
-    
-    // 检查div是否包含图片
-    const images = div.querySelectorAll('img');
-    if (images.length === 0) {
-      return; // 没有图片的div直接跳过
-    }
-    
-    // 过滤出非编辑器的图片
-    const validImages = Array.from(images).filter(img => {
-      return !(img.closest('#elementInspector') || 
-              img.closest('#divEditorButtons') || 
-              img.closest('#imageUploadModal') ||
-              img.closest('.editor-button'));
-    });
-    
-    if (validImages.length > 0) {
-      // 加上特殊标记类，方便调试
-      div.classList.add('div-image-container');
-      div.setAttribute('data-images-count', validImages.length);
-      
-      // 直接使用简单的点击处理函数
-      div.addEventListener('click', function(e) {
-        console.log('[DEBUG] div点击事件触发', this.tagName, '包含图片数:', validImages.length);
-        // 防止冒泡
-        e.stopPropagation();
-        // 调用处理函数
-        handleImageEditClick.call(this, e);
-      });
-      
-      divWithImagesCount++;
-    }
-  });
-  
-  console.log(`[DEBUG] 添加了 ${divWithImagesCount} 个包含图片的div`);
-  
-  // 处理包含多个图片的链接容器
-  document.querySelectorAll('a').forEach(link => {
-    const images = link.querySelectorAll('img');
-    if (images.length > 0) {
-      link.setAttribute('data-image-editable-container', 'true');
-    }
-  });
-  
-  console.log('[DEBUG] 图片编辑已启用');
-}
-
-// 保存编辑的图片到本地存储
-function saveEditedImage(originalSrc, file) {
-  const v = window.editorVars;
-  
-  try {
-    // 读取文件为DataURL
-    const reader = new FileReader();
-    reader.onload = function(e) {
-      const dataUrl = e.target.result;
-      
-      // 根据编辑类型保存到不同的存储对象
-      if (v.currentEditingType === 'single') {
-        v.editedImages[originalSrc] = dataUrl;
-        localStorage.setItem('editedImages', JSON.stringify(v.editedImages));
-      } else if (v.currentEditingType === 'background') {
-        v.editedBackgroundImages[originalSrc] = dataUrl;
-        localStorage.setItem('editedBackgroundImages', JSON.stringify(v.editedBackgroundImages));
-      } else if (v.currentEditingType === 'carousel' || v.currentEditingType === 'container') {
-        v.editedCarouselImages[originalSrc] = dataUrl;
-        localStorage.setItem('editedCarouselImages', JSON.stringify(v.editedCarouselImages));
-      }
-      
-      // 更新页面修改时间
-      savePageState();
-      
-      console.log('[DEBUG] 图片编辑已保存:', originalSrc);
-    };
-    
-    reader.readAsDataURL(file);
-  } catch (error) {
-    console.error('[ERROR] 保存编辑的图片失败:', error);
-  }
-}
-
-// 应用图片编辑
-function applyImageEdits() {
-  const v = window.editorVars;
-  console.log('[DEBUG] 应用保存的图片编辑');
-  
-  try {
-    // 应用普通图片编辑
-    for (const originalSrc in v.editedImages) {
-      document.querySelectorAll(`img[src="${originalSrc}"]`).forEach(img => {
-        img.src = v.editedImages[originalSrc];
-      });
-    }
-    
-    // 应用背景图片编辑
-    for (const originalSrc in v.editedBackgroundImages) {
-      document.querySelectorAll('*').forEach(el => {
-        const style = window.getComputedStyle(el);
-        const bgImage = style.backgroundImage;
-        
-        if (bgImage && bgImage.includes(originalSrc)) {
-          el.style.backgroundImage = `url('${v.editedBackgroundImages[originalSrc]}')`;
-        }
-      });
-    }
-    
-    // 应用轮播图/容器图片编辑
-    for (const originalSrc in v.editedCarouselImages) {
-      document.querySelectorAll(`img[src="${originalSrc}"]`).forEach(img => {
-        img.src = v.editedCarouselImages[originalSrc];
-      });
-    }
-    
-    console.log('[DEBUG] 图片编辑已应用');
-  } catch (error) {
-    console.error('[ERROR] 应用图片编辑失败:', error);
-  }
-}
-
-// 移除区域编辑模式
-function removeEditModeFromDivs() {
-  console.log('[DEBUG] 移除所有DIV的编辑模式');
-  
-  // 清除选中样式和事件监听器
-  document.querySelectorAll('div').forEach(div => {
-    // 移除事件监听器和样式
-    div.removeEventListener('click', handleElementClick);
-    div.style.cursor = '';
-    
-    // 清除div上可能的高亮样式
-    if (div.classList.contains('div-selected')) {
-      div.classList.remove('div-selected');
-    }
-    
-    div.style.outline = '';
-    div.style.border = '';
-    div.style.boxShadow = '';
-  });
-  
-  // 重置选中元素
-  if (window.editorVars.selectedElement) {
-    window.editorVars.selectedElement.style.outline = '';
-    window.editorVars.selectedElement.style.border = '';
-    window.editorVars.selectedElement.style.boxShadow = '';
-    window.editorVars.selectedElement = null;
-  }
-  
-  // 隐藏编辑按钮
-  hideEditorButtons();
-  
-  // 隐藏高亮
-  hideHighlight();
-  hideHoverHighlight();
-  
-  console.log('[DEBUG] 区域编辑模式已移除');
-}
-
-// 处理图片编辑模式下的鼠标移动事件
-function handleImageEditMouseMove(e) {
-  const v = window.editorVars;
-  
-  if (!v.isImageEditMode) {
-    return;
-  }
-  
-  const element = document.elementFromPoint(e.clientX, e.clientY);
-  
-  // 忽略编辑器自身的元素
-  if (element && (
-      element.id === 'elementInspector' || 
-      element.id === 'divEditorButtons' || 
-      element.classList.contains('element-highlight') ||
-      element.classList.contains('editor-button') ||
-      element === document.getElementById('editDuplicateBtn') ||
-      element === document.getElementById('editRemoveBtn') ||
-      element.closest('#imageUploadModal'))) {
-    hideHoverHighlight();
-    return;
-  }
-  
-  // 查找最近的div元素
-  let targetDiv = element;
-  while (targetDiv && targetDiv.tagName.toLowerCase() !== 'div' && targetDiv !== document.body) {
-    targetDiv = targetDiv.parentElement;
-  }
-  
-  if (!targetDiv || targetDiv === document.body) {
-    hideHoverHighlight();
-    return;
-  }
-  
-  // 检查div是否包含图片（排除编辑器元素的图片）
-  const images = targetDiv.querySelectorAll('img');
-  let containsImages = false;
-  
-  for (const img of images) {
-    // 检查图片是否属于编辑器元素
-    const isEditorElement = img.closest('#elementInspector') || 
-                           img.closest('#divEditorButtons') || 
-                           img.closest('#imageUploadModal') ||
-                           img.closest('.editor-button');
-    if (!isEditorElement) {
-      containsImages = true;
-      break;
-    }
-  }
-  
-  if (!containsImages) {
-    hideHoverHighlight();
-    return;
-  }
-  
-  // 更新当前悬停元素
-  v.hoverElement = targetDiv;
-  
-  // 特殊标记，标明此div可编辑图片
-  if (!targetDiv.classList.contains('div-hover-highlight')) {
-    targetDiv.classList.add('div-hover-highlight');
-    targetDiv.style.cursor = 'pointer';
-  }
-  
-  // 显示高亮
-  highlightHoverElement(v.hoverElement);
-}
-
-// 全局清理函数 - 确保退出所有编辑模式后没有样式残留
-function clearAllEditModes() {
-  console.log('[DEBUG] 清理所有编辑模式样式残留');
-  
-  // 清除所有可能的高亮和样式改变
-  document.querySelectorAll('*').forEach(el => {
-    // 排除编辑器自身的元素
-    if (el.id === 'elementInspector' || 
-        el.classList.contains('editor-button') ||
-        el.id === 'imageUploadModal' ||
-        el.id === 'divEditorButtons' ||
-        el.closest('#imageUploadModal')) {
-      return;
-    }
-    
-    // 移除可能的类
-    if (el.classList.contains('text-editable')) el.classList.remove('text-editable');
-    if (el.classList.contains('image-editable')) el.classList.remove('image-editable');
-    if (el.classList.contains('bg-image-editable')) el.classList.remove('bg-image-editable');
-    if (el.classList.contains('carousel-container-editable')) el.classList.remove('carousel-container-editable');
-    if (el.classList.contains('div-selected')) el.classList.remove('div-selected');
-    if (el.classList.contains('div-image-container')) el.classList.remove('div-image-container');
-    if (el.classList.contains('div-hover-highlight')) el.classList.remove('div-hover-highlight');
-    
-    // 移除可能的属性
-    if (el.getAttribute('contenteditable')) el.removeAttribute('contenteditable');
-    if (el.getAttribute('data-bg-editable')) el.removeAttribute('data-bg-editable');
-    if (el.getAttribute('data-carousel-editable')) el.removeAttribute('data-carousel-editable');
-    if (el.getAttribute('data-container-editable')) el.removeAttribute('data-container-editable');
-    if (el.getAttribute('data-images-count')) el.removeAttribute('data-images-count');
-    
-    // 清除可能的内联样式
-    if (el.style) {
-      if (el.style.outline) el.style.outline = '';
-      if (el.style.border) el.style.border = '';
-      if (el.style.boxShadow) el.style.boxShadow = '';
-      if (el.style.backgroundColor && el.style.backgroundColor.includes('rgba(')) el.style.backgroundColor = '';
-    }
-  });
-  
-  // 隐藏所有编辑器UI
-  hideEditorButtons();
-  hideInspector();
-  hideHighlight();
-  hideHoverHighlight();
-  
-  // 关闭模态框
-  closeImageUploadModal();
-  
-  console.log('[DEBUG] 所有编辑模式样式已清理');
-}
-
-// 切换文本编辑模式
-buttons.textEditBtn.addEventListener('click', function() {
-  // 清除可能的旧事件处理程序
-  document.removeEventListener('mousemove', handleInspectorMouseMove);
-  document.removeEventListener('mousemove', handleMouseMove);
-  document.removeEventListener('mousemove', handleImageEditMouseMove);
-  
-  // 清理所有样式残留
-  clearAllEditModes();
-  
-  // 如果其他模式已开启，先关闭
-  if (v.isImageEditMode) {
-    v.isImageEditMode = false;
-    completelyRemoveImageEditability();
-    buttons.imageEditBtn.innerText = '启用图片编辑';
-    buttons.imageEditBtn.style.backgroundColor = '#4285f4';
-    buttons.imageEditBtn.style.color = '#fff';
-  }
-  
-  if (v.isInspecting) {
-    v.isInspecting = false;
-    hideInspector();
-    hideHighlight();
-    buttons.inspectBtn.innerText = '启用元素检查';
-    buttons.inspectBtn.style.backgroundColor = '#4285f4';
-  }
-  
-  if (v.isEditMode) {
-    v.isEditMode = false;
-    removeEditModeFromDivs();
-    buttons.editBtn.innerText = '启用区域编辑模式';
-    buttons.editBtn.style.backgroundColor = '#4285f4';
-  }
-  
-  v.isTextEditMode = !v.isTextEditMode;
-  
-  if (v.isTextEditMode) {
-    // 启用文本编辑模式
-    this.innerText = '禁用文本编辑';
-    this.style.backgroundColor = '#34a853';
-    
-    // 使所有文本元素可编辑
-    makeElementEditable(document.body);
-  } else {
-    // 禁用文本编辑模式
-    this.innerText = '启用文本编辑';
-    this.style.backgroundColor = '#4285f4';
-    
-    // 移除可编辑属性
-    removeTextEditability();
-  }
-});
-
-// 切换区域编辑模式
-buttons.editBtn.addEventListener('click', function(e) {
-  console.log('[DEBUG] 区域编辑按钮被点击', e.type);
-  console.log('[DEBUG] 点击前状态:', { 
-    isEditMode: v.isEditMode,
-    isInspecting: v.isInspecting, 
-    isTextEditMode: v.isTextEditMode,
-    isImageEditMode: v.isImageEditMode
-  });
-  
-  // 清除可能的旧事件处理程序
-  document.removeEventListener('mousemove', handleInspectorMouseMove);
-  document.removeEventListener('mousemove', handleMouseMove);
-  document.removeEventListener('mousemove', handleImageEditMouseMove);
-  
-  // 清理所有样式残留
-  clearAllEditModes();
-  
-  // 如果其他模式已开启，先关闭
-  if (v.isInspecting) {
-    console.log('[DEBUG] 关闭元素检查模式');
-    v.isInspecting = false;
-    hideInspector();
-    hideHighlight();
-    buttons.inspectBtn.innerText = '启用元素检查';
-    buttons.inspectBtn.style.backgroundColor = '#4285f4';
-  }
-  
-  if (v.isTextEditMode) {
-    console.log('[DEBUG] 关闭文本编辑模式');
-    v.isTextEditMode = false;
-    removeTextEditability();
-    buttons.textEditBtn.innerText = '启用文本编辑';
-    buttons.textEditBtn.style.backgroundColor = '#4285f4';
-  }
-  
-  if (v.isImageEditMode) {
-    console.log('[DEBUG] 关闭图片编辑模式');
-    v.isImageEditMode = false;
-    completelyRemoveImageEditability();
-    buttons.imageEditBtn.innerText = '启用图片编辑';
-    buttons.imageEditBtn.style.backgroundColor = '#4285f4';
-    buttons.imageEditBtn.style.color = '#fff';
-  }
-  
-  // 切换区域编辑状态
-  v.isEditMode = !v.isEditMode;
-  console.log('[DEBUG] 区域编辑模式切换为:', v.isEditMode);
-  
-  if (v.isEditMode) {
-    console.log('[DEBUG] 启用区域编辑模式');
-    this.innerText = '禁用区域编辑模式';
-    this.style.backgroundColor = '#ea4335';
-    
-    try {
-      // 应用区域编辑模式
-      console.log('[DEBUG] 尝试应用区域编辑模式');
-      applyEditModeToDivs();
-      console.log('[DEBUG] 区域编辑模式应用成功');
-      
-      // 绑定鼠标移动事件处理程序
-      console.log('[DEBUG] 尝试绑定鼠标移动事件');
-      document.addEventListener('mousemove', handleMouseMove);
-      console.log('[DEBUG] 鼠标移动事件绑定成功');
-    } catch (error) {
-      console.error('[ERROR] 应用区域编辑模式失败:', error);
-    }
-  } else {
-    console.log('[DEBUG] 禁用区域编辑模式');
-    this.innerText = '启用区域编辑模式';
-    this.style.backgroundColor = '#4285f4';
-    
-    try {
-      // 移除区域编辑模式
-      console.log('[DEBUG] 尝试移除区域编辑模式');
-      removeEditModeFromDivs();
-      console.log('[DEBUG] 区域编辑模式移除成功');
-      
-      // 解绑鼠标移动事件处理程序
-      document.removeEventListener('mousemove', handleMouseMove);
-      console.log('[DEBUG] 鼠标移动事件解绑成功');
-    } catch (error) {
-      console.error('[ERROR] 移除区域编辑模式失败:', error);
-    }
-  }
-  console.log('[DEBUG] 区域编辑模式切换完成');
-});
-
-// 切换图片编辑模式
-buttons.imageEditBtn.addEventListener('click', function() {
-  // 清除可能的旧事件处理程序
-  document.removeEventListener('mousemove', handleInspectorMouseMove);
-  document.removeEventListener('mousemove', handleMouseMove);
-  document.removeEventListener('mousemove', handleImageEditMouseMove);
-  
-  // 清理所有样式残留
-  clearAllEditModes();
-  
-  // 如果其他模式已开启，先关闭
-  if (v.isTextEditMode) {
-    v.isTextEditMode = false;
-    removeTextEditability();
-    buttons.textEditBtn.innerText = '启用文本编辑';
-    buttons.textEditBtn.style.backgroundColor = '#4285f4';
-  }
-  
-  if (v.isInspecting) {
-    v.isInspecting = false;
-    hideInspector();
-    hideHighlight();
-    buttons.inspectBtn.innerText = '启用元素检查';
-    buttons.inspectBtn.style.backgroundColor = '#4285f4';
-  }
-  
-  if (v.isEditMode) {
-    v.isEditMode = false;
-    removeEditModeFromDivs();
-    buttons.editBtn.innerText = '启用区域编辑模式';
-    buttons.editBtn.style.backgroundColor = '#4285f4';
-  }
-  
-  v.isImageEditMode = !v.isImageEditMode;
-  
-  if (v.isImageEditMode) {
-    // 启用图片编辑模式
-    this.innerText = '禁用图片编辑';
-    this.style.backgroundColor = '#fbbc05';
-    this.style.color = '#000';
-    
-    console.log('[DEBUG] 正在启用图片编辑模式...');
-    
-    // 使所有图片元素可编辑
-    makeImagesEditable();
-    
-    // 阻止链接点击事件
-    document.querySelectorAll('a[data-image-editable-container="true"]').forEach(link => {
-      link.addEventListener('click', preventLinkClick);
-    });
-    
-    // 显示容器编辑图标
-    document.querySelectorAll('[data-container-editable="true"] .container-edit-icon').forEach(icon => {
-      if (icon) {
-        icon.style.display = 'block';
-      }
-    });
-    
-    // 添加鼠标移动事件来高亮div
-    document.addEventListener('mousemove', handleImageEditMouseMove);
-    
-    console.log('[DEBUG] 图片编辑模式已启用，可以点击div或图片');
-  } else {
-    // 禁用图片编辑模式
-    this.innerText = '启用图片编辑';
-    this.style.backgroundColor = '#4285f4';
-    this.style.color = '#fff';
-    
-    // 使用增强的清理函数
-    completelyRemoveImageEditability();
-    
-    // 恢复链接点击行为
-    document.querySelectorAll('a[data-image-editable-container="true"]').forEach(link => {
-      link.removeEventListener('click', preventLinkClick);
-      link.removeAttribute('data-image-editable-container');
-    });
-    
-    // 移除鼠标移动事件监听
-    document.removeEventListener('mousemove', handleImageEditMouseMove);
-    
-    // 隐藏高亮
-    hideHoverHighlight();
-    
-    // 移除所有div-hover-highlight类
-    document.querySelectorAll('.div-hover-highlight').forEach(div => {
-      div.classList.remove('div-hover-highlight');
-      div.style.cursor = '';
-    });
-    
-    // 移除所有div-image-container类
-    document.querySelectorAll('.div-image-container').forEach(div => {
-      div.classList.remove('div-image-container');
-      div.removeAttribute('data-images-count');
-    });
-  }
-});
-
-// 切换元素检查模式
-buttons.inspectBtn.addEventListener('click', function(e) {
-  console.log('[DEBUG] 元素检查按钮被点击', e.type);
-  console.log('[DEBUG] 点击前状态:', { 
-    isInspecting: v.isInspecting,
-    isTextEditMode: v.isTextEditMode,
-    isImageEditMode: v.isImageEditMode,
-    isEditMode: v.isEditMode
-  });
-  
-  // 清除可能的旧事件处理程序
-  document.removeEventListener('mousemove', handleInspectorMouseMove);
-  document.removeEventListener('mousemove', handleMouseMove);
-  document.removeEventListener('mousemove', handleImageEditMouseMove);
-  
-  // 清理所有样式残留
-  clearAllEditModes();
-  
-  // 如果其他模式已开启，先关闭
-  if (v.isTextEditMode) {
-    console.log('[DEBUG] 关闭文本编辑模式');
-    v.isTextEditMode = false;
-    removeTextEditability();
-    buttons.textEditBtn.innerText = '启用文本编辑';
-    buttons.textEditBtn.style.backgroundColor = '#4285f4';
-  }
-  
-  if (v.isImageEditMode) {
-    console.log('[DEBUG] 关闭图片编辑模式');
-    v.isImageEditMode = false;
-    completelyRemoveImageEditability();
-    buttons.imageEditBtn.innerText = '启用图片编辑';
-    buttons.imageEditBtn.style.backgroundColor = '#4285f4';
-    buttons.imageEditBtn.style.color = '#fff';
-  }
-  
-  if (v.isEditMode) {
-    console.log('[DEBUG] 关闭区域编辑模式');
-    v.isEditMode = false;
-    removeEditModeFromDivs();
-    buttons.editBtn.innerText = '启用区域编辑模式';
-    buttons.editBtn.style.backgroundColor = '#4285f4';
-  }
-  
-  // 切换检查模式状态
-  v.isInspecting = !v.isInspecting;
-  console.log('[DEBUG] 检查模式切换为:', v.isInspecting);
-  
-  if (v.isInspecting) {
-    console.log('[DEBUG] 启用元素检查');
-    this.innerText = '禁用元素检查';
-    this.style.backgroundColor = '#ea4335';
-    
-    try {
-      // 绑定鼠标移动事件处理程序
-      console.log('[DEBUG] 尝试绑定检查器鼠标移动事件');
-      document.addEventListener('mousemove', handleInspectorMouseMove);
-      console.log('[DEBUG] 检查器鼠标移动事件绑定成功');
-    } catch (error) {
-      console.error('[ERROR] 绑定检查器鼠标移动事件失败:', error);
-    }
-  } else {
-    console.log('[DEBUG] 禁用元素检查');
-    this.innerText = '启用元素检查';
-    this.style.backgroundColor = '#4285f4';
-    
-    try {
-      // 隐藏检查器和高亮
-      console.log('[DEBUG] 尝试隐藏检查器和高亮');
-      hideInspector();
-      hideHighlight();
-      console.log('[DEBUG] 检查器和高亮隐藏成功');
-      
-      // 解绑鼠标移动事件处理程序
-      document.removeEventListener('mousemove', handleInspectorMouseMove);
-      console.log('[DEBUG] 检查器鼠标移动事件解绑成功');
-    } catch (error) {
-      console.error('[ERROR] 隐藏检查器或解绑事件失败:', error);
-    }
-  }
-  console.log('[DEBUG] 元素检查模式切换完成');
-});
-
-// 确保图片元素相对定位，以支持伪元素
-function ensureRelativePosition(element) {
-  // 获取当前computed样式
-  const computedStyle = window.getComputedStyle(element);
-  
-  // 只有当元素不是relative、absolute或fixed时才设置relative
-  if (computedStyle.position === 'static') {
-    element.style.position = 'relative';
-  }
-}
-
-// 图片上传模态框代码
-function setupImageUploadModal() {
-  const modal = document.createElement('div');
-  modal.id = 'imageUploadModal';
-  
-  modal.innerHTML = `
-    <div class="modal-content">
-      <h3 class="modal-title">上传图片</h3>
-      
-      <div id="imageUploadSelection">
-        <label>
-          <input type="radio" name="uploadType" value="single" checked> 替换单张图片
-        </label>
-        <label>
-          <input type="radio" name="uploadType" value="multiple"> 批量替换多张图片
-        </label>
-      </div>
-      
-      <div id="singleUploadSection">
-        <input type="file" id="imageFileInput" accept="image/*">
-      </div>
-      
-      <div id="multipleUploadSection" style="display: none;">
-        <input type="file" id="multipleImageFileInput" accept="image/*" multiple>
-      </div>
-      
-      <div id="imageList" style="margin-top: 15px; max-height: 200px; overflow-y: auto;"></div>
-      
-      <div id="imagePreview"></div>
-      
-      <div class="modal-buttons">
-        <button id="cancelImageUpload" class="modal-button">取消</button>
-        <button id="applyImageUpload" class="modal-button">应用</button>
-      </div>
-    </div>
-  `;
-  
-  document.body.appendChild(modal);
-  
-  // 获取元素引用
-  const singleUploadSection = document.getElementById('singleUploadSection');
-  const multipleUploadSection = document.getElementById('multipleUploadSection');
-  const uploadTypeRadios = document.querySelectorAll('input[name="uploadType"]');
-  const singleFileInput = document.getElementById('imageFileInput');
-  const multipleFileInput = document.getElementById('multipleImageFileInput');
-  const imagePreview = document.getElementById('imagePreview');
-  const imageList = document.getElementById('imageList');
-  const cancelButton = document.getElementById('cancelImageUpload');
-  const applyButton = document.getElementById('applyImageUpload');
-  
-  console.log('[DEBUG] 图片上传模态框设置完成');
-  console.log('[DEBUG] 单文件输入元素:', singleFileInput ? 'OK' : 'NOT FOUND');
-  console.log('[DEBUG] 多文件输入元素:', multipleFileInput ? 'OK' : 'NOT FOUND');
-  
-  // 切换上传类型
-  uploadTypeRadios.forEach(radio => {
-    radio.addEventListener('change', function() {
-      console.log('[DEBUG] 切换上传类型:', this.value);
-      if (this.value === 'single') {
-        singleUploadSection.style.display = 'block';
-        multipleUploadSection.style.display = 'none';
-      } else {
-        singleUploadSection.style.display = 'none';
-        multipleUploadSection.style.display = 'block';
-      }
-    });
-  });
-  
-  // 单个文件输入变化事件 - 完全重写
-  singleFileInput.addEventListener('change', function(e) {
-    console.log('[DEBUG] 单文件输入变化, 文件数量:', e.target.files.length);
-    
-    const file = e.target.files[0];
-    if (file) {
-      console.log('[DEBUG] 已选择文件:', file.name, file.type, file.size);
-      
-      // 显式设置全局变量
-      window.editorVars.selectedSingleFile = file;
-      console.log('[DEBUG] 已设置 selectedSingleFile:', file.name);
-      
-      // 创建预览
-      const reader = new FileReader();
-      reader.onload = function(e) {
-        console.log('[DEBUG] 文件读取完成');
-        imagePreview.innerHTML = '';
-        
-        const img = document.createElement('img');
-        img.src = e.target.result;
-        img.style.maxHeight = '200px';
-        img.style.marginBottom = '10px';
-        imagePreview.appendChild(img);
-        
-        // 显示替换信息
-        const info = document.createElement('p');
-        const v = window.editorVars;
-        
-        if (v.currentEditingType === 'single' && v.currentEditingImage) {
-          const originalSrc = v.currentEditingImage.src.split('/').pop();
-          info.innerHTML = `将替换: <strong>${originalSrc}</strong> → <strong>${file.name}</strong>`;
-        } else if (v.currentEditingType === 'background') {
-          const bgUrl = getBackgroundImageUrl(v.currentEditingElement);
-          const originalSrc = bgUrl ? bgUrl.split('/').pop() : '背景图';
-          info.innerHTML = `将替换背景图: <strong>${originalSrc}</strong> → <strong>${file.name}</strong>`;
-        } else if ((v.currentEditingType === 'carousel' || v.currentEditingType === 'container') && v.selectedImageIndex >= 0) {
-          const originalImg = v.containerImages[v.selectedImageIndex];
-          const originalSrc = originalImg.src.split('/').pop();
-          info.innerHTML = `将替换第 ${v.selectedImageIndex + 1} 张图片: <strong>${originalSrc}</strong> → <strong>${file.name}</strong>`;
-        }
-        
-        imagePreview.appendChild(info);
-      };
-      
-      reader.readAsDataURL(file);
-    } else {
-      console.log('[DEBUG] 没有选择文件');
-      imagePreview.innerHTML = '';
-      window.editorVars.selectedSingleFile = null;
-    }
-  });
-  
-  // 多个文件输入变化事件
-  multipleFileInput.addEventListener('change', function(e) {
-    console.log('[DEBUG] 多文件输入变化, 文件数量:', e.target.files.length);
-    
-    const files = e.target.files;
-    if (files && files.length > 0) {
-      imagePreview.innerHTML = '';
-      
-      // 显示预览
-      const previewContainer = document.createElement('div');
-      previewContainer.style.display = 'flex';
-      previewContainer.style.flexWrap = 'wrap';
-      previewContainer.style.gap = '10px';
-      
-      for (let i = 0; i < Math.min(files.length, 5); i++) {
-        const file = files[i];
-        const reader = new FileReader();
-        
-        reader.onload = (function(file, index) {
-          return function(e) {
-            const imgContainer = document.createElement('div');
-            imgContainer.style.textAlign = 'center';
+            if profile is not None:
+                profile.disable()
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                prof_path = os.path.join(self.cprofile_dir, f"{name}.prof")
+                profile.dump_stats(prof_path)
+                record['cprofile'] = prof_path
             
-            const img = document.createElement('img');
-            img.src = e.target.result;
-            img.style.maxHeight = '100px';
-            img.style.marginBottom = '5px';
+            if tracemalloc is not None:
+                current, peak = tracemalloc.get_traced_memory()
+                record['alloc_bytes'] = current - before
+                record['peak_bytes'] = peak - before
             
-            const label = document.createElement('div');
-            label.textContent = file.name.length > 15 ? file.name.substring(0, 12) + '...' : file.name;
-            label.style.fontSize = '12px';
-            
-            imgContainer.appendChild(img);
-            imgContainer.appendChild(label);
-            previewContainer.appendChild(imgContainer);
-          };
-        })(file, i);
-        
-        reader.readAsDataURL(file);
-      }
-      
-      imagePreview.appendChild(previewContainer);
-      
-      if (files.length > 5) {
-        const moreInfo = document.createElement('p');
-        moreInfo.textContent = `还有 ${files.length - 5} 张图片未显示预览`;
-        imagePreview.appendChild(moreInfo);
-      }
-    } else {
-      imagePreview.innerHTML = '';
-    }
-  });
-  
-  // 取消按钮
-  cancelButton.addEventListener('click', function() {
-    console.log('[DEBUG] 取消图片上传');
-    closeImageUploadModal();
-  });
-  
-  // 应用按钮
-  applyButton.addEventListener('click', function() {
-    console.log('[DEBUG] 应用图片上传');
-    applyImageUpload();
-  });
-  
-  // 点击模态框背景关闭
-  modal.addEventListener('click', function(e) {
-    if (e.target === modal) {
-      console.log('[DEBUG] 点击背景关闭模态框');
-      closeImageUploadModal();
-    }
-  });
-  
-  return modal;
-}
-
-// 显示图片上传模态框
-function showImageUploadModal(type, element, index) {
-  console.log('[DEBUG] 显示图片上传模态框:', type, element, index);
-  
-  const v = window.editorVars;
-  
-  // 重置模态框状态
-  v.currentEditingType = type;
-  v.currentEditingElement = element;
-  v.currentEditingImage = type === 'single' ? element : null;
-  v.selectedImageIndex = index;
-  v.selectedSingleFile = null;
-  
-  // 创建模态框（如果不存在）
-  let modal = document.getElementById('imageUploadModal');
-  if (!modal) {
-    console.log('[DEBUG] 创建新的图片上传模态框');
-    modal = setupImageUploadModal();
-  }
-  
-  // 清空预览
-  const imagePreview = document.getElementById('imagePreview');
-  if (imagePreview) {
-    imagePreview.innerHTML = '';
-  }
-  
-  // 清空文件输入
-  const singleFileInput = document.getElementById('imageFileInput');
-  const multipleFileInput = document.getElementById('multipleImageFileInput');
-  
-  if (singleFileInput) {
-    singleFileInput.value = ''; // 清空文件输入
-    console.log('[DEBUG] 单文件输入重置');
-  }
-  
-  if (multipleFileInput) {
-    multipleFileInput.value = '';
-    console.log('[DEBUG] 多文件输入重置');
-  }
-  
-  // 根据类型设置上传选项
-  const singleRadio = document.querySelector('input[name="uploadType"][value="single"]');
-  const multipleRadio = document.querySelector('input[name="uploadType"][value="multiple"]');
-  const singleUploadSection = document.getElementById('singleUploadSection');
-  const multipleUploadSection = document.getElementById('multipleUploadSection');
-  
-  if (type === 'single' || type === 'background') {
-    // 单图模式
-    if (singleRadio) singleRadio.checked = true;
-    if (singleUploadSection) singleUploadSection.style.display = 'block';
-    if (multipleUploadSection) multipleUploadSection.style.display = 'none';
-    console.log('[DEBUG] 设置为单图上传模式');
-  } else {
-    // 多图模式（轮播或容器）
-    if (multipleRadio) multipleRadio.checked = true;
-    if (singleUploadSection) singleUploadSection.style.display = 'none';
-    if (multipleUploadSection) multipleUploadSection.style.display = 'block';
-    console.log('[DEBUG] 设置为多图上传模式');
-  }
-  
-  // 显示模态框
-  modal.style.display = 'flex';
-}
-
-// 关闭图片上传模态框
-function closeImageUploadModal() {
-  console.log('[DEBUG] 关闭图片上传模态框');
-  
-  const modal = document.getElementById('imageUploadModal');
-  if (modal) {
-    modal.style.display = 'none';
-  }
-  
-  // 清空状态
-  const v = window.editorVars;
-  v.currentEditingType = null;
-  v.currentEditingElement = null;
-  v.currentEditingImage = null;
-  v.selectedImageIndex = -1;
-  v.selectedSingleFile = null;
-}
-
-// 应用图片上传
-function applyImageUpload() {
-  console.log('[DEBUG] 开始应用图片上传');
-  
-  const v = window.editorVars;
-  const imageFileInput = document.getElementById('imageFileInput');
-  const multipleImageFileInput = document.getElementById('multipleImageFileInput');
-  
-  // 获取选中的单选按钮
-  const uploadType = document.querySelector('input[name="uploadType"]:checked')?.value || 'single';
-  console.log('[DEBUG] 上传类型:', uploadType);
-  
-  if (uploadType === 'single') {
-    // 检查是否有选中的单个文件
-    console.log('[DEBUG] 检查单个文件: selectedSingleFile =', v.selectedSingleFile ? v.selectedSingleFile.name : 'null');
-    
-    if (!v.selectedSingleFile) {
-      console.log('[ERROR] 未选择单个文件!');
-      
-      // 检查input中是否有文件
-      if (imageFileInput && imageFileInput.files && imageFileInput.files.length > 0) {
-        v.selectedSingleFile = imageFileInput.files[0];
-        console.log('[DEBUG] 从input获取文件:', v.selectedSingleFile.name);
-      } else {
-        console.log('[DEBUG] input中也没有文件');
-        alert('请选择图片');
-        return;
-      }
-    }
-    
-    console.log('[DEBUG] 准备处理单个文件:', v.selectedSingleFile.name);
-    
-    const reader = new FileReader();
-    
-    reader.onload = function(e) {
-      console.log('[DEBUG] 文件读取完成，准备替换图片');
-      
-      if (v.currentEditingType === 'single' && v.currentEditingImage) {
-        // 保存原始图片路径
-        const originalSrc = v.currentEditingImage.src;
-        console.log('[DEBUG] 单图替换: 原路径 =', originalSrc);
-        
-        // 更新图片
-        v.currentEditingImage.src = e.target.result;
-        console.log('[DEBUG] 单图替换成功:', v.selectedSingleFile.name);
-        
-        // 保存编辑的图片到本地存储
-        saveEditedImage(originalSrc, v.selectedSingleFile);
-      } else if (v.currentEditingType === 'background') {
-        // 更新背景图
-        console.log('[DEBUG] 背景图替换');
-        v.currentEditingElement.style.backgroundImage = `url('${e.target.result}')`;
-        
-        // 保存编辑的背景图到本地存储
-        const bgUrl = getBackgroundImageUrl(v.currentEditingElement);
-        saveEditedImage(bgUrl, v.selectedSingleFile);
-        
-        console.log('[DEBUG] 背景图替换成功');
-      } else if ((v.currentEditingType === 'carousel' || v.currentEditingType === 'container') && v.selectedImageIndex >= 0) {
-        console.log('[DEBUG] 轮播/容器图片替换: 索引 =', v.selectedImageIndex);
-        
-        // 保存原始图片路径
-        const originalImg = v.containerImages[v.selectedImageIndex];
-        const originalSrc = originalImg.src;
-        console.log('[DEBUG] 轮播/容器原图路径 =', originalSrc);
-        
-        // 更新图片
-        originalImg.src = e.target.result;
-        console.log('[DEBUG] 轮播/容器图片替换成功:', v.selectedSingleFile.name);
-        
-        // 保存编辑的图片到本地存储
-        saveEditedImage(originalSrc, v.selectedSingleFile);
-      } else {
-        console.log('[ERROR] 无法确定要替换的图片类型或元素');
-      }
-      
-      // 关闭模态框
-      closeImageUploadModal();
-    };
-    
-    reader.onerror = function(error) {
-      console.error('[ERROR] 文件读取失败:', error);
-      alert('图片读取失败，请重试');
-    };
-    
-    console.log('[DEBUG] 开始读取文件...');
-    reader.readAsDataURL(v.selectedSingleFile);
-    
-  } else if (uploadType === 'multiple') {
-    // 检查是否有选中的多个文件
-    const files = multipleImageFileInput.files;
-    console.log('[DEBUG] 多文件数量:', files ? files.length : 0);
-    
-    if (!files || files.length === 0) {
-      console.log('[ERROR] 未选择多个文件!');
-      alert('请选择图片');
-      return;
-    }
-    
-    // 检查选择的图片数量是否与容器图片数量匹配
-    if (files.length > v.containerImages.length) {
-      console.log('[WARN] 选择的图片数量超过容器图片数量');
-      alert(`您选择了${files.length}张图片，但${v.currentEditingType === 'carousel' ? '轮播图' : '区域'}中只有${v.containerImages.length}张图片，只会使用前${v.containerImages.length}张图片`);
-    }
-    
-    // 处理多张图片上传
-    let processedCount = 0;
-    const totalToProcess = Math.min(files.length, v.containerImages.length);
-    console.log('[DEBUG] 准备处理多文件, 总数:', totalToProcess);
-    
-    for (let i = 0; i < totalToProcess; i++) {
-      const file = files[i];
-      console.log('[DEBUG] 处理第', i+1, '个文件:', file.name);
-      
-      const reader = new FileReader();
-      
-      reader.onload = (function(index) {
-        return function(e) {
-          // 保存原始图片路径
-          const originalSrc = v.containerImages[index].src;
-          console.log('[DEBUG] 多图替换 #', index+1, ': 原路径 =', originalSrc);
-          
-          // 更新图片
-          v.containerImages[index].src = e.target.result;
-          console.log('[DEBUG] 多图替换 #', index+1, '成功');
-          
-          // 保存编辑的图片到本地存储
-          saveEditedImage(originalSrc, files[index]);
-          
-          processedCount++;
-          console.log('[DEBUG] 已处理:', processedCount, '/', totalToProcess);
-          
-          // 如果所有图片都处理完毕，关闭模态框
-          if (processedCount === totalToProcess) {
-            console.log('[DEBUG] 所有图片处理完毕，关闭模态框');
-            closeImageUploadModal();
-          }
-        };
-      })(i);
-      
-      reader.onerror = (function(index) {
-        return function(error) {
-          console.error('[ERROR] 文件', index+1, '读取失败:', error);
-          
-          processedCount++;
-          if (processedCount === totalToProcess) {
-            closeImageUploadModal();
-          }
-        };
-      })(i);
-      
-      reader.readAsDataURL(file);
-    }
-  }
-}
-
-// 初始化编辑器变量
-function initEditorVars() {
-  // 创建全局变量对象
-  window.editorVars = {
-    elementInspectorVisible: false,
-    selectedElement: null,
-    editModeActive: false,
-    textEditModeActive: false,
-    imageEditModeActive: false,
-    elementInspectModeActive: false,
-    editedElements: {},
-    editedTextElements: {},
-    editedImages: {},
-    editedOrder: [],
-    undoStack: [],
-    redoStack: [],
-    originalTextStyles: new Map(),
-    currentEditingType: null,        // 'single', 'background', 'carousel', 'container'
-    currentEditingElement: null,     // 当前正在编辑的元素
-    currentEditingImage: null,       // 当前正在编辑的图片
-    containerImages: [],             // 容器或轮播图中的所有图片
-    selectedImageIndex: -1,          // 选中的图片索引
-    selectedSingleFile: null,        // 选中的单个文件
-    divHoverHighlightActive: false,  // div hover高亮是否激活
-  };
-  
-  console.log('[DEBUG] 编辑器变量已初始化');
-}
-</script>
-"""
-
-# 主函数
-def main():
-    # 检查命令行参数
-    if len(sys.argv) < 2:
-        print("用法: python html_edit.py <input_html_file> [<output_html_file>]")
-        sys.exit(1)
-    
-    # 获取输入文件路径
-    input_path = sys.argv[1]
-    
-    # 如果没有指定输出文件，则使用默认名称
-    if len(sys.argv) > 2:
-        output_path = sys.argv[2]
-    else:
-        # 提取基本文件名并添加-editable后缀
-        base_name, ext = os.path.splitext(input_path)
-        output_path = f"{base_name}-editable{ext}"
-    
-    # 读取输入文件
+            self.phases.append(record)
+    
+    # 记录在另一个阶段内部单独计时的部分，within 为所在的阶段，不计入合计
+    def add(self, name, seconds, within):
+        if self.enabled:
+            self.phases.append({'name': f"{within}:{name}", 'seconds': seconds, 'within': within})
+    
+    # 所有阶段的总耗时
+    def total_seconds(self):
+        return sum(p['seconds'] for p in self.phases if 'within' not in p)
+    
+    # 输出阶段统计表
+    def print_table(self, file=None):
+        file = file or sys.stdout
+        print("\n阶段耗时:", file=file)
+        # 阶段内部单独计时的部分列在所在阶段之后
+        ordered = []
+        for p in self.phases:
+            if 'within' not in p:
+                ordered.append(p)
+                ordered.extend(q for q in self.phases if q.get('within') == p['name'])
+        for p in ordered:
+            line = f"  {p['name']:<20} {p['seconds'] * 1000:10.2f} ms"
+            if 'alloc_bytes' in p:
+                line += f"  分配 {p['alloc_bytes'] / 1024:10.1f} KB  峰值 {p['peak_bytes'] / 1024:10.1f} KB"
+            if 'cprofile' in p:
+                line += f"  cProfile: {p['cprofile']}"
+            print(line, file=file)
+        print(f"  {'合计':<18} {self.total_seconds() * 1000:10.2f} ms", file=file)
+
+# 不做任何统计的默认实例
+NULL_PROFILER = PhaseProfiler()
+
+# 页面编码
+# codec 为Python编解码器名，label 为页面中声明的名称，bom 为文件开头的字节序标记
+class Charset:
+    def __init__(self, codec, label=None, bom=b''):
+        self.codec = codec
+        self.label = label or codec
+        self.bom = bom
+    
+    # 是否与ASCII兼容（标签可以直接按字节查找）
+    @property
+    def ascii_compatible(self):
+        return not self.codec.startswith(('utf_16', 'utf_32', 'utf-16', 'utf-32'))
+    
+    # 序列化时写入<meta charset>的名称
+    @property
+    def declared(self):
+        return 'utf-8' if self.codec == 'utf-8' else self.label
+    
+    def __repr__(self):
+        return f"Charset({self.codec!r}, {self.label!r})"
+
+UTF8 = Charset('utf-8')
+
+# 在页面开头查找编码声明的字节数
+SNIFF_BYTES = 4096
+# (字节序标记, 解码用的编解码器, 写入<meta charset>的名称)：字节序由BOM决定，声明中只写 utf-16
+BOMS = ((b'\xef\xbb\xbf', 'utf-8', 'utf-8'), (b'\xff\xfe', 'utf-16-le', 'utf-16'), (b'\xfe\xff', 'utf-16-be', 'utf-16'))
+# <meta charset="gbk"> 和 <meta http-equiv="Content-Type" content="text/html; charset=gbk">
+META_CHARSET_RE = re.compile(rb'<meta\b[^>]*?charset\s*=\s*["\']?\s*([A-Za-z0-9_:.+-]+)', re.I)
+# 与浏览器一致，按超集解码
+CHARSET_ALIASES = {
+    'gb2312': 'gbk',
+    'gb_2312': 'gbk',
+    'gb_2312-80': 'gbk',
+    'x-gbk': 'gbk',
+    'iso-8859-1': 'cp1252',
+    'latin1': 'cp1252',
+    'ascii': 'cp1252',
+    'us-ascii': 'cp1252',
+}
+
+# 从字节序标记或<meta>声明中识别页面编码，识别不出时按UTF-8处理
+def sniff_charset(data):
+    import codecs
+    for bom, codec, label in BOMS:
+        if data.startswith(bom):
+            return Charset(codec, label, bom)
+    
+    match = META_CHARSET_RE.search(data, 0, SNIFF_BYTES)
+    if not match:
+        return UTF8
+    label = match.group(1).decode('ascii').lower()
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-    except Exception as e:
-        print(f"读取文件时出错: {e}")
-        sys.exit(1)
-    
-    # 使用BeautifulSoup解析HTML
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # 添加编辑工具样式
+        codec = codecs.lookup(CHARSET_ALIASES.get(label, label)).name
+    except LookupError:
+        return UTF8
+    if codec == 'utf-8':
+        return UTF8
+    # 页面用ASCII兼容的字节声明了UTF-16，说明声明有误，按浏览器的做法视为UTF-8
+    if codec.startswith(('utf-16', 'utf-32')):
+        return UTF8
+    return Charset(codec, label)
+
+# 把页面开头<meta>中声明的编码改为UTF-8（已经转成UTF-8的页面流式注入时使用）
+def declare_utf8(data):
+    match = META_CHARSET_RE.search(data, 0, SNIFF_BYTES)
+    if not match or match.group(1).lower() == b'utf-8':
+        return data
+    return data[:match.start(1)] + b'utf-8' + data[match.end(1):]
+
+# 把bytes、str或文件对象形式的页面解码，返回 (文本, 编码)
+# str 视为已经解码的页面，按UTF-8输出
+def decode_source(source):
+    if hasattr(source, 'read'):
+        source = source.read()
+    if isinstance(source, str):
+        return source, UTF8
+    source = bytes(source)
+    charset = sniff_charset(source)
+    return source[len(charset.bom):].decode(charset.codec, 'replace'), charset
+
+# 读取HTML文件的原始字节（"-" 表示标准输入）
+def read_bytes(input_path):
+    if input_path == '-':
+        return sys.stdin.buffer.read()
+    with open(input_path, 'rb') as f:
+        return f.read()
+
+# 解析HTML文档
+def parse_html(html_content, parser='html.parser'):
+    return beautiful_soup(html_content, parser)
+
+# 获取head元素，不存在时创建
+def ensure_head(soup):
     head = soup.find('head')
     if not head:
         head = soup.new_tag('head')
@@ -3577,11 +325,10 @@ def main():
             html = soup.new_tag('html')
             html.append(head)
             soup.append(html)
-    
-    # 添加样式
-    head.append(BeautifulSoup(EDITOR_STYLES, 'html.parser'))
-    
-    # 添加HTML元素和脚本
+    return head
+
+# 获取body元素，不存在时创建
+def ensure_body(soup):
     body = soup.find('body')
     if not body:
         body = soup.new_tag('body')
@@ -3591,28 +338,1059 @@ def main():
             html = soup.new_tag('html')
             html.append(body)
             soup.append(html)
+    return body
+
+# 页面编码无法表示的载荷字符改写为各自语言中的转义形式：
+# CSS用 \XXXX 转义，HTML用字符引用，JavaScript用 \uXXXX 转义
+def css_escape_errors(error):
+    text = error.object[error.start:error.end]
+    return ''.join(f"\\{ord(c):x} " for c in text), error.end
+
+def js_escape_errors(error):
+    text = error.object[error.start:error.end]
+    escaped = []
+    for c in text:
+        code = ord(c)
+        if code > 0xFFFF:
+            code -= 0x10000
+            escaped.append(f"\\u{0xD800 + (code >> 10):04x}\\u{0xDC00 + (code & 0x3FF):04x}")
+        else:
+            escaped.append(f"\\u{code:04x}")
+    return ''.join(escaped), error.end
+
+PAYLOAD_ERRORS = ('html_edit.css', 'xmlcharrefreplace', 'html_edit.js')
+
+# 载荷版本标记写在样式和脚本的开始标签上，重复注入时用来判断是否需要替换
+VERSION_ATTR = 'data-editor-version'
+VERSION_TAGS = ('<style id="editor-styles"', '<script id="editor-script"')
+# 各功能组合的 (版本, 带版本标记的载荷文本)
+_PAYLOAD_TEXTS = {}
+
+# 带版本标记的载荷文本 (样式, 元素, 脚本)
+# 版本是载荷内容的摘要，不同的功能组合有不同的版本
+def versioned_texts(features=None):
+    features = normalize_features(features)
+    if features not in _PAYLOAD_TEXTS:
+        import hashlib
+        texts = load_payload().build_payload(features)
+        version = hashlib.sha1(''.join(texts).encode('utf-8')).hexdigest()[:12]
+        stamped = []
+        for text in texts:
+            for tag in VERSION_TAGS:
+                text = text.replace(tag, f'{tag} {VERSION_ATTR}="{version}"', 1)
+            stamped.append(text)
+        _PAYLOAD_TEXTS[features] = (version, tuple(stamped))
+    return _PAYLOAD_TEXTS[features]
+
+# 页面标识写在启动脚本的开始标签上（版本标记之后）
+PAGE_ATTR = 'data-editor-page'
+PAGE_ATTR_RE = re.compile(rb'\bdata-editor-page\s*=\s*["\']([^"\']*)["\']')
+# 已编码载荷中写入页面标识的位置：启动脚本开始标签的版本标记之后
+PAGE_STAMP_RE = re.compile(re.escape(VERSION_TAGS[1].encode()) + rb' ' + VERSION_ATTR.encode() + rb'="[^"]*"')
+
+# 页面标识中的输入路径部分：绝对路径摘要的前12位，不同目录下的同名页面（如 a/public/index.html 和
+# b/public/index.html）标识不同，页面中也不会写入本机路径；没有输入路径时返回None
+def path_identity(input_path):
+    if not input_path or input_path == '-':
+        return None
+    import hashlib
+    return hashlib.sha1(os.path.abspath(input_path).encode('utf-8', 'surrogateescape')).hexdigest()[:12]
+
+# 计入内容摘要的部分：</body>之前的内容，与流式注入写出body部分载荷前计算的摘要一致
+def identity_content(data):
+    head = StreamInjector.HEAD_END.search(data)
+    body = StreamInjector.BODY_END.search(data, head.end()) if head else None
+    return data[:body.start()] if body else data
+
+# 页面标识中的内容部分：内容摘要的前12位，digest 为已更新过的 hashlib 对象或页面的bytes
+def content_identity(digest):
+    if isinstance(digest, (bytes, bytearray)):
+        import hashlib
+        digest = hashlib.sha1(identity_content(digest))
+    return digest.hexdigest()[:12]
+
+# 由路径部分和内容部分组成页面标识
+def join_identity(path, content):
+    return f"{path}-{content}" if path else content
+
+# 属性值中的页面标识
+def decode_identity(value, codec='utf-8'):
+    import html
+    return html.unescape(value.decode(codec, 'replace'))
+
+# 整个页面的页面标识（文档树注入时使用）
+# 页面中已有标识（之前注入过）时沿用，重复注入后浏览器中保存的修改仍然对应这个页面
+# 内容摘要按流式注入看到的字节计算：str 按声明为UTF-8的页面，UTF-16页面按转成UTF-8后的内容
+def page_identity(data, input_path=None):
+    codec = 'utf-8'
+    if isinstance(data, str):
+        data = declare_utf8(data.encode('utf-8'))
+    else:
+        charset = sniff_charset(data)
+        if charset.ascii_compatible:
+            codec = charset.codec
+        else:
+            data = data[len(charset.bom):].decode(charset.codec, 'replace').encode('utf-8')
+    match = PAGE_ATTR_RE.search(data)
+    if match:
+        return decode_identity(match.group(1), codec)
+    return join_identity(path_identity(input_path), content_identity(data))
+
+# 在已编码的载荷中写入页面标识
+def stamp_payload(payload, page, codec='utf-8'):
+    import html
+    match = PAGE_STAMP_RE.search(payload)
+    if match is None:
+        return payload
+    stamp = f' {PAGE_ATTR}="{html.escape(page)}"'.encode(codec, 'xmlcharrefreplace')
+    return payload[:match.end()] + stamp + payload[match.end():]
+
+# 在启动脚本标签上写入页面标识
+def stamp_page(script, page):
+    if script is not None and script.get(PAGE_ATTR) != page:
+        script[PAGE_ATTR] = page
+
+# 当前载荷的版本（载荷内容的摘要）
+def editor_version(features=None):
+    return versioned_texts(features)[0]
+
+# 所选功能的脚本块指纹 {功能: 指纹}
+def editor_chunks(features=None):
+    payload = load_payload()
+    return {name: payload.chunk_fingerprint(name) for name in normalize_features(features)}
+
+# 各功能组合、各编码下的载荷 {(功能, 编码): (样式, 元素, 脚本)}，均为已编码的bytes
+_ENCODED_PAYLOADS = {}
+
+# 按页面编码预先编码的载荷
+def encoded_payload(codec='utf-8', features=None):
+    features = normalize_features(features)
+    key = (features, codec)
+    if key not in _ENCODED_PAYLOADS:
+        import codecs
+        codecs.register_error('html_edit.css', css_escape_errors)
+        codecs.register_error('html_edit.js', js_escape_errors)
+        texts = versioned_texts(features)[1]
+        _ENCODED_PAYLOADS[key] = tuple(text.encode(codec, errors) for text, errors in zip(texts, PAYLOAD_ERRORS))
+    return _ENCODED_PAYLOADS[key]
+
+# 页面编码可以完整表示的载荷文本 (样式, 元素, 脚本)
+def payload_texts(codec='utf-8', features=None):
+    if codec == 'utf-8':
+        return versioned_texts(features)[1]
+    return tuple(data.decode(codec) for data in encoded_payload(codec, features))
+
+# 解析编辑器片段，返回 (样式, 元素, 脚本)
+def parse_fragments(profiler=NULL_PROFILER, codec='utf-8', features=None):
+    styles_text, elements_text, scripts_text = payload_texts(codec, features)
+    with profiler.phase('fragment:styles'):
+        styles = beautiful_soup(styles_text, 'html.parser')
+    with profiler.phase('fragment:elements'):
+        elements = beautiful_soup(elements_text, 'html.parser')
+    with profiler.phase('fragment:scripts'):
+        scripts = beautiful_soup(scripts_text, 'html.parser')
+    return styles, elements, scripts
+
+# 向文档树注入编辑器样式、元素和脚本
+# fragments 为预先解析好的片段，注入时使用其副本，片段本身可以重复使用
+# charset 为页面编码，载荷中该编码无法表示的字符会被转义
+# features 为要注入的功能，fragments 须是按同样的功能解析的片段
+# 页面已经注入过编辑器时：版本相同且没有重复块则不做改动，否则在原位置替换为当前版本
+# page 为页面标识，写在启动脚本标签上
+def inject_editor(soup, profiler=NULL_PROFILER, fragments=None, charset=UTF8, features=None, page=None):
+    features = normalize_features(features)
+    with profiler.phase('locate'):
+        blocks = find_editor_blocks(soup)
+    if blocks and is_current_editor(blocks, features):
+        if page:
+            stamp_page(next(node for node in blocks if node['id'] == 'editor-script'), page)
+        return soup
+    
+    if fragments is None:
+        styles, elements, scripts = parse_fragments(profiler, charset.codec, features)
+    else:
+        with profiler.phase('fragment:copy'):
+            styles, elements, scripts = (copy.copy(f) for f in fragments)
+    
+    with profiler.phase('inject'):
+        if page:
+            stamp_page(scripts.find(id='editor-script'), page)
+        if blocks:
+            replace_editor(soup, blocks, (styles, elements, scripts))
+        else:
+            # 添加样式
+            ensure_head(soup).append(styles)
+            
+            body = ensure_body(soup)
+            # 添加编辑器元素
+            body.append(elements)
+            # 添加脚本
+            body.append(scripts)
+    return soup
+
+# 页面中已有的编辑器块，按文档顺序排列，一次遍历文档树找出所有块
+# （直接遍历比 find_all(id=...) 的逐个匹配快几倍）
+def find_editor_blocks(soup):
+    from bs4 import Tag
+    block_ids = set(EDITOR_BLOCK_IDS)
+    return [node for node in soup.descendants if isinstance(node, Tag) and node.get('id') in block_ids]
+
+# 页面中的编辑器是否已是当前版本，所选功能的每个块只有一份，且没有其他功能的块
+def is_current_editor(blocks, features=None):
+    ids = [node['id'] for node in blocks]
+    if len(ids) != len(set(ids)) or set(ids) != set(editor_block_ids(features)):
+        return False
+    version = editor_version(features)
+    return all(node.get(VERSION_ATTR) == version for node in blocks if node['id'] in ('editor-styles', 'editor-script'))
+
+# 所选功能注入的编辑器块ID，按注入顺序排列
+def editor_block_ids(features=None):
+    features = normalize_features(features)
+    skipped = {block_id for name, ids in FEATURE_BLOCK_IDS.items() if name not in features for block_id in ids}
+    return tuple(block_id for block_id in EDITOR_BLOCK_IDS if block_id not in skipped)
+
+# 把页面中已有的编辑器块替换为新片段，与流式注入的做法一致：
+# 样式片段放在原来第一个样式块的位置，元素和脚本片段整体放在原来第一个body部分块的位置，
+# 没有对应的旧块时按新注入的方式添加到head或body末尾。旧块（包括重复的块和未选功能的块）全部移除，
+# 所以切换功能后的输出与直接按这些功能注入相同
+def replace_editor(soup, blocks, fragments):
+    styles, elements, scripts = fragments
+    markers = {}
+    for node in blocks:
+        part = 'head' if node['id'] == 'editor-styles' else 'body'
+        if part in markers:
+            remove_block(node)
+        else:
+            # 新片段的位置先用占位标签记下，旧块都移除后再放入
+            markers[part] = soup.new_tag('editor-placeholder')
+            remove_block(node, markers[part])
+    
+    for part, new_fragments, container in (('head', (styles,), ensure_head), ('body', (elements, scripts), ensure_body)):
+        marker = markers.get(part)
+        for fragment in new_fragments:
+            if marker is None:
+                container(soup).append(fragment)
+            else:
+                marker.insert_before(fragment)
+        if marker is not None:
+            marker.extract()
+
+# 移除一个编辑器块，连同它前面的编辑器注释和注入时加入的换行
+# replacement 不为空时留下它占住块原来的位置
+def remove_block(node, replacement=None):
+    before = node.previous_sibling
+    if is_blank(before):
+        before = before.previous_sibling
+    if is_editor_comment(before):
+        trim_newline(before.previous_sibling, at_end=True)
+        before.extract()
+    trim_newline(node.previous_sibling, at_end=True)
+    trim_newline(node.next_sibling, at_end=False)
+    if replacement is None:
+        node.extract()
+    else:
+        node.replace_with(replacement)
+
+# 是否为编辑器元素前的注释
+# 页面编码无法表示的字符在注释中写成了字符引用（如Big5页面中的 "元素&#26816;查器"），比较前先还原
+def is_editor_comment(node):
+    from bs4 import Comment
+    if not isinstance(node, Comment):
+        return False
+    text = node.strip()
+    if '&#' in text:
+        import html
+        text = html.unescape(text)
+    return text in EDITOR_COMMENTS
+
+# 是否为只包含空白的文本节点
+def is_blank(node):
+    return node is not None and type(node).__name__ == 'NavigableString' and not node.strip()
+
+# 编辑器注入的元素ID（与 html_edit_payload.py 中的载荷保持一致）
+EDITOR_BLOCK_IDS = ('editor-styles', 'elementInspector', 'divEditorButtons', 'imageUploadModal', 'editor-script',
+                    'editor-chunk-inspect', 'editor-chunk-region', 'editor-chunk-text', 'editor-chunk-image')
+# 编辑器元素前的注释
+EDITOR_COMMENTS = ('元素检查器', '区域编辑按钮容器', '图片上传模态框')
+# CSS中的url()
+CSS_URL_RE = re.compile(r'url\(\s*[\'"]?([^\'")]+?)[\'"]?\s*\)', re.I)
+
+# 移除文档树中的编辑器样式、元素和脚本，返回移除的元素数量
+# 注入时每个块前面加了一个换行，元素块后面也有一个换行，移除时一并去掉
+# （BeautifulSoup会把连续的空白合并成一个换行，页面原有的换行可能随之去掉，不影响显示）
+# 编辑器块和编辑器注释在同一次遍历中找出
+def strip_editor(soup, profiler=NULL_PROFILER):
+    from bs4 import Comment, Tag
+    block_ids = set(EDITOR_BLOCK_IDS)
+    tags = []
+    comments = []
+    with profiler.phase('locate'):
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                if node.get('id') in block_ids:
+                    tags.append(node)
+            elif isinstance(node, Comment) and is_editor_comment(node):
+                comments.append(node)
+    for node in comments + tags:
+        trim_newline(node.previous_sibling, at_end=True)
+        if node in tags:
+            trim_newline(node.next_sibling, at_end=False)
+        node.extract()
+    return len(tags)
+
+# 去掉相邻文本节点首尾的一个换行
+def trim_newline(node, at_end):
+    if node is None or type(node).__name__ != 'NavigableString':
+        return
+    if at_end and node.endswith('\n'):
+        text = node[:-1]
+    elif not at_end and node.startswith('\n'):
+        text = node[1:]
+    else:
+        return
+    if text:
+        node.replace_with(type(node)(text))
+    else:
+        node.extract()
+
+# 判断页面中的资源地址是否就是编辑器记录的地址
+# 编辑器记录的是浏览器解析后的绝对地址，页面中通常是相对地址
+def same_resource(value, recorded):
+    if not value:
+        return False
+    if value == recorded:
+        return True
+    path = value.split('#')[0].lstrip('./')
+    return bool(path) and recorded.split('#')[0].endswith('/' + path)
+
+# 替换CSS文本中与编辑记录匹配的url()
+def replace_css_urls(css, replacements):
+    def repl(match):
+        for original, new in replacements.items():
+            if same_resource(match.group(1), original):
+                return f"url('{new}')"
+        return match.group(0)
+    return CSS_URL_RE.sub(repl, css)
+
+# 编辑器把图片保存在浏览器的IndexedDB中，localStorage里只有这样开头的引用
+BLOB_REFERENCE_PREFIX = 'editor-blob:'
+
+# 读取一类图片编辑，跳过无法在这里使用的IndexedDB引用
+def image_edits(edits, key):
+    result = {}
+    for original, new in (edits.get(key) or {}).items():
+        if isinstance(new, str) and new.startswith(BLOB_REFERENCE_PREFIX):
+            print(f"图片保存在浏览器的IndexedDB中，请在页面控制台执行 copy(await exportEditorEdits()) 导出编辑结果: {original}",
+                  file=sys.stderr)
+            continue
+        result[original] = new
+    return result
+
+# 把编辑器保存的编辑结果写回文档树
+# edits 的键与localStorage一致：editedTexts、editedImages、editedBackgroundImages、editedCarouselImages，
+# 图片为 data URL（在页面控制台执行 exportEditorEdits() 导出）
+# 返回 {类型: 应用的数量}
+def apply_edits(soup, edits):
+    applied = {'texts': 0, 'images': 0, 'backgrounds': 0}
+
+    # 文本编辑：键是编辑器生成的元素路径，和浏览器一样只更新第一个匹配的元素
+    for path, html in (edits.get('editedTexts') or {}).items():
+        try:
+            element = soup.select_one(path)
+        except Exception:
+            element = None
+        if element is None:
+            print(f"找不到路径对应的元素: {path}", file=sys.stderr)
+            continue
+        element.clear()
+        element.append(beautiful_soup(html, 'html.parser'))
+        applied['texts'] += 1
+
+    # 图片和轮播图编辑：键是原图片地址
+    images = image_edits(edits, 'editedImages')
+    images.update(image_edits(edits, 'editedCarouselImages'))
+    if images:
+        for img in soup.find_all('img', src=True):
+            for original, new in images.items():
+                if same_resource(img['src'], original):
+                    img['src'] = new
+                    applied['images'] += 1
+                    break
+
+    # 背景图编辑：替换行内样式和<style>中的url()，外部样式表中的背景图无法在这里处理
+    backgrounds = image_edits(edits, 'editedBackgroundImages')
+    if backgrounds:
+        for tag in soup.find_all(style=True):
+            style = replace_css_urls(tag['style'], backgrounds)
+            if style != tag['style']:
+                tag['style'] = style
+                applied['backgrounds'] += 1
+        for tag in soup.find_all('style'):
+            css = tag.string or ''
+            new_css = replace_css_urls(css, backgrounds)
+            if new_css != css:
+                tag.string = new_css
+                applied['backgrounds'] += 1
+    return applied
+
+# 流式序列化时向下展开的最大深度，更深的子树整体序列化为一个片段
+STREAM_DEPTH = 8
+
+# 逐个片段生成文档树的序列化结果，与 str(soup) 的输出完全一致
+# eventual_encoding 为输出编码，<meta>中的编码声明会改写为它
+def iter_markup(node, soup=None, depth=0, eventual_encoding='utf-8'):
+    soup = soup or node
+    if not hasattr(node, 'contents'):
+        # 文本、注释、DOCTYPE等
+        yield node.output_ready()
+        return
+    
+    if node.hidden:
+        # BeautifulSoup对象本身不输出标签
+        for child in node.contents:
+            yield from iter_markup(child, soup, depth + 1, eventual_encoding)
+        return
+    
+    if depth >= STREAM_DEPTH or not any(hasattr(child, 'contents') for child in node.contents):
+        yield node.decode(eventual_encoding=eventual_encoding)
+        return
+    
+    # 用同名同属性的空标签生成开始和结束标签
+    shell = soup.new_tag(node.name, attrs=dict(node.attrs)).decode(eventual_encoding=eventual_encoding)
+    end_tag = f"</{node.name}>"
+    if shell.endswith(end_tag):
+        yield shell[:-len(end_tag)]
+    else:
+        yield shell
+        end_tag = ''
+    for child in node.contents:
+        yield from iter_markup(child, soup, depth + 1, eventual_encoding)
+    if end_tag:
+        yield end_tag
+
+# 把文档树以编码后的片段流式写入二进制输出
+# 传入 charset 时按页面原来的编码输出，并保留字节序标记
+def stream_html(soup, f, encoding='utf-8', charset=None):
+    declared = 'utf-8'
+    if charset is not None:
+        encoding, declared = charset.codec, charset.declared
+        if charset.bom:
+            f.write(charset.bom)
+    for chunk in iter_markup(soup, eventual_encoding=declared):
+        # 页面中由实体解码出来的字符可能无法用原编码表示，改写为字符引用
+        f.write(chunk.encode(encoding, 'xmlcharrefreplace'))
+    return f
+
+# 解析bytes、str或文件对象形式的页面，返回 (文档树, 编码)
+def parse_document(source, parser='html.parser'):
+    text, charset = decode_source(source)
+    return parse_html(text, parser), charset
+
+# 原子写入：先写同目录下的临时文件，提交时再重命名为目标文件
+# 中途出错或进程崩溃都不会留下写了一半的输出文件
+class AtomicFileWriter:
+    def __init__(self, path, buffer_size=1 << 16):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.file = None
+        self.tmp_path = None
+        self.bytes_written = 0
+    
+    def __enter__(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        import tempfile
+        fd, self.tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(self.path)}.", suffix='.tmp', dir=directory)
+        self.file = io.open(fd, 'wb', buffering=self.buffer_size)
+        return self
+    
+    def write(self, data):
+        self.bytes_written += len(data)
+        self.file.write(data)
+    
+    # 刷新到磁盘并替换目标文件
+    def commit(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.chmod(self.tmp_path, self._target_mode())
+        os.replace(self.tmp_path, self.path)
+        self.tmp_path = None
+    
+    # 目标文件已存在时沿用其权限，否则按umask计算默认权限
+    def _target_mode(self):
+        try:
+            return os.stat(self.path).st_mode & 0o7777
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            return 0o666 & ~umask
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self.tmp_path is not None:
+            # 未提交（出错）时清理临时文件
+            if not self.file.closed:
+                self.file.close()
+            try:
+                os.unlink(self.tmp_path)
+            except OSError:
+                pass
+        return False
+
+# 标准输出写入器，接口与AtomicFileWriter一致
+class StdoutWriter:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout.buffer
+        self.bytes_written = 0
+    
+    def __enter__(self):
+        return self
+    
+    # 管道模式下每块数据立即交给下游，使上下游可以并行处理
+    def write(self, data):
+        self.bytes_written += len(data)
+        self.stream.write(data)
+        self.stream.flush()
+    
+    def commit(self):
+        self.stream.flush()
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+# 打开输出（"-" 表示标准输出）
+def open_output(output_path):
+    if output_path == '-':
+        return StdoutWriter()
+    return AtomicFileWriter(output_path)
+
+# 把已编码的内容写入输出文件
+def write_bytes(output_path, data):
+    with open_output(output_path) as writer:
+        writer.write(data)
+        writer.commit()
+
+# 流式注入使用的编辑器载荷 (head中插入的部分, body中插入的部分)，按页面编码预先编码
+# body部分还没有页面标识，由 StreamInjector 写入时加上
+def stream_payload(codec='utf-8', features=None):
+    styles, elements, scripts = encoded_payload(codec, features)
+    return styles, elements + scripts
+
+# 流式注入：不解析文档，逐块扫描字节流
+# 在</head>（或<body>，没有head时）前插入样式，在</body>前插入编辑器元素和脚本，
+# 其余字节原样透传，任意时刻只缓存很短的一段尾部数据
+# 页面中已有编辑器块（之前注入过）时，在第一个块的位置写入当前版本，其余旧块连同其间的空白丢弃，
+# 同一版本重复注入的输出与输入逐字节相同
+# path 为页面标识的路径部分（见 path_identity()），内容部分按写入body部分载荷之前的页面内容计算摘要。
+# 旧启动脚本上已有的标识优先，所以替换旧块时body部分的载荷等旧块都读完后才写出
+class StreamInjector:
+    HEAD_END = re.compile(rb'</head\s*>|<body[\s>/]', re.I)
+    BODY_END = re.compile(rb'</body\s*>', re.I)
+    # 编辑器块的开始标签
+    BLOCK_START = re.compile(
+        rb'<(style|script|div)\b[^>]*?\bid\s*=\s*["\']?'
+        rb'(' + b'|'.join(re.escape(block_id.encode()) for block_id in EDITOR_BLOCK_IDS) + rb')["\'\s/>]', re.I)
+    BLOCK_END = {b'style': re.compile(rb'</style\s*>', re.I), b'script': re.compile(rb'</script\s*>', re.I)}
+    DIV_TAG = re.compile(rb'<div\b|</div\s*>', re.I)
+    SPACE = re.compile(rb'\s*')
+    # 为跨块的标签保留的尾部长度
+    KEEP = 16
+    # 为跨块的开始标签和注释保留的最大长度
+    HOLD = 512
+    
+    def __init__(self, head_payload, body_payload, codec='utf-8', path=None):
+        self.head_payload = head_payload
+        self.body_payload = body_payload
+        self.codec = codec
+        self.buffer = b''
+        self.state = 'head'
+        # 已写入的载荷
+        self.head_done = False
+        self.body_done = False
+        # body部分的载荷已确定位置，还没有写出（正在替换旧块）
+        self.body_pending = False
+        # 页面标识，写出body部分的载荷后为最终使用的标识
+        import hashlib
+        self.path = path
+        self.page = None
+        self.found_page = None
+        self.digest = hashlib.sha1()
+        # 计算摘要的耗时
+        self.identify_seconds = 0.0
+        # 正在丢弃的旧编辑器块：(标签名, div的嵌套深度, 所属部分)
+        self.skip = None
+        # 刚丢弃的旧块属于head还是body部分，其后的空白要等看到下一个标签再决定是否保留
+        self.after_block = None
+        comments = b'|'.join(re.escape(c.encode(codec, 'xmlcharrefreplace')) for c in EDITOR_COMMENTS)
+        self.comment_re = re.compile(rb'<!--\s*(?:' + comments + rb')\s*-->')
+    
+    # 输入一块数据，返回可以立即输出的数据
+    def feed(self, data):
+        self.buffer += data
+        return self._process(final=False)
+    
+    # 输入结束，补上缺失的载荷
+    def close(self):
+        out = [self._process(final=True)]
+        if self.body_pending:
+            self._write_body(out, strip=True)
+        if not self.head_done:
+            out.append(self.head_payload)
+        if not self.body_done:
+            self._write_body(out)
+        self.buffer = b''
+        self.state = 'done'
+        self.head_done = self.body_done = True
+        return b''.join(out)
+    
+    # 输出页面原有的字节，之前先写出等待中的body部分载荷
+    # 写入body部分载荷之前的内容计入页面摘要，与分块方式无关
+    def _emit(self, out, data):
+        if not data:
+            return
+        if self.body_pending:
+            self._write_body(out, strip=True)
+        if not self.body_done:
+            start = time.perf_counter()
+            self.digest.update(data)
+            self.identify_seconds += time.perf_counter() - start
+        out.append(data)
+    
+    # 写出带页面标识的body部分载荷；替换旧块时去掉首尾换行，使原有的空白保持不变
+    def _write_body(self, out, strip=False):
+        self.page = self.found_page or join_identity(self.path, content_identity(self.digest))
+        payload = stamp_payload(self.body_payload, self.page, self.codec)
+        out.append(payload.strip() if strip else payload)
+        self.body_pending = False
+        self.body_done = True
+    
+    # 查找位置pos处开始的编辑器块或注释
+    def _block_at(self, buf, pos):
+        return self.comment_re.match(buf, pos) or self.BLOCK_START.match(buf, pos)
+    
+    # 查找下一个编辑器块或注释
+    def _next_block(self, buf, pos):
+        found = [m for m in (self.comment_re.search(buf, pos), self.BLOCK_START.search(buf, pos)) if m]
+        return min(found, key=lambda m: m.start()) if found else None
+    
+    # 丢弃正在跳过的旧块，返回 (是否结束, 已扫描到的位置)
+    def _skip_block(self, buf, pos):
+        name, depth, part = self.skip
+        if name == b'div':
+            # 按<div>的嵌套深度找到块的结束标签
+            for match in self.DIV_TAG.finditer(buf, pos):
+                depth += -1 if match.group(0).startswith(b'</') else 1
+                pos = match.end()
+                if depth == 0:
+                    return True, pos
+            self.skip = (name, depth, part)
+            return False, pos
+        match = self.BLOCK_END[name].search(buf, pos)
+        return (True, match.end()) if match else (False, pos)
+    
+    # 旧块属于载荷的head部分（样式）还是body部分（元素和脚本）
+    def _block_part(self, match):
+        if match.re is not self.comment_re and match.group(2) == b'editor-styles':
+            return 'head'
+        return 'body'
+    
+    # 在旧块的位置写入当前载荷（去掉首尾换行，使原有的空白保持不变）
+    # body部分等到旧块之后出现页面原有的内容时才写出，这之前读到的旧启动脚本上的页面标识会被沿用
+    def _replace_block(self, out, match):
+        if self._block_part(match) == 'body':
+            if not self.body_done:
+                self.body_pending = True
+                self.body_done = True
+        elif not self.head_done:
+            if self.body_pending:
+                self._write_body(out, strip=True)
+            out.append(self.head_payload.strip())
+            self.head_done = True
+    
+    def _process(self, final):
+        buf = self.buffer
+        pos = 0
+        out = []
+        while pos < len(buf):
+            if self.skip:
+                ended, end = self._skip_block(buf, pos)
+                if not ended:
+                    # 块还没有结束，丢弃已扫描的部分，保留可能被截断的结束标签
+                    pos = len(buf) if final else max(end, len(buf) - self.KEEP)
+                    break
+                pos = end
+                self.skip, self.after_block = None, self.skip[2]
+                continue
+            
+            if self.after_block:
+                space_end = self.SPACE.match(buf, pos).end()
+                if not final and len(buf) - space_end < self.HOLD:
+                    # 还不能确定空白之后是否是另一个旧块
+                    break
+                # 同一部分的旧块之间的空白是注入时加入的，一并丢弃
+                block = self._block_at(buf, space_end)
+                if block and self._block_part(block) == self.after_block:
+                    pos = space_end
+                self.after_block = None
+            
+            block = self._next_block(buf, pos)
+            point = None
+            if self.state == 'head':
+                point = self.HEAD_END.search(buf, pos)
+            elif self.state == 'body':
+                point = self.BODY_END.search(buf, pos)
+            
+            if point and (block is None or point.start() < block.start()):
+                self._emit(out, buf[pos:point.start()])
+                if self.state == 'head':
+                    if not self.head_done:
+                        out.append(self.head_payload)
+                        self.head_done = True
+                    self.state = 'body'
+                else:
+                    if not self.body_done:
+                        self._write_body(out)
+                    self.state = 'done'
+                pos = point.start()
+                # 插入点的标签本身原样输出
+                tag_end = point.end()
+                self._emit(out, buf[pos:tag_end])
+                pos = tag_end
+                continue
+            
+            if block is not None:
+                self._emit(out, buf[pos:block.start()])
+                pos = block.start()
+                if block.re is not self.comment_re and block.group(2) == b'editor-script':
+                    # 读取旧启动脚本上的页面标识，开始标签被截断时等下一块数据
+                    tag_end = buf.find(b'>', block.end() - 1)
+                    if tag_end == -1 and not final:
+                        break
+                    found = PAGE_ATTR_RE.search(buf, block.start(), tag_end if tag_end != -1 else len(buf))
+                    if found:
+                        self.found_page = decode_identity(found.group(1), self.codec)
+                self._replace_block(out, block)
+                pos = block.end()
+                part = self._block_part(block)
+                if block.re is self.comment_re:
+                    self.after_block = part
+                else:
+                    name = block.group(1).lower()
+                    self.skip = (name, 1 if name == b'div' else None, part)
+                continue
+            
+            # 没有找到插入点或旧块，输出不可能是标签开头的部分
+            if final:
+                self._emit(out, buf[pos:])
+                pos = len(buf)
+            else:
+                cut = max(len(buf) - self.HOLD, pos)
+                lt = buf.rfind(b'<', cut)
+                cut = lt if lt != -1 else len(buf)
+                self._emit(out, buf[pos:cut])
+                pos = cut
+            break
+        
+        self.buffer = buf[pos:]
+        return b''.join(out)
+
+# 流式处理：从输入读取、注入、写到输出，返回 (读取的字节数, 页面标识)
+# 先读取页面开头识别编码，载荷按该编码插入，页面本身的字节不做任何解码
+# features 为要注入的功能，默认全部；input_path 为页面的输入路径，用于页面标识（见 page_identity()）
+# charset 为已知的页面编码，传入时不再识别
+# 计算摘要的耗时记为 stream 阶段中的 identify
+def run_stream(infile, writer, chunk_size=1 << 16, features=None, input_path=None, profiler=NULL_PROFILER,
+               charset=None):
+    read = getattr(infile, 'read1', infile.read)
+    head = b''
+    while len(head) < SNIFF_BYTES:
+        data = read(chunk_size)
+        if not data:
+            break
+        head += data
+    charset = charset or sniff_charset(head)
+    
+    if not charset.ascii_compatible:
+        # UTF-16页面无法按字节查找标签，整体转码后处理
+        data = head + infile.read()
+        text = data[len(charset.bom):].decode(charset.codec, 'replace')
+        inner = BytesWriter()
+        _, page = run_stream(io.BytesIO(text.encode('utf-8')), inner, chunk_size, features, input_path, profiler, UTF8)
+        writer.write(charset.bom + inner.getvalue().decode('utf-8').encode(charset.codec))
+        return len(data), page
+    
+    injector = StreamInjector(*stream_payload(charset.codec, features), codec=charset.codec,
+                              path=path_identity(input_path))
+    bytes_read = 0
+    data = head
+    while data:
+        bytes_read += len(data)
+        out = injector.feed(data)
+        if out:
+            writer.write(out)
+        data = read(chunk_size)
+    writer.write(injector.close())
+    profiler.add('identify', injector.identify_seconds, within='stream')
+    return bytes_read, injector.page
+
+# 支持的注入方式
+INJECT_MODES = ('tree', 'stream')
+
+# 内存中的输出，接口与AtomicFileWriter一致
+class BytesWriter(io.BytesIO):
+    @property
+    def bytes_written(self):
+        return self.tell()
+    
+    def commit(self):
+        pass
+
+# 可重复使用的注入器，供其他Python程序在进程内调用
+# 编辑器载荷只准备一次，之后每个页面只需解析（tree）或扫描（stream）页面本身
+#
+#     instrumenter = Instrumenter(mode='stream')
+#     for path in pages:
+#         instrumenter.instrument_file(path, path.replace('.html', '-editable.html'))
+class Instrumenter:
+    def __init__(self, mode='tree', parser='html.parser', features=None):
+        if mode not in INJECT_MODES:
+            raise ValueError(f"不支持的注入方式: {mode}")
+        self.mode = mode
+        self.parser = parser
+        # 要注入的功能
+        self.features = normalize_features(features)
+        # 按页面编码缓存的载荷片段
+        self.fragments = {}
+        if mode == 'tree':
+            self.get_fragments('utf-8')
+        else:
+            stream_payload('utf-8', self.features)
+    
+    # 指定编码的预解析载荷片段
+    def get_fragments(self, codec):
+        if codec not in self.fragments:
+            self.fragments[codec] = parse_fragments(codec=codec, features=self.features)
+        return self.fragments[codec]
+    
+    # 注入到输出对象，source 可以是 bytes、str 或已打开的文件对象
+    # input_path 为页面的输入路径，用于页面标识
+    def instrument_to(self, source, writer, profiler=NULL_PROFILER, input_path=None):
+        if isinstance(source, io.TextIOBase):
+            source = source.read()
+        if self.mode == 'stream':
+            charset = None
+            if isinstance(source, str):
+                # str 视为已经解码的页面，按UTF-8输出，不再按页面中的声明识别编码
+                source, charset = declare_utf8(source.encode('utf-8')), UTF8
+            if isinstance(source, (bytes, bytearray)):
+                source = io.BytesIO(source)
+            with profiler.phase('stream'):
+                run_stream(source, writer, features=self.features, input_path=input_path, profiler=profiler,
+                           charset=charset)
+            return writer
+        
+        if hasattr(source, 'read'):
+            source = source.read()
+        with profiler.phase('identify'):
+            page = page_identity(source, input_path)
+        soup, charset = self.parse(source, profiler)
+        inject_editor(soup, profiler, self.get_fragments(charset.codec), charset, self.features, page)
+        with profiler.phase('serialize'):
+            stream_html(soup, writer, charset=charset)
+        return writer
+    
+    # 解析页面，source 可以是 bytes、str 或已打开的文件对象，返回 (文档树, 编码)
+    def parse(self, source, profiler=NULL_PROFILER):
+        with profiler.phase('parse'):
+            return parse_document(source, self.parser)
+    
+    # 注入并返回输出的bytes
+    def instrument(self, source, profiler=NULL_PROFILER, input_path=None):
+        return self.instrument_to(source, BytesWriter(), profiler, input_path).getvalue()
+    
+    # 移除页面中的编辑器，返回输出的bytes
+    def strip(self, source, profiler=NULL_PROFILER):
+        soup, charset = self.parse(source, profiler)
+        strip_editor(soup, profiler)
+        return stream_html(soup, BytesWriter(), charset=charset).getvalue()
+    
+    # 把编辑结果写回页面，默认同时移除编辑器，返回输出的bytes
+    def apply(self, source, edits, strip=True, profiler=NULL_PROFILER):
+        soup, charset = self.parse(source, profiler)
+        apply_edits(soup, edits)
+        if strip:
+            strip_editor(soup, profiler)
+        return stream_html(soup, BytesWriter(), charset=charset).getvalue()
+    
+    # 注入文件，原子写入输出文件（"-" 表示标准输入/标准输出），返回写出的字节数
+    def instrument_file(self, input_path, output_path, profiler=NULL_PROFILER):
+        if input_path == '-':
+            infile = sys.stdin.buffer
+        else:
+            infile = open(input_path, 'rb')
+        with infile, open_output(output_path) as writer:
+            self.instrument_to(infile, writer, profiler, input_path)
+            with profiler.phase('write'):
+                writer.commit()
+        return writer.bytes_written
+
+# 按配置缓存的注入器
+_INSTRUMENTERS = {}
+
+# 获取指定配置的注入器，相同配置的注入器会被复用
+def get_instrumenter(mode='tree', parser='html.parser', features=None):
+    key = (mode, parser, normalize_features(features))
+    if key not in _INSTRUMENTERS:
+        _INSTRUMENTERS[key] = Instrumenter(*key)
+    return _INSTRUMENTERS[key]
+
+# 为单个页面注入编辑器并返回bytes
+def instrument(source, mode='tree', parser='html.parser', features=None, input_path=None):
+    return get_instrumenter(mode, parser, features).instrument(source, input_path=input_path)
+
+# 构建命令行参数解析器
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description='为HTML页面添加可视化编辑功能')
+    parser.add_argument('input', help='输入HTML文件（"-" 表示标准输入）')
+    parser.add_argument('output', nargs='?', help='输出HTML文件（"-" 表示标准输出，默认在输入文件名后添加-editable）')
+    parser.add_argument('--mode', choices=INJECT_MODES, help='注入方式（默认：使用管道时为stream，否则为tree）')
+    parser.add_argument('--features', help=f"要注入的功能，逗号分隔（可选: {','.join(EDITOR_FEATURES)}，默认全部）")
+    parser.add_argument('--profile', action='store_true', help='输出每个阶段的耗时和内存分配')
+    parser.add_argument('--cprofile', metavar='DIR', help='把解析和序列化阶段的cProfile数据写入目录')
+    parser.add_argument('--report', choices=('json',), help='以机器可读格式输出运行统计')
+    return parser
+
+# 生成JSON运行报告
+def build_report(input_path, output_path, mode, input_bytes, output_bytes, profiler, features=EDITOR_FEATURES,
+                 page=None):
+    template = None
+    if input_path != '-':
+        template = os.path.basename(os.path.dirname(os.path.abspath(input_path)))
+    return {
+        'template': template,
+        'page': page,
+        'input': input_path,
+        'output': output_path,
+        'mode': mode,
+        'features': list(features),
+        'chunks': editor_chunks(features),
+        'input_bytes': input_bytes,
+        'output_bytes': output_bytes,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'phases': profiler.phases,
+        'total_seconds': profiler.total_seconds(),
+    }
+
+# 主函数
+def main():
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args()
+    try:
+        features = normalize_features(args.features)
+    except ValueError as e:
+        arg_parser.error(str(e))
     
-    # 添加编辑器元素
-    body.append(BeautifulSoup(EDITOR_ELEMENTS, 'html.parser'))
+    # 获取输入文件路径
+    input_path = args.input
+    
+    # 如果没有指定输出文件，则使用默认名称
+    if args.output:
+        output_path = args.output
+    elif input_path == '-':
+        output_path = '-'
+    else:
+        # 提取基本文件名并添加-editable后缀
+        base_name, ext = os.path.splitext(input_path)
+        output_path = f"{base_name}-editable{ext}"
     
-    # 添加脚本
-    body.append(BeautifulSoup(EDITOR_SCRIPTS, 'html.parser'))
+    piped = '-' in (input_path, output_path)
+    mode = args.mode or ('stream' if piped else 'tree')
+    
+    # 结果写到标准输出或输出JSON报告时，提示信息输出到stderr
+    log = sys.stderr if (args.report or output_path == '-') else sys.stdout
+    profiler = PhaseProfiler(enabled=bool(args.report), track_memory=args.profile,
+                             cprofile_dir=args.cprofile).start()
     
-    # 写入输出文件
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(str(soup))
-        print(f"已成功生成可编辑HTML文件: {output_path}")
-        print("原始文件: {0}".format(input_path))
-        print("可编辑文件: {0}".format(output_path))
-        print("\n在浏览器中打开可编辑文件，使用以下功能:")
-        print("1. 元素检查: 查看页面元素的结构和样式")
-        print("2. 区域编辑: 复制或删除页面上的区域")
-        print("3. 文本编辑: 直接编辑页面上的文本内容")
-        print("4. 图片编辑: 上传新图片替换现有图片")
+        if mode == 'stream':
+            # 流式注入：读取、注入和写出交替进行
+            try:
+                infile = sys.stdin.buffer if input_path == '-' else open(input_path, 'rb')
+            except Exception as e:
+                print(f"读取文件时出错: {e}", file=log)
+                sys.exit(1)
+            with infile, open_output(output_path) as writer:
+                with profiler.phase('stream'):
+                    input_bytes, page = run_stream(infile, writer, features=features, input_path=input_path,
+                                                   profiler=profiler)
+                with profiler.phase('write'):
+                    writer.commit()
+        else:
+            # 读取输入文件（原始字节，按页面声明的编码解码）
+            try:
+                with profiler.phase('read'):
+                    html_content = read_bytes(input_path)
+            except Exception as e:
+                print(f"读取文件时出错: {e}", file=log)
+                sys.exit(1)
+            input_bytes = len(html_content)
+            
+            # 使用BeautifulSoup解析HTML并添加编辑工具
+            try:
+                with profiler.phase('identify'):
+                    page = page_identity(html_content, input_path)
+                with profiler.phase('parse'):
+                    soup, charset = parse_document(html_content)
+            except Exception as e:
+                print(f"解析页面时出错: {e}", file=log)
+                sys.exit(1)
+            # 解析完成后不再需要源数据
+            del html_content
+            try:
+                inject_editor(soup, profiler, charset=charset, features=features, page=page)
+            except Exception as e:
+                print(f"注入编辑器时出错: {e}", file=log)
+                sys.exit(1)
+            
+            # 流式写入输出，不在内存中拼出完整的输出字符串，按页面原来的编码输出
+            try:
+                with open_output(output_path) as writer:
+                    with profiler.phase('serialize'):
+                        stream_html(soup, writer, charset=charset)
+                    with profiler.phase('write'):
+                        writer.commit()
+            except BrokenPipeError:
+                raise
+            except Exception as e:
+                print(f"写入文件时出错: {e}", file=log)
+                sys.exit(1)
+        output_bytes = writer.bytes_written
+    except BrokenPipeError:
+        # 下游提前关闭了管道
+        sys.stdout = open(os.devnull, 'w')
+        sys.exit(1)
+    except SystemExit:
+        raise
     except Exception as e:
-        print(f"写入文件时出错: {e}")
+        # 流式注入时读取、注入和写出交替进行
+        print(f"处理页面时出错: {e}", file=log)
         sys.exit(1)
+    finally:
+        profiler.stop()
+    
+    if output_path != '-':
+        print(f"已成功生成可编辑HTML文件: {output_path}", file=log)
+        print("原始文件: {0}".format(input_path), file=log)
+        print("可编辑文件: {0}".format(output_path), file=log)
+    if log is sys.stdout:
+        print("\n在浏览器中打开可编辑文件，使用以下功能:")
+        for index, name in enumerate(features, 1):
+            print(f"{index}. {FEATURE_DESCRIPTIONS[name]}")
+    
+    if args.profile or args.cprofile:
+        profiler.print_table(log)
+    if args.report == 'json':
+        report = build_report(input_path, output_path, mode, input_bytes, output_bytes, profiler, features, page)
+        print(json.dumps(report, ensure_ascii=False, indent=2), file=log if output_path == '-' else sys.stdout)
 
 # 运行主函数
 if __name__ == "__main__":
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+html_edit_daemon.py - html_edit.py 的常驻服务
+
+导出程序逐页调用 html_edit.py 时，每一页都要重新启动解释器、导入bs4、准备编辑器载荷。
+常驻服务在Unix域套接字上接收任务，交给预热好的进程池执行，单页延迟从几百毫秒降到几毫秒。
+
+支持的任务:
+    instrument  为页面注入编辑器
+    apply       把编辑器保存的编辑结果（在页面控制台执行 exportEditorEdits() 导出的JSON）写回页面，默认同时移除编辑器
+    strip       移除页面中的编辑器
+
+用法:
+    python html_edit_daemon.py serve [--socket PATH] [--workers N]
+    python html_edit_daemon.py instrument <input> [<output>] [--mode tree|stream] [--parser html.parser]
+                                          [--features text,image,region,inspect]
+    python html_edit_daemon.py apply <input> <edits.json> [<output>] [--keep-editor]
+    python html_edit_daemon.py strip <input> [<output>]
+    python html_edit_daemon.py ping | stop
+
+输入为 "-" 时从标准输入读取页面；未指定输出或输出为 "-" 时结果写到标准输出。
+文件路径会转换为绝对路径后交给服务端直接读写，页面内容不经过套接字。
+
+协议:
+    每条消息由两帧组成：JSON头部帧和内容帧。每帧前有4字节大端长度。
+    请求头部: {"job": "instrument", "input": 路径或null, "output": 路径或null, ...}
+    响应头部: {"ok": true, "output": 路径或null, "bytes": 输出字节数, "seconds": 处理耗时}
+              或 {"ok": false, "error": 错误信息}
+    没有输入路径时页面放在请求的内容帧中；没有输出路径时结果放在响应的内容帧中。
+    同一个连接上可以连续发送多条请求。
+"""
+
+import os
+import sys
+import json
+import stat
+import time
+import socket
+import struct
+import signal
+import argparse
+import threading
+import socketserver
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 单帧最大长度
+MAX_FRAME = 1 << 30
+FRAME_HEADER = struct.Struct('>I')
+JOBS = ('instrument', 'apply', 'strip')
+# 注入方式（与 html_edit.INJECT_MODES 一致，客户端不导入 html_edit）
+INJECT_MODES = ('tree', 'stream')
+
+
+# 没有 XDG_RUNTIME_DIR 时放置套接字的目录，只有当前用户可以访问
+def fallback_socket_dir():
+    return os.path.join('/tmp', f"html_edit-{os.getuid()}")
+
+
+# 默认套接字路径
+def default_socket_path():
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'html_edit.sock')
+    return os.path.join(fallback_socket_dir(), 'html_edit.sock')
+
+
+# 检查套接字所在的 /tmp 目录：必须是当前用户所有、其他用户无权访问的真实目录（不是符号链接），
+# 防止其他用户预先创建同名目录或套接字冒充服务。create 为 True 时目录不存在则以0700创建
+def check_socket_dir(socket_path, create=False):
+    path = os.path.dirname(os.path.abspath(socket_path))
+    if path != fallback_socket_dir():
+        return
+    if create:
+        try:
+            os.mkdir(path, 0o700)
+        except FileExistsError:
+            pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"套接字目录不安全（应为当前用户所有且权限为0700）: {path}")
+
+
+# 读取指定长度的数据，连接在消息开头关闭时返回None
+def recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(min(size - len(buf), 1 << 20))
+        if not chunk:
+            if buf:
+                raise ConnectionError('连接在消息中途关闭')
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+# 发送一帧
+def send_frame(sock, data):
+    sock.sendall(FRAME_HEADER.pack(len(data)))
+    if data:
+        sock.sendall(data)
+
+
+# 接收一帧
+def recv_frame(sock):
+    header = recv_exact(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise ValueError(f"帧长度超出限制: {size}")
+    if size == 0:
+        return b''
+    data = recv_exact(sock, size)
+    if data is None:
+        raise ConnectionError('连接在消息中途关闭')
+    return data
+
+
+# 发送一条消息（头部 + 内容）
+def send_message(sock, header, body=b''):
+    send_frame(sock, json.dumps(header, ensure_ascii=False).encode('utf-8'))
+    send_frame(sock, body)
+
+
+# 接收一条消息，连接关闭时返回None
+def recv_message(sock):
+    header = recv_frame(sock)
+    if header is None:
+        return None
+    body = recv_frame(sock)
+    if body is None:
+        raise ConnectionError('连接在消息中途关闭')
+    return json.loads(header.decode('utf-8')), body
+
+
+# ---- 工作进程 ----
+
+# 进程池初始化：导入bs4并准备好编辑器载荷，之后的任务不再有这些开销
+def init_worker():
+    # 终止信号由主进程处理
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sys.path.insert(0, SCRIPT_DIR)
+    import html_edit
+    for mode in html_edit.INJECT_MODES:
+        html_edit.get_instrumenter(mode)
+
+
+# 预热任务，返回工作进程号
+# 稍作停留，使同时提交的预热任务分散到不同的工作进程上
+def warm_worker():
+    time.sleep(0.05)
+    return os.getpid()
+
+
+# 读取任务的编辑结果
+def load_edits(header):
+    if header.get('edits') is not None:
+        return header['edits']
+    with open(header['edits_path'], 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# 在工作进程中执行一个任务，返回 (响应头部, 响应内容)
+def run_job(header, body):
+    import html_edit
+    start = time.perf_counter()
+    job = header.get('job')
+    instrumenter = html_edit.get_instrumenter(header.get('mode', 'tree'), header.get('parser', 'html.parser'),
+                                              header.get('features'))
+
+    source = body
+    if header.get('input'):
+        with open(header['input'], 'rb') as f:
+            source = f.read()
+
+    if job == 'instrument':
+        output = instrumenter.instrument(source, input_path=header.get('input'))
+    elif job == 'strip':
+        output = instrumenter.strip(source)
+    elif job == 'apply':
+        output = instrumenter.apply(source, load_edits(header), strip=header.get('strip', True))
+    else:
+        raise ValueError(f"未知的任务: {job}")
+
+    response = {'ok': True, 'output': header.get('output'), 'bytes': len(output)}
+    if header.get('output'):
+        html_edit.write_bytes(header['output'], output)
+        output = b''
+    response['seconds'] = time.perf_counter() - start
+    return response, output
+
+
+# ---- 服务端 ----
+
+class RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (ConnectionError, ValueError) as e:
+                print(f"读取请求失败: {e}", file=sys.stderr)
+                return
+            if message is None:
+                return
+            header, body = message
+            job = header.get('job')
+
+            if job == 'ping':
+                response, output = {'ok': True, 'workers': self.server.workers}, b''
+            elif job == 'stop':
+                send_message(self.request, {'ok': True})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+            elif job not in JOBS:
+                response, output = {'ok': False, 'error': f"未知的任务: {job}"}, b''
+            else:
+                try:
+                    response, output = self.server.run(header, body)
+                except Exception as e:
+                    response, output = {'ok': False, 'error': f"{type(e).__name__}: {e}"}, b''
+
+            try:
+                send_message(self.request, response, output)
+            except OSError:
+                return
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, pool, workers):
+        self.pool = pool
+        self.workers = workers
+        self.pool_lock = threading.Lock()
+        super().__init__(socket_path, RequestHandler)
+
+    # 绑定时屏蔽组和其他用户的权限，套接字文件从创建起就只有当前用户可以连接
+    def server_bind(self):
+        old_umask = os.umask(0o077)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(old_umask)
+
+    # 在进程池中执行一个任务，返回 (响应头部, 响应内容)
+    # 工作进程异常退出（如被OOM终止）会使整个进程池损坏，此时重建进程池并重试一次，
+    # 再次失败时把错误返回给客户端，下一个任务会再次重建
+    def run(self, header, body):
+        from concurrent.futures.process import BrokenProcessPool
+        pool = self.pool
+        try:
+            return pool.submit(run_job, header, body).result()
+        except BrokenProcessPool:
+            print("工作进程异常退出，重建进程池", file=sys.stderr)
+            self.rebuild_pool(pool)
+            return self.pool.submit(run_job, header, body).result()
+
+    # 重建损坏的进程池；多个连接同时发现损坏时只重建一次
+    def rebuild_pool(self, broken):
+        with self.pool_lock:
+            if self.pool is broken:
+                self.pool, _ = start_pool(self.workers)
+                broken.shutdown(wait=False)
+
+
+# 启动进程池，返回 (进程池, 工作进程号集合)
+# 同时提交与进程数相同的预热任务，让进程池一次启动全部工作进程
+def start_pool(workers):
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+    pids = set(f.result() for f in [pool.submit(warm_worker) for _ in range(workers)])
+    return pool, pids
+
+
+# 启动服务
+def serve(socket_path, workers):
+    try:
+        check_socket_dir(socket_path, create=True)
+    except OSError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+    # 清理上次异常退出留下的套接字文件；不是当前用户的套接字时不删除也不使用
+    if os.path.lexists(socket_path):
+        st = os.lstat(socket_path)
+        if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+            print(f"套接字路径已被占用（不是当前用户的套接字）: {socket_path}", file=sys.stderr)
+            sys.exit(1)
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)
+        else:
+            probe.close()
+            print(f"服务已在运行: {socket_path}", file=sys.stderr)
+            sys.exit(1)
+
+    pool, pids = start_pool(workers)
+    server = DaemonServer(socket_path, pool, workers)
+
+    def on_signal(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    print(f"html_edit 服务已启动: {socket_path}（{len(pids)} 个工作进程）", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server.pool.shutdown(cancel_futures=True)
+        print("html_edit 服务已停止", file=sys.stderr)
+
+
+# ---- 客户端 ----
+
+class Client:
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or default_socket_path()
+        check_socket_dir(self.socket_path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self.sock.close()
+
+    # 发送一个任务并等待结果，返回 (响应头部, 响应内容)
+    def request(self, header, body=b''):
+        send_message(self.sock, header, body)
+        message = recv_message(self.sock)
+        if message is None:
+            raise ConnectionError('服务端关闭了连接')
+        return message
+
+
+# 构建命令行参数解析器
+def build_parser():
+    parser = argparse.ArgumentParser(description='html_edit.py 常驻服务')
+    parser.add_argument('--socket', default=None,
+                        help='Unix套接字路径（默认：$XDG_RUNTIME_DIR/html_edit.sock，或 /tmp/html_edit-<uid>/html_edit.sock）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('serve', help='启动服务')
+    p.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='工作进程数')
+
+    p = sub.add_parser('instrument', help='为页面注入编辑器')
+    p.add_argument('input')
+    p.add_argument('output', nargs='?', default='-')
+    p.add_argument('--mode', default='tree', choices=INJECT_MODES, help='注入方式')
+    p.add_argument('--parser', default='html.parser', help='BeautifulSoup解析器')
+    p.add_argument('--features', default=None, help='要注入的功能，逗号分隔（默认全部）')
+
+    p = sub.add_parser('apply', help='把编辑结果写回页面')
+    p.add_argument('input')
+    p.add_argument('edits', help='编辑结果JSON文件（exportEditorEdits() 导出的 editedTexts、editedImages 等）')
+    p.add_argument('output', nargs='?', default='-')
+    p.add_argument('--keep-editor', action='store_true', help='保留页面中的编辑器')
+
+    p = sub.add_parser('strip', help='移除页面中的编辑器')
+    p.add_argument('input')
+    p.add_argument('output', nargs='?', default='-')
+
+    sub.add_parser('ping', help='检查服务是否在运行')
+    sub.add_parser('stop', help='停止服务')
+    return parser
+
+
+# 主函数
+def main():
+    args = build_parser().parse_args()
+    socket_path = args.socket or default_socket_path()
+
+    if args.command == 'serve':
+        serve(socket_path, max(args.workers, 1))
+        return
+
+    try:
+        client = Client(socket_path)
+    except OSError as e:
+        print(f"无法连接服务 {socket_path}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    with client:
+        if args.command in ('ping', 'stop'):
+            response, _ = client.request({'job': args.command})
+            print(json.dumps(response, ensure_ascii=False))
+            return
+
+        header = {'job': args.command}
+        body = b''
+        if args.input == '-':
+            header['input'] = None
+            body = sys.stdin.buffer.read()
+        else:
+            header['input'] = os.path.abspath(args.input)
+        header['output'] = None if args.output == '-' else os.path.abspath(args.output)
+        if args.command == 'instrument':
+            header.update(mode=args.mode, parser=args.parser, features=args.features)
+        elif args.command == 'apply':
+            header.update(edits_path=os.path.abspath(args.edits), strip=not args.keep_editor)
+
+        response, output = client.request(header, body)
+
+    if not response.get('ok'):
+        print(f"处理失败: {response.get('error')}", file=sys.stderr)
+        sys.exit(1)
+    if header['output'] is None:
+        sys.stdout.buffer.write(output)
+        sys.stdout.buffer.flush()
+    else:
+        print(f"已生成: {response['output']}（{response['bytes']} 字节，{response['seconds'] * 1000:.1f}ms）", file=sys.stderr)
+
+
+# 运行主函数
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3597 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+html_edit_payload.py - html_edit.py 注入的编辑器载荷
+
+编辑器按功能分为几个模块，每个模块有自己的样式、元素和脚本：
+    core     编辑器按钮、模式切换和各模块共用的函数（总是包含）
+    inspect  元素检查
+    region   区域编辑（复制、删除区域）
+    text     文本编辑
+    image    图片编辑（单图、背景图、轮播图和图片上传模态框）
+build_payload() 只用所选模块组装出三段载荷 (样式, 元素, 脚本)，
+EDITOR_STYLES、EDITOR_ELEMENTS、EDITOR_SCRIPTS 是包含全部功能的载荷。
+
+页面加载时只执行很小的启动脚本（core 和各模式的按钮信息）。各模式的实现放在
+<script type="text/x-editor-chunk" id="editor-chunk-模式名" data-editor-chunk="指纹"> 中，
+浏览器不会解析这些脚本块，直到模式第一次启用（或有保存的修改需要恢复）时才执行。
+没有启用任何模式时编辑器不持有文档级监听器和定时器，可在控制台执行 editorSelfCheck() 检查。
+保存的修改按 html_edit.py 写入的页面标识分开存放，页面只读取自己的修改。
+上传的图片先在 Web Worker 中按显示尺寸缩小并重新编码（WebP 或 JPEG），
+再按内容哈希保存在 IndexedDB 中，localStorage 只记录引用；在控制台执行
+copy(await exportEditorEdits()) 得到 html_edit.py apply 使用的编辑结果JSON（图片为 data URL）。
+运行时在 window.editorPerf 中记录初始化、模式切换、扫描、恢复、缩放和上传的耗时，日志按级别输出（默认只输出警告和错误）。
+
+本模块由 html_edit.py 在需要时才导入。作为独立模块导入时，Python会把它编译缓存到
+__pycache__ 中，之后的每次运行直接加载预编译的 .pyc，不必再编译这几千行字符串。
+"""
+
+# 可选的编辑功能，按注入顺序排列（也是编辑器按钮从右向左的顺序）
+FEATURES = ('inspect', 'region', 'text', 'image')
+
+# 公共样式：编辑器按钮和高亮框
+CORE_STYLES = """
+/* 编辑器按钮样式 */
+.editor-button {
+  position: fixed;
+  bottom: 20px;
+  z-index: 10000;
+  padding: 10px 15px;
+  background-color: #4285f4;
+  color: #fff;
+  border: none;
+  border-radius: 4px;
+  cursor: pointer;
+  box-shadow: 0 2px 5px rgba(0,0,0,0.3);
+  font-size: 14px;
+  font-weight: bold;
+  transition: background-color 0.2s;
+}
+
+/* 元素高亮样式 */
+.element-highlight {
+  position: absolute;
+  z-index: 9999;
+  pointer-events: none;
+  border: 2px solid #ea4335;
+  background-color: rgba(234, 67, 53, 0.1);
+  box-sizing: border-box;
+}
+"""
+
+# 公共脚本：共享变量、模式注册和切换、高亮、初始化
+CORE_SCRIPTS = """
+// 全局共享变量
+window.editorVars = {
+  isTextEditMode: false,
+  isImageEditMode: false,
+  isInspecting: false,
+  isEditMode: false,
+  activeMode: null, // 当前启用的编辑模式名称
+  editedTextElements: {},
+  editedImages: {},
+  editedBackgroundImages: {},
+  editedCarouselImages: {},
+  currentEditingImage: null,
+  currentEditingElement: null,
+  currentEditingType: 'single', // 'single', 'background', 'carousel', 'container'
+  selectedElement: null,
+  hoverElement: null,
+  hoveredHighlight: null,
+  highlightElement: null,
+  uploadedMultipleImages: [],
+  containerImages: [], // 存储容器内的所有图片
+  selectedImageIndex: -1, // 当前选中的图片索引
+  selectedSingleFile: null, // 存储单个选择的文件
+  selectedMultipleFiles: null, // 存储多个选择的文件
+  buttons: {} // 存储编辑器按钮引用，按模式名称索引
+};
+
+// 日志级别：silent < error < warn < info < debug，默认只输出警告和错误
+// 在页面加载前设置 window.EDITOR_LOG_LEVEL，或在控制台执行 editorPerf.setLogLevel('debug')（保存在 localStorage 中）
+const EDITOR_LOG_LEVELS = { silent: 0, error: 1, warn: 2, info: 3, debug: 4 };
+const editorLog = { level: null };
+
+// 按级别绑定日志函数：关闭的级别换成空函数，开启的级别直接绑定 console，调试工具中仍显示调用位置
+function setEditorLogLevel(level) {
+  if (!(level in EDITOR_LOG_LEVELS)) {
+    editorLog.warn('[WARN] 未知的日志级别:', level);
+    return editorLog.level;
+  }
+  const rank = EDITOR_LOG_LEVELS[level];
+  const noop = function() {};
+  editorLog.level = level;
+  editorLog.error = rank >= 1 ? console.error.bind(console) : noop;
+  editorLog.warn = rank >= 2 ? console.warn.bind(console) : noop;
+  editorLog.info = rank >= 3 ? console.info.bind(console) : noop;
+  editorLog.debug = rank >= 4 ? console.log.bind(console) : noop;
+  return level;
+}
+
+setEditorLogLevel('warn');
+if (localStorage.getItem('editorLogLevel') || window.EDITOR_LOG_LEVEL) {
+  setEditorLogLevel(localStorage.getItem('editorLogLevel') || window.EDITOR_LOG_LEVEL);
+}
+
+// 运行时性能记录：初始化、模式切换、扫描、恢复保存的修改和上传各记为一段，带处理的元素数
+// 每段同时用 performance.mark/measure 标记（名称以 editor: 开头），可在浏览器性能面板中查看
+// 在控制台执行 editorPerf.report() 查看汇总，copy(editorPerf.exportJSON()) 复制 JSON
+const EDITOR_PERF_MAX_SPANS = 500;
+const editorPerf = {
+  spans: [], // 最近的记录 { name, start, duration, count }
+  sequence: 0,
+
+  // 开始一段，返回交给 end() 的记录
+  start: function(name) {
+    const mark = 'editor:' + name + ':' + (++this.sequence);
+    performance.mark(mark);
+    return { name: name, mark: mark, start: performance.now() };
+  },
+
+  // 结束一段，count 为处理的元素数；返回耗时（毫秒）
+  end: function(span, count) {
+    if (!span || span.ended) return 0;
+    span.ended = true;
+    const duration = performance.now() - span.start;
+    performance.measure('editor:' + span.name, span.mark);
+    performance.clearMarks(span.mark);
+
+    this.spans.push({
+      name: span.name,
+      start: Math.round(span.start * 10) / 10,
+      duration: Math.round(duration * 100) / 100,
+      count: typeof count === 'number' ? count : null
+    });
+    if (this.spans.length > EDITOR_PERF_MAX_SPANS) {
+      this.spans.splice(0, this.spans.length - EDITOR_PERF_MAX_SPANS);
+    }
+    editorLog.info(`[PERF] ${span.name}: ${duration.toFixed(1)}ms` + (typeof count === 'number' ? `，${count} 个元素` : ''));
+    return duration;
+  },
+
+  // 按名称汇总：次数、总耗时、最长耗时和处理的元素数，附带各模式当前修改着的元素数
+  report: function() {
+    const phases = {};
+    this.spans.forEach(s => {
+      const phase = phases[s.name] || (phases[s.name] = { calls: 0, totalMs: 0, maxMs: 0, elements: 0 });
+      phase.calls++;
+      phase.totalMs += s.duration;
+      phase.maxMs = Math.max(phase.maxMs, s.duration);
+      phase.elements += s.count || 0;
+    });
+    Object.keys(phases).forEach(name => {
+      phases[name].totalMs = Math.round(phases[name].totalMs * 100) / 100;
+    });
+    return {
+      url: location.href,
+      logLevel: editorLog.level,
+      activeMode: window.editorVars.activeMode,
+      touched: editorSelfCheck().touched,
+      phases: phases,
+      spans: this.spans.slice()
+    };
+  },
+
+  // 导出 report() 的 JSON 文本
+  exportJSON: function() {
+    return JSON.stringify(this.report(), null, 2);
+  },
+
+  // 清空记录（只清除编辑器自己的 performance 条目）
+  clear: function() {
+    new Set(this.spans.map(s => s.name)).forEach(name => performance.clearMeasures('editor:' + name));
+    this.spans = [];
+  },
+
+  // 设置并保存日志级别
+  setLogLevel: function(level) {
+    const applied = setEditorLogLevel(level);
+    if (applied === level) {
+      localStorage.setItem('editorLogLevel', level);
+    }
+    return applied;
+  }
+};
+window.editorPerf = editorPerf;
+
+// 已注册的编辑模式。启动脚本只注册按钮需要的信息，模式的实现在首次启用时从
+// 对应的脚本块（<script type="text/x-editor-chunk" id="editor-chunk-模式名">）中加载
+// 模式定义: { flag, label, activeLabel, activeColor, activeTextColor, restoreKeys,
+//             loaded, init, enable, disable, restore, exportEdits, hover, follow, scan }
+// hover(element, x, y) 在指针下的元素变化时调用，follow(x, y) 在元素不变、只有指针移动时调用
+// scan(root) 处理模式启用后新插入页面的子树
+// restore() 返回恢复的修改数（或它的 Promise），exportEdits(edits) 把 edits 中的引用换成可导出的内容
+const editorModes = {};
+// 编辑器按钮从右向左排列的顺序和位置
+const EDITOR_MODE_ORDER = ['inspect', 'region', 'text', 'image'];
+const EDITOR_BUTTON_OFFSETS = [30, 180, 350, 580];
+
+// 注册编辑模式，多次注册时合并定义（脚本块加载后补上 init、enable 等实现）
+function registerEditorMode(name, mode) {
+  editorModes[name] = Object.assign(editorModes[name] || {}, mode);
+}
+
+// 加载编辑模式的脚本块，每个模式只加载一次；返回是否加载成功
+function loadEditorChunk(name) {
+  const mode = editorModes[name];
+  if (mode.loaded) return true;
+
+  const chunk = document.getElementById('editor-chunk-' + name);
+  if (!chunk) {
+    editorLog.error('[ERROR] 找不到编辑模式的脚本:', name);
+    return false;
+  }
+
+  editorLog.debug('[DEBUG] 加载编辑模式脚本:', name, chunk.dataset.editorChunk);
+  const span = editorPerf.start('load:' + name);
+  // 插入到文档中的内联脚本会立即同步执行，sourceURL 让调试工具按模式和指纹显示脚本
+  const script = document.createElement('script');
+  script.textContent = chunk.textContent + '\\n//# sourceURL=editor-' + name + '.' + chunk.dataset.editorChunk + '.js';
+  document.head.appendChild(script);
+  script.remove();
+  editorPerf.end(span);
+
+  if (!mode.enable) {
+    editorLog.error('[ERROR] 编辑模式脚本没有注册实现:', name);
+    return false;
+  }
+  mode.loaded = true;
+  if (mode.init) {
+    mode.init();
+  }
+  return true;
+}
+
+// 页面标识：html_edit.py 写在启动脚本标签的 data-editor-page 上（输入路径和内容摘要），没有时使用页面地址
+// 保存的修改按页面分开存放在 'editor:页面标识:名称' 下，只读取当前页面的修改；
+// 'editor:pages' 是有保存修改的页面索引 { 页面标识: 最后修改时间 }
+const EDITOR_PAGE = (document.currentScript || document.getElementById('editor-script') || { dataset: {} }).dataset.editorPage ||
+  location.pathname;
+const EDITOR_PAGES_KEY = 'editor:pages';
+
+// 当前页面保存修改用的 localStorage 键
+function editorStorageKey(name) {
+  return 'editor:' + EDITOR_PAGE + ':' + name;
+}
+
+// 有保存修改的页面，在控制台执行 editorPages() 查看
+function editorPages() {
+  return JSON.parse(localStorage.getItem(EDITOR_PAGES_KEY) || '{}');
+}
+
+// 检查模式是否有保存的修改需要恢复（恢复键保存的是映射或索引数组）
+function hasSavedEdits(mode) {
+  return (mode.restoreKeys || []).some(key => {
+    const saved = localStorage.getItem(editorStorageKey(key));
+    return saved && saved !== '{}' && saved !== '[]';
+  });
+}
+
+// 导出保存的修改，格式与 html_edit.py apply 使用的编辑结果JSON相同（图片为 data URL）
+// 在控制台执行 copy(await exportEditorEdits())
+function exportEditorEdits() {
+  const edits = {};
+  const exporting = [];
+  Object.keys(editorModes).forEach(name => {
+    const mode = editorModes[name];
+    (mode.restoreKeys || []).forEach(key => {
+      edits[key] = JSON.parse(localStorage.getItem(editorStorageKey(key)) || '{}');
+    });
+    if (hasSavedEdits(mode) && loadEditorChunk(name) && mode.exportEdits) {
+      exporting.push(mode.exportEdits(edits));
+    }
+  });
+  return Promise.all(exporting).then(() => JSON.stringify(edits, null, 2));
+}
+
+// 编辑器持有的文档级监听器和定时器，按所属模式登记
+// 没有启用任何模式时两个列表都应为空，模式关闭时由 releaseEditorResources() 全部释放
+const editorResources = { listeners: [], timers: [], observers: [] };
+
+// 添加由编辑器持有的事件监听，同一目标、事件和处理函数只添加一次
+function addEditorListener(owner, target, type, handler, options) {
+  const exists = editorResources.listeners.some(l => l.target === target && l.type === type && l.handler === handler);
+  if (exists) return;
+  target.addEventListener(type, handler, options);
+  editorResources.listeners.push({ owner, target, type, handler, options });
+}
+
+// 移除由编辑器持有的事件监听
+function removeEditorListener(target, type, handler) {
+  editorResources.listeners = editorResources.listeners.filter(l => {
+    if (l.target !== target || l.type !== type || l.handler !== handler) return true;
+    target.removeEventListener(type, handler, l.options);
+    return false;
+  });
+}
+
+// 启动由编辑器持有的定时器，repeat 为 true 时重复执行；返回定时器ID
+function startEditorTimer(owner, fn, delay, repeat) {
+  const timer = { owner, fn, delay, repeat: !!repeat, id: 0 };
+  if (repeat) {
+    timer.id = setInterval(fn, delay);
+  } else {
+    timer.id = setTimeout(function() {
+      editorResources.timers = editorResources.timers.filter(t => t !== timer);
+      fn();
+    }, delay);
+  }
+  editorResources.timers.push(timer);
+  return timer.id;
+}
+
+// 停止由编辑器持有的定时器
+function stopEditorTimer(id) {
+  editorResources.timers = editorResources.timers.filter(t => {
+    if (t.id !== id) return true;
+    (t.repeat ? clearInterval : clearTimeout)(t.id);
+    return false;
+  });
+}
+
+// 启动由编辑器持有的 MutationObserver
+function startEditorObserver(owner, callback, target, options) {
+  const observer = new MutationObserver(callback);
+  observer.observe(target, options);
+  editorResources.observers.push({ owner, observer, target, callback });
+  return observer;
+}
+
+// 释放某个模式持有的全部监听器、定时器和 MutationObserver
+function releaseEditorResources(owner) {
+  editorResources.listeners.filter(l => l.owner === owner).forEach(l => removeEditorListener(l.target, l.type, l.handler));
+  editorResources.timers.filter(t => t.owner === owner).forEach(t => stopEditorTimer(t.id));
+  editorResources.observers = editorResources.observers.filter(o => {
+    if (o.owner !== owner) return true;
+    o.observer.disconnect();
+    return false;
+  });
+}
+
+// 编辑器对页面元素的临时修改（类、属性、内联样式、插入的节点）按所属模式登记，
+// 修改前的原始值保存在 WeakMap 中。模式关闭时只回放登记过的元素，不再扫描整个文档
+const touchedElements = {};
+const touchedOriginals = new WeakMap();
+
+// 登记元素，返回它在该模式下的原始值记录
+function touchRecord(owner, element) {
+  const touched = touchedElements[owner] || (touchedElements[owner] = new Set());
+  touched.add(element);
+
+  let records = touchedOriginals.get(element);
+  if (!records) {
+    records = {};
+    touchedOriginals.set(element, records);
+  }
+  if (!records[owner]) {
+    records[owner] = {
+      classes: new Map(),
+      attributes: new Map(),
+      styles: new Map(),
+      hadClass: element.hasAttribute('class'),
+      hadStyle: element.hasAttribute('style'),
+      inserted: false
+    };
+  }
+  return records[owner];
+}
+
+// 为元素添加类
+function touchClass(owner, element, className) {
+  const record = touchRecord(owner, element);
+  if (!record.classes.has(className)) {
+    record.classes.set(className, element.classList.contains(className));
+  }
+  element.classList.add(className);
+}
+
+// 设置元素属性，value 为 null 时移除属性
+function touchAttribute(owner, element, name, value) {
+  const record = touchRecord(owner, element);
+  if (!record.attributes.has(name)) {
+    record.attributes.set(name, element.getAttribute(name));
+  }
+  if (value === null) {
+    element.removeAttribute(name);
+  } else {
+    element.setAttribute(name, value);
+  }
+}
+
+// 设置元素的内联样式，property 为CSS属性名（如 'box-shadow'）
+function touchStyle(owner, element, property, value) {
+  const record = touchRecord(owner, element);
+  if (!record.styles.has(property)) {
+    record.styles.set(property, [element.style.getPropertyValue(property), element.style.getPropertyPriority(property)]);
+  }
+  element.style.setProperty(property, value);
+}
+
+// 登记编辑器插入到页面中的节点，恢复时移除
+function touchNode(owner, node) {
+  touchRecord(owner, node).inserted = true;
+}
+
+// 是否为编辑器插入到页面中的节点
+function isTouchedNode(node) {
+  const records = touchedOriginals.get(node);
+  return !!records && Object.keys(records).some(owner => records[owner].inserted);
+}
+
+// 恢复一个模式修改过的元素，指定 element 时只恢复这一个元素；返回恢复的元素数
+function restoreTouched(owner, element) {
+  const touched = touchedElements[owner];
+  if (!touched) return 0;
+  const elements = element ? (touched.has(element) ? [element] : []) : Array.from(touched);
+
+  elements.forEach(el => {
+    touched.delete(el);
+    const records = touchedOriginals.get(el);
+    const record = records && records[owner];
+    if (!record) return;
+    delete records[owner];
+
+    if (record.inserted) {
+      el.remove();
+      return;
+    }
+    record.classes.forEach((had, className) => {
+      if (!had) el.classList.remove(className);
+    });
+    record.attributes.forEach((value, name) => {
+      if (value === null) {
+        el.removeAttribute(name);
+      } else {
+        el.setAttribute(name, value);
+      }
+    });
+    record.styles.forEach(([value, priority], property) => {
+      if (value) {
+        el.style.setProperty(property, value, priority);
+      } else {
+        el.style.removeProperty(property);
+      }
+    });
+    // 不留下编辑器产生的空 class、style 属性
+    if (!record.hadClass && el.getAttribute('class') === '') el.removeAttribute('class');
+    if (!record.hadStyle && el.getAttribute('style') === '') el.removeAttribute('style');
+  });
+  return elements.length;
+}
+
+// 自检：报告编辑器当前持有的定时器和监听器，idle 为 true 表示空闲时没有任何开销
+// 在控制台执行 editorSelfCheck() 查看
+function editorSelfCheck() {
+  const describe = target => target === document ? 'document' : target === window ? 'window' :
+    (target.id ? '#' + target.id : target.nodeName ? target.nodeName.toLowerCase() : String(target));
+  const report = {
+    activeMode: window.editorVars.activeMode,
+    timers: editorResources.timers.map(t => ({
+      owner: t.owner, handler: t.fn.name || 'anonymous', delay: t.delay, repeat: t.repeat
+    })),
+    listeners: editorResources.listeners.map(l => ({
+      owner: l.owner, target: describe(l.target), type: l.type, handler: l.handler.name || 'anonymous'
+    })),
+    observers: editorResources.observers.map(o => ({
+      owner: o.owner, target: describe(o.target), handler: o.callback.name || 'anonymous'
+    })),
+    // 各模式尚未恢复的页面元素数
+    touched: {}
+  };
+  Object.keys(touchedElements).forEach(owner => {
+    if (touchedElements[owner].size) report.touched[owner] = touchedElements[owner].size;
+  });
+  report.idle = report.timers.length === 0 && report.listeners.length === 0 && report.observers.length === 0 &&
+    Object.keys(report.touched).length === 0;
+  return report;
+}
+
+// 共享的指针跟踪：mousemove 只记录最新的指针位置和目标元素，每个动画帧最多处理一次，
+// 指针下的元素变化时才调用当前模式的 hover()，没有变化时只调用 follow()（如果有）
+const pointerTracker = { x: 0, y: 0, target: null, element: null, frame: 0 };
+
+// 记录指针位置，安排在下一帧处理
+function handlePointerMove(e) {
+  pointerTracker.x = e.clientX;
+  pointerTracker.y = e.clientY;
+  pointerTracker.target = e.target;
+  if (!pointerTracker.frame) {
+    pointerTracker.frame = requestAnimationFrame(flushPointer);
+  }
+}
+
+// 在动画帧中把最新的指针位置交给当前模式
+function flushPointer() {
+  pointerTracker.frame = 0;
+  const name = window.editorVars.activeMode;
+  const mode = name ? editorModes[name] : null;
+  if (!mode || !mode.hover) return;
+
+  const { x, y, target } = pointerTracker;
+  try {
+    if (target !== pointerTracker.element) {
+      pointerTracker.element = target;
+      mode.hover(target, x, y);
+    } else if (mode.follow) {
+      mode.follow(x, y);
+    }
+  } catch (error) {
+    editorLog.error('[ERROR] 处理指针移动失败:', name, error);
+  }
+}
+
+// 停止指针跟踪，取消尚未执行的帧
+function resetPointerTracker() {
+  if (pointerTracker.frame) {
+    cancelAnimationFrame(pointerTracker.frame);
+  }
+  pointerTracker.frame = 0;
+  pointerTracker.target = null;
+  pointerTracker.element = null;
+}
+
+// 动态插入的内容：启用的模式有 scan(root) 时观察页面的子节点变化。
+// MutationObserver 在每个微任务检查点把这段时间的全部变化一次交给回调，
+// 回调只把新加入的子树（去掉嵌套在其他新子树中的）交给 scan()，不重新扫描整个文档
+function handleAddedSubtrees(mutations) {
+  const name = window.editorVars.activeMode;
+  const mode = name ? editorModes[name] : null;
+  if (!mode || !mode.scan) return;
+
+  const added = new Set();
+  mutations.forEach(mutation => {
+    mutation.addedNodes.forEach(node => {
+      if (node.nodeType === Node.ELEMENT_NODE) added.add(node);
+    });
+  });
+
+  added.forEach(root => {
+    // 跳过已经移除的节点、编辑器自己的元素和插入的节点
+    if (!root.isConnected || isEditorElement(root) || isTouchedNode(root)) return;
+    for (let parent = root.parentElement; parent; parent = parent.parentElement) {
+      if (added.has(parent)) return;
+    }
+    try {
+      mode.scan(root);
+    } catch (error) {
+      editorLog.error('[ERROR] 处理新插入的内容失败:', name, error);
+    }
+  });
+}
+
+// root 及其后代中匹配选择器的元素
+// root 为 document 时就是整个文档中匹配的元素
+function queryWithin(root, selector) {
+  const found = Array.from(root.querySelectorAll(selector));
+  if (root.nodeType === Node.ELEMENT_NODE && root.matches(selector)) {
+    found.unshift(root);
+  }
+  return found;
+}
+
+// 新插入的子树 root 的祖先中匹配选择器、还没有标记的元素，由近到远
+// 遇到 isMarked(祖先) 为真的祖先就停止：标记是按包含的内容加的，已标记祖先的外层容器同样包含这些内容，
+// 在它被标记的那次扫描中已经标记过，不需要再检查
+function unmarkedAncestors(root, selector, isMarked) {
+  const found = [];
+  for (let parent = root.parentElement; parent; parent = parent.parentElement) {
+    if (!parent.matches(selector)) continue;
+    if (isMarked(parent)) break;
+    found.push(parent);
+  }
+  return found;
+}
+
+// 获取元素路径的函数
+function getElementPath(element) {
+  if (!element) return '';
+  
+  let path = [];
+  let current = element;
+  
+  while (current && current !== document.documentElement) {
+    let selector = current.tagName.toLowerCase();
+    
+    if (current.id) {
+      selector += '#' + current.id;
+    } else {
+      // 获取元素在其父元素中的索引
+      let index = 0;
+      let sibling = current;
+      while (sibling) {
+        if (sibling.tagName === current.tagName) {
+          index++;
+        }
+        sibling = sibling.previousElementSibling;
+      }
+      selector += `:nth-of-type(${index})`;
+    }
+    
+    path.unshift(selector);
+    current = current.parentElement;
+  }
+  
+  return path.join(' > ');
+}
+
+// 保存页面状态函数：记录修改时间，并把当前页面加入有修改的页面索引
+function savePageState() {
+  const now = new Date().getTime();
+  localStorage.setItem(editorStorageKey('pageLastModified'), now.toString());
+  const pages = editorPages();
+  pages[EDITOR_PAGE] = now;
+  localStorage.setItem(EDITOR_PAGES_KEY, JSON.stringify(pages));
+}
+
+// 添加编辑器按钮（只为已注册的模式添加）
+function addEditorButtons() {
+  const buttons = {};
+  let slot = 0;
+
+  EDITOR_MODE_ORDER.forEach(name => {
+    const mode = editorModes[name];
+    if (!mode) return;
+
+    const button = document.createElement('button');
+    button.innerText = mode.label;
+    button.className = 'editor-button';
+    button.style.right = EDITOR_BUTTON_OFFSETS[slot++] + 'px';
+    button.addEventListener('click', function() {
+      toggleEditorMode(name);
+    });
+    document.body.appendChild(button);
+    buttons[name] = button;
+  });
+
+  return buttons;
+}
+
+// 切换编辑模式：先关闭当前启用的模式，再启用所选模式（再次点击同一模式则只关闭）
+function toggleEditorMode(name) {
+  const v = window.editorVars;
+  const previous = v.activeMode;
+  editorLog.debug('[DEBUG] 切换编辑模式:', previous, '->', name);
+
+  if (previous) {
+    setEditorModeActive(previous, false);
+  }
+  if (previous !== name) {
+    setEditorModeActive(name, true);
+  }
+}
+
+// 启用或关闭一个编辑模式，并更新对应按钮的文字和颜色
+function setEditorModeActive(name, active) {
+  const v = window.editorVars;
+  const mode = editorModes[name];
+  const button = v.buttons[name];
+  const span = editorPerf.start((active ? 'enable:' : 'disable:') + name);
+
+  // 首次启用时才加载模式的实现
+  if (active && !loadEditorChunk(name)) {
+    editorPerf.end(span);
+    return;
+  }
+
+  v[mode.flag] = active;
+  v.activeMode = active ? name : null;
+
+  try {
+    if (active) {
+      mode.enable();
+      // 需要跟踪指针的模式共用一个 mousemove 监听
+      if (mode.hover) {
+        addEditorListener(name, document, 'mousemove', handlePointerMove, { passive: true });
+      }
+      // 之后插入页面的内容由 scan() 增量处理
+      if (mode.scan) {
+        startEditorObserver(name, handleAddedSubtrees, document.body, { childList: true, subtree: true });
+      }
+    } else {
+      mode.disable();
+    }
+  } catch (error) {
+    editorLog.error(`[ERROR] ${active ? '启用' : '关闭'}编辑模式失败:`, name, error);
+  }
+
+  // 模式关闭后释放它持有的监听器和定时器，恢复它修改过的页面元素（包括关闭失败的情况）
+  // 记录的元素数：启用时为模式修改的元素数，关闭时为恢复的元素数
+  let touched = touchedElements[name] ? touchedElements[name].size : 0;
+  if (!active) {
+    releaseEditorResources(name);
+    resetPointerTracker();
+    touched = restoreTouched(name);
+  }
+
+  if (button) {
+    button.innerText = active ? mode.activeLabel : mode.label;
+    button.style.backgroundColor = active ? mode.activeColor : '#4285f4';
+    button.style.color = active && mode.activeTextColor ? mode.activeTextColor : '#fff';
+  }
+  editorPerf.end(span, touched);
+}
+
+// 初始化编辑器功能
+function initEditor() {
+  editorLog.debug('[DEBUG] 开始初始化编辑器');
+  const span = editorPerf.start('init');
+  const v = window.editorVars;
+  editorLog.debug('[DEBUG] 已注册的编辑模式:', Object.keys(editorModes));
+
+  // 添加编辑器按钮
+  v.buttons = addEditorButtons();
+
+  // 初始化高亮元素
+  ensureHighlightElementsCreated();
+
+  // 应用保存的修改：只加载有保存修改的模式
+  editorLog.debug('[DEBUG] 开始应用保存的修改');
+  Object.keys(editorModes).forEach(name => {
+    const mode = editorModes[name];
+    if (!hasSavedEdits(mode)) return;
+    try {
+      if (loadEditorChunk(name) && mode.restore) {
+        // restore() 返回恢复的修改数，异步恢复时返回它的 Promise
+        const restoreSpan = editorPerf.start('restore:' + name);
+        Promise.resolve(mode.restore()).then(count => editorPerf.end(restoreSpan, count), error => {
+          editorLog.error('[ERROR] 应用保存的修改失败:', name, error);
+          editorPerf.end(restoreSpan, 0);
+        });
+      }
+    } catch (error) {
+      editorLog.error('[ERROR] 应用保存的修改失败:', name, error);
+    }
+  });
+  editorLog.debug('[DEBUG] 保存的修改应用完成');
+
+  editorPerf.end(span);
+  editorLog.debug('[DEBUG] 编辑器初始化完成');
+}
+
+// 确保创建和显示高亮元素
+function ensureHighlightElementsCreated() {
+  editorLog.debug('[DEBUG] 确保高亮元素已创建');
+  const v = window.editorVars;
+  
+  // 检查检查高亮元素
+  if (!document.querySelector('.element-highlight[data-highlight-type="inspect"]')) {
+    editorLog.debug('[DEBUG] 创建检查高亮元素');
+    const highlight = document.createElement('div');
+    highlight.className = 'element-highlight';
+    highlight.setAttribute('data-highlight-type', 'inspect');
+    highlight.style.position = 'absolute';
+    highlight.style.zIndex = '9999';
+    highlight.style.pointerEvents = 'none';
+    highlight.style.border = '2px solid #ea4335';
+    highlight.style.backgroundColor = 'rgba(234, 67, 53, 0.1)';
+    highlight.style.boxSizing = 'border-box';
+    highlight.style.display = 'none';
+    document.body.appendChild(highlight);
+    v.highlightElement = highlight;
+    editorLog.debug('[DEBUG] 检查高亮元素已创建');
+  } else {
+    editorLog.debug('[DEBUG] 检查高亮元素已存在');
+    v.highlightElement = document.querySelector('.element-highlight[data-highlight-type="inspect"]');
+  }
+  
+  // 检查悬停高亮元素
+  if (!document.querySelector('.element-highlight[data-highlight-type="hover"]')) {
+    editorLog.debug('[DEBUG] 创建悬停高亮元素');
+    const hover = document.createElement('div');
+    hover.className = 'element-highlight';
+    hover.setAttribute('data-highlight-type', 'hover');
+    hover.style.position = 'absolute';
+    hover.style.zIndex = '9998';
+    hover.style.pointerEvents = 'none';
+    hover.style.backgroundColor = 'rgba(66, 133, 244, 0.2)';
+    hover.style.border = '2px solid #4285f4';
+    hover.style.boxSizing = 'border-box';
+    hover.style.display = 'none';
+    document.body.appendChild(hover);
+    v.hoveredHighlight = hover;
+    editorLog.debug('[DEBUG] 悬停高亮元素已创建');
+  } else {
+    editorLog.debug('[DEBUG] 悬停高亮元素已存在');
+    v.hoveredHighlight = document.querySelector('.element-highlight[data-highlight-type="hover"]');
+  }
+  
+  editorLog.debug('[DEBUG] 高亮元素创建完成', {
+    highlightElement: !!v.highlightElement,
+    hoveredHighlight: !!v.hoveredHighlight
+  });
+}
+
+// 隐藏高亮
+function hideHighlight() {
+  editorLog.debug('[DEBUG] 隐藏高亮元素');
+  if (window.editorVars.highlightElement) {
+    window.editorVars.highlightElement.style.display = 'none';
+    editorLog.debug('[DEBUG] 高亮元素已隐藏');
+  } else {
+    editorLog.debug('[DEBUG] 无高亮元素可隐藏');
+  }
+}
+
+// 隐藏悬停高亮
+function hideHoverHighlight() {
+  editorLog.debug('[DEBUG] 隐藏悬停高亮');
+  if (window.editorVars.hoveredHighlight) {
+    window.editorVars.hoveredHighlight.style.display = 'none';
+    editorLog.debug('[DEBUG] 悬停高亮已隐藏');
+  } else {
+    editorLog.debug('[DEBUG] 无悬停高亮可隐藏');
+  }
+}
+
+// 高亮显示悬停元素
+function highlightHoverElement(element) {
+  const v = window.editorVars;
+  editorLog.debug('[DEBUG] 高亮显示悬停元素:', element ? element.tagName : 'null');
+  
+  if (!element) {
+    editorLog.debug('[DEBUG] 无元素可高亮');
+    return;
+  }
+  
+  if (!v.hoveredHighlight) {
+    editorLog.debug('[DEBUG] 悬停高亮元素不存在，尝试创建');
+    ensureHighlightElementsCreated();
+  }
+  
+  const hover = v.hoveredHighlight;
+  editorLog.debug('[DEBUG] 悬停高亮元素状态:', !!hover);
+  
+  if (!hover) {
+    editorLog.error('[ERROR] 悬停高亮元素创建失败');
+    return;
+  }
+  
+  const rect = element.getBoundingClientRect();
+  editorLog.debug('[DEBUG] 元素位置:', { 
+    top: rect.top, 
+    left: rect.left, 
+    width: rect.width, 
+    height: rect.height 
+  });
+  
+  hover.style.top = (rect.top + window.scrollY) + 'px';
+  hover.style.left = (rect.left + window.scrollX) + 'px';
+  hover.style.width = rect.width + 'px';
+  hover.style.height = rect.height + 'px';
+  hover.style.display = 'block';
+}
+
+// 编辑器自身的界面元素（检查器、区域编辑按钮、图片上传模态框、编辑器按钮、高亮框）
+const EDITOR_UI_SELECTOR = '#elementInspector, #divEditorButtons, #imageUploadModal, .editor-button, .element-highlight';
+
+// 元素是否属于编辑器自身的界面，委托的事件监听不处理这些元素上的事件
+function isEditorElement(element) {
+  return !!(element && element.closest && element.closest(EDITOR_UI_SELECTOR));
+}
+
+// 确保元素相对定位，以支持伪元素；owner 为修改元素的模式，模式关闭时恢复
+function ensureRelativePosition(element, owner) {
+  // 获取当前computed样式
+  const computedStyle = window.getComputedStyle(element);
+  
+  // 只有当元素不是relative、absolute或fixed时才设置relative
+  if (computedStyle.position === 'static') {
+    touchStyle(owner, element, 'position', 'relative');
+  }
+}
+
+// 初始化编辑器（只执行一次，之后不再保留文档级监听）
+document.addEventListener('DOMContentLoaded', function() {
+  editorLog.debug('[DEBUG] 初始化编辑器...');
+  initEditor();
+}, { once: true });
+"""
+
+# 元素检查
+INSPECT_STYLES = """
+/* 元素检查器样式 */
+#elementInspector {
+  position: fixed;
+  display: none;
+  z-index: 10000;
+  padding: 10px 15px;
+  background-color: #fff;
+  border: 1px solid #ddd;
+  border-radius: 4px;
+  box-shadow: 0 2px 10px rgba(0,0,0,0.2);
+  font-size: 12px;
+  max-width: 300px;
+  word-break: break-all;
+}
+"""
+
+# 元素检查器
+INSPECT_ELEMENTS = """
+<!-- 元素检查器 -->
+<div id="elementInspector"></div>
+"""
+
+# 元素检查模式
+INSPECT_MODE = """
+// 元素检查模式
+registerEditorMode('inspect', {
+  flag: 'isInspecting',
+  label: '启用元素检查',
+  activeLabel: '禁用元素检查',
+  activeColor: '#ea4335'
+});
+"""
+
+INSPECT_SCRIPTS = """
+// 显示检查器提示
+function showInspector(x, y, element) {
+  const v = window.editorVars;
+  editorLog.debug('[DEBUG] 显示检查器:', { x, y, element: element ? element.tagName : 'null' });
+  
+  if (!element) {
+    editorLog.debug('[DEBUG] 无元素可检查');
+    return;
+  }
+  
+  // 获取DOM元素
+  const inspector = document.getElementById('elementInspector');
+  if (!inspector) {
+    editorLog.error('[ERROR] 找不到检查器元素');
+    return;
+  }
+  
+  // 查找元素所在的最近的div
+  let containingDiv = element;
+  while (containingDiv && containingDiv.tagName.toLowerCase() !== 'div' && containingDiv !== document.body) {
+    containingDiv = containingDiv.parentElement;
+  }
+  
+  if (!containingDiv || containingDiv === document.body) {
+    containingDiv = element; // 如果找不到包含的div，则显示元素本身
+  }
+  
+  editorLog.debug('[DEBUG] 找到包含元素:', containingDiv ? containingDiv.tagName : 'null');
+  
+  // 获取元素名称
+  let info = '';
+  if (containingDiv.tagName) {
+    info = containingDiv.tagName.toLowerCase();
+    
+    if (containingDiv.id) {
+      info += `#${containingDiv.id}`;
+    }
+    
+    if (containingDiv.className && typeof containingDiv.className === 'string' && containingDiv.className.trim()) {
+      const classNames = containingDiv.className.split(' ').filter(cls => cls.trim());
+      if (classNames.length > 0) {
+        info += `.${classNames.join('.')}`;
+      }
+    }
+  }
+  
+  editorLog.debug('[DEBUG] 元素信息:', info);
+  
+  inspector.innerHTML = `<div><strong>${info}</strong></div>`;
+  inspector.style.display = 'block';
+  positionInspector(x, y);
+  
+  try {
+    // 高亮显示div元素
+    editorLog.debug('[DEBUG] 尝试高亮显示元素');
+    highlightTargetElement(containingDiv);
+    editorLog.debug('[DEBUG] 元素高亮成功');
+  } catch (error) {
+    editorLog.error('[ERROR] 元素高亮失败:', error);
+  }
+}
+
+// 把检查器提示放到指针旁边，并确保提示框在视窗内
+function positionInspector(x, y) {
+  const inspector = document.getElementById('elementInspector');
+  if (!inspector || inspector.style.display !== 'block') return;
+
+  const inspectorRect = inspector.getBoundingClientRect();
+  let left = x + 15;
+  let top = y;
+  
+  if (left + inspectorRect.width > window.innerWidth) {
+    left = x - inspectorRect.width - 5;
+  }
+  
+  if (top + inspectorRect.height > window.innerHeight) {
+    top = window.innerHeight - inspectorRect.height - 5;
+  }
+  
+  inspector.style.left = `${left}px`;
+  inspector.style.top = `${top}px`;
+}
+
+// 高亮显示元素
+function highlightTargetElement(element) {
+  const v = window.editorVars;
+  editorLog.debug('[DEBUG] 高亮显示元素:', element ? element.tagName : 'null');
+  
+  if (!element) {
+    editorLog.debug('[DEBUG] 无元素可高亮');
+    return;
+  }
+  
+  if (!v.highlightElement) {
+    editorLog.debug('[DEBUG] 高亮元素不存在，尝试创建');
+    ensureHighlightElementsCreated();
+  }
+  
+  const highlight = v.highlightElement;
+  editorLog.debug('[DEBUG] 高亮元素状态:', !!highlight);
+  
+  if (!highlight) {
+    editorLog.error('[ERROR] 高亮元素创建失败');
+    return;
+  }
+  
+  const rect = element.getBoundingClientRect();
+  editorLog.debug('[DEBUG] 元素位置:', { 
+    top: rect.top, 
+    left: rect.left, 
+    width: rect.width, 
+    height: rect.height 
+  });
+  
+  highlight.style.top = (rect.top + window.scrollY) + 'px';
+  highlight.style.left = (rect.left + window.scrollX) + 'px';
+  highlight.style.width = rect.width + 'px';
+  highlight.style.height = rect.height + 'px';
+  highlight.style.display = 'block';
+}
+
+// 指针下的元素变化 - 元素检查模式
+function handleInspectorHover(element, x, y) {
+  editorLog.debug('[DEBUG] 检查器指针下元素:', element ? element.tagName : 'null', { x, y });
+  
+  // 忽略编辑器自身的元素
+  if (element && (
+      element.id === 'elementInspector' || 
+      element.classList.contains('element-highlight') ||
+      element.classList.contains('editor-button'))) {
+    editorLog.debug('[DEBUG] 忽略编辑器自身元素');
+    return;
+  }
+  
+  try {
+    editorLog.debug('[DEBUG] 尝试显示检查器');
+    showInspector(x, y, element);
+    editorLog.debug('[DEBUG] 检查器显示成功');
+  } catch (error) {
+    editorLog.error('[ERROR] 显示检查器失败:', error);
+  }
+}
+
+// 隐藏检查器提示
+function hideInspector() {
+  editorLog.debug('[DEBUG] 隐藏检查器');
+  const inspector = document.getElementById('elementInspector');
+  if (inspector) {
+    inspector.style.display = 'none';
+    editorLog.debug('[DEBUG] 检查器已隐藏');
+  } else {
+    editorLog.debug('[DEBUG] 无检查器可隐藏');
+  }
+  hideHighlight();
+}
+
+// 元素检查模式的实现
+registerEditorMode('inspect', {
+  enable: function() {},
+  disable: function() {
+    hideInspector();
+    hideHighlight();
+  },
+  hover: handleInspectorHover,
+  follow: positionInspector
+});
+"""
+
+# 区域编辑
+REGION_STYLES = """
+/* 区域编辑模式下div显示为可点击 */
+.editor-region-mode div {
+  cursor: pointer !important;
+}
+
+/* 编辑按钮容器 */
+#divEditorButtons {
+  position: absolute;
+  display: none;
+  z-index: 10000;
+  gap: 5px;
+}
+
+/* 编辑按钮样式 */
+#editDuplicateBtn {
+  padding: 0 !important;
+  background-color: #34a853 !important;
+  color: white !important;
+  font-weight: bold !important;
+  display: flex !important;
+  align-items: center !important;
+  justify-content: center !important;
+  width: 36px !important;
+  height: 36px !important;
+  text-align: center !important;
+  font-size: 20px !important;
+  border-radius: 4px !important;
+  margin: 0 4px !important;
+  border: none !important;
+}
+
+#editRemoveBtn {
+  padding: 0 !important;
+  background-color: #ea4335 !important;
+  color: white !important;
+  font-weight: bold !important;
+  display: flex !important;
+  align-items: center !important;
+  justify-content: center !important;
+  width: 36px !important;
+  height: 36px !important;
+  text-align: center !important;
+  font-size: 20px !important;
+  border-radius: 4px !important;
+  margin: 0 4px !important;
+  border: none !important;
+}
+
+/* 选中的div元素样式 */
+.div-selected {
+  outline: 2px dashed #4285f4 !important;
+  outline-offset: 1px !important;
+  position: relative;
+}
+"""
+
+# 区域编辑按钮容器
+REGION_ELEMENTS = """
+<!-- 区域编辑按钮容器 -->
+<div id="divEditorButtons">
+  <button id="editDuplicateBtn" style="font-size: 20px; font-weight: bold; width: 36px; height: 36px; display: flex; align-items: center; justify-content: center; padding: 0; background-color: #34a853; color: white; border: none;">+</button>
+  <button id="editRemoveBtn" style="font-size: 20px; font-weight: bold; width: 36px; height: 36px; display: flex; align-items: center; justify-content: center; padding: 0; background-color: #ea4335; color: white; border: none;">-</button>
+</div>
+"""
+
+# 区域编辑模式
+REGION_MODE = """
+// 区域编辑模式
+registerEditorMode('region', {
+  flag: 'isEditMode',
+  label: '启用区域编辑模式',
+  activeLabel: '禁用区域编辑模式',
+  activeColor: '#ea4335'
+});
+"""
+
+REGION_SCRIPTS = """
+// 指针下的元素变化 - 区域编辑模式
+function handleRegionHover(element) {
+  editorLog.debug('[DEBUG] 区域编辑指针下元素:', element ? element.tagName : 'null');
+  
+  if (!window.editorVars.isEditMode) {
+    editorLog.debug('[DEBUG] 编辑模式未启用，不处理鼠标移动');
+    return;
+  }
+  
+  // 忽略我们的UI元素
+  if (element && (
+      element.id === 'elementInspector' || 
+      element.id === 'divEditorButtons' || 
+      element.classList.contains('element-highlight') ||
+      element.classList.contains('editor-button') ||
+      element === document.getElementById('editDuplicateBtn') ||
+      element === document.getElementById('editRemoveBtn'))) {
+    editorLog.debug('[DEBUG] 忽略UI元素');
+    hideHoverHighlight();
+    return;
+  }
+  
+  // 查找最近的div元素
+  let targetDiv = element;
+  while (targetDiv && targetDiv.tagName.toLowerCase() !== 'div' && targetDiv !== document.body) {
+    targetDiv = targetDiv.parentElement;
+  }
+  
+  editorLog.debug('[DEBUG] 目标DIV:', targetDiv ? targetDiv.tagName : 'null');
+  
+  if (!targetDiv || targetDiv === document.body || targetDiv === window.editorVars.selectedElement) {
+    editorLog.debug('[DEBUG] 无效目标或已选中，隐藏高亮');
+    hideHoverHighlight();
+    return;
+  }
+  
+  // 更新当前悬停元素
+  window.editorVars.hoverElement = targetDiv;
+  editorLog.debug('[DEBUG] 更新悬停元素:', window.editorVars.hoverElement.tagName);
+  
+  try {
+    // 显示高亮
+    editorLog.debug('[DEBUG] 尝试高亮悬停元素');
+    highlightHoverElement(window.editorVars.hoverElement);
+    editorLog.debug('[DEBUG] 悬停元素高亮成功');
+  } catch (error) {
+    editorLog.error('[ERROR] 悬停元素高亮失败:', error);
+  }
+}
+
+// 应用编辑模式到所有div：div的点击由一个委托的捕获阶段监听统一处理，可点击的光标由样式类提供
+function applyEditModeToDivs() {
+  editorLog.debug('[DEBUG] 应用编辑模式到所有DIV');
+  touchClass('region', document.documentElement, 'editor-region-mode');
+  addEditorListener('region', document, 'click', handleElementClick, true);
+}
+
+// 处理元素点击事件（委托的捕获阶段监听）：选中离点击位置最近的div
+function handleElementClick(e) {
+  const v = window.editorVars;
+  editorLog.debug('[DEBUG] 处理元素点击事件');
+  
+  if (!v.isEditMode) {
+    editorLog.debug('[DEBUG] 编辑模式未启用，不处理点击');
+    return;
+  }
+  
+  // 如果点击的是编辑器元素，交给它们自己的监听处理
+  if (isEditorElement(e.target)) {
+    editorLog.debug('[DEBUG] 点击的是编辑器元素，忽略');
+    return;
+  }
+  
+  // 获取点击的div，不在任何div中的点击不处理
+  const clickedElement = e.target.closest('div');
+  if (!clickedElement) return;
+  editorLog.debug('[DEBUG] 点击的元素:', clickedElement.tagName);
+  
+  // 阻止默认行为和事件传播
+  e.preventDefault();
+  e.stopPropagation();
+  
+  // 确保高亮元素存在
+  ensureHighlightElementsCreated();
+  
+  // 如果已经有选中的元素，移除选中状态
+  if (v.selectedElement) {
+    restoreTouched('region', v.selectedElement);
+    
+    // 隐藏编辑按钮
+    const editorButtons = document.getElementById('divEditorButtons');
+    if (editorButtons) {
+      editorButtons.style.display = 'none';
+    }
+    
+    editorLog.debug('[DEBUG] 移除先前选中元素的样式');
+  }
+  
+  // 更新选中的元素
+  if (v.selectedElement === clickedElement) {
+    // 如果再次点击同一个元素，取消选择
+    v.selectedElement = null;
+    hideEditorButtons();
+    editorLog.debug('[DEBUG] 取消选择元素');
+    return;
+  }
+  
+  // 设置新选中的元素
+  v.selectedElement = clickedElement;
+  
+  // 高亮显示选中的元素
+  markSelectedElement(v.selectedElement);
+  
+  // 显示编辑按钮
+  showEditorButtons(v.selectedElement);
+  
+  editorLog.debug('[DEBUG] 选中新元素，应用样式和显示按钮');
+}
+
+// 为选中的元素加上选中样式
+function markSelectedElement(element) {
+  touchStyle('region', element, 'border', '2px solid #34a853');
+  touchStyle('region', element, 'box-shadow', '0 0 10px rgba(52, 168, 83, 0.5)');
+}
+
+// 显示编辑按钮
+function showEditorButtons(element) {
+  editorLog.debug('[DEBUG] 显示编辑按钮');
+  if (!element) return;
+  
+  const buttons = document.getElementById('divEditorButtons');
+  if (!buttons) {
+    editorLog.error('[ERROR] 找不到编辑按钮容器');
+    return;
+  }
+  
+  // 获取元素位置
+  const rect = element.getBoundingClientRect();
+  
+  fixActionButtons();
+
+  // 设置按钮位置到右下角
+  buttons.style.display = 'flex';
+  buttons.style.position = 'absolute';
+  buttons.style.top = (rect.bottom + window.scrollY + 5) + 'px'; // 元素底部下方5px
+  buttons.style.left = (rect.right + window.scrollX - 90) + 'px'; // 元素右侧偏左90px
+  
+  editorLog.debug('[DEBUG] 编辑按钮已显示');
+}
+
+// 隐藏编辑按钮
+function hideEditorButtons() {
+  editorLog.debug('[DEBUG] 隐藏编辑按钮');
+  const buttons = document.getElementById('divEditorButtons');
+  if (buttons) {
+    buttons.style.display = 'none';
+    editorLog.debug('[DEBUG] 编辑按钮已隐藏');
+  }
+}
+
+// 复制元素
+function duplicateElement(element) {
+  editorLog.debug('[DEBUG] 复制元素');
+  if (!element) return;
+  
+  try {
+    // 创建元素的副本（不带选中样式）
+    restoreTouched('region', element);
+    const clone = element.cloneNode(true);
+    markSelectedElement(element);
+    
+    // 移除可能的ID以避免重复ID
+    if (clone.id) {
+      clone.id = clone.id + '-copy';
+    }
+    
+    // 插入副本到原元素之后
+    if (element.parentNode) {
+      element.parentNode.insertBefore(clone, element.nextSibling);
+      editorLog.debug('[DEBUG] 元素已成功复制');
+      
+      // 保存页面修改状态
+      savePageState();
+    }
+  } catch (error) {
+    editorLog.error('[ERROR] 复制元素失败:', error);
+  }
+}
+
+// 移除元素
+function removeElement(element) {
+  editorLog.debug('[DEBUG] 移除元素');
+  if (!element) return;
+  
+  try {
+    // 隐藏编辑按钮
+    hideEditorButtons();
+    
+    // 移除元素（不再需要确认）
+    restoreTouched('region', element);
+    if (element.parentNode) {
+      element.parentNode.removeChild(element);
+      editorLog.debug('[DEBUG] 元素已成功移除');
+      
+      // 重置选中的元素
+      window.editorVars.selectedElement = null;
+      
+      // 保存页面修改状态
+      savePageState();
+    }
+  } catch (error) {
+    editorLog.error('[ERROR] 移除元素失败:', error);
+  }
+}
+
+// 移除区域编辑模式
+function removeEditModeFromDivs() {
+  editorLog.debug('[DEBUG] 移除所有DIV的编辑模式');
+  
+  // 点击监听和选中样式、光标样式类在模式关闭后统一释放和恢复
+  window.editorVars.selectedElement = null;
+  
+  // 隐藏编辑按钮
+  hideEditorButtons();
+  
+  // 隐藏高亮
+  hideHighlight();
+  hideHoverHighlight();
+  
+  editorLog.debug('[DEBUG] 区域编辑模式已移除');
+}
+
+// 确保复制和删除按钮文本显示正确（在按钮显示时执行）
+function fixActionButtons() {
+  const duplicateBtn = document.getElementById('editDuplicateBtn');
+  const removeBtn = document.getElementById('editRemoveBtn');
+
+  if (duplicateBtn && duplicateBtn.textContent !== '+') {
+    duplicateBtn.innerHTML = '+';
+    duplicateBtn.style.fontSize = '20px';
+    duplicateBtn.style.backgroundColor = '#34a853';
+    duplicateBtn.style.color = 'white';
+  }
+  
+  if (removeBtn && removeBtn.textContent !== '-') {
+    removeBtn.innerHTML = '-';
+    removeBtn.style.fontSize = '20px';
+    removeBtn.style.backgroundColor = '#ea4335';
+    removeBtn.style.color = 'white';
+  }
+}
+
+// 区域编辑按钮（复制、删除）的初始化
+function initRegionEditor() {
+  const v = window.editorVars;
+  const editorButtons = document.getElementById('divEditorButtons');
+  const duplicateBtn = document.getElementById('editDuplicateBtn');
+  const removeBtn = document.getElementById('editRemoveBtn');
+
+  fixActionButtons();
+  
+  // 复制按钮点击事件
+  duplicateBtn.addEventListener('click', function(e) {
+    e.preventDefault();
+    e.stopPropagation();
+    
+    if (v.selectedElement) {
+      duplicateElement(v.selectedElement);
+    }
+  });
+  
+  // 删除按钮点击事件
+  removeBtn.addEventListener('click', function(e) {
+    e.preventDefault();
+    e.stopPropagation();
+    
+    if (v.selectedElement) {
+      removeElement(v.selectedElement);
+    }
+  });
+  
+  // 阻止编辑按钮冒泡
+  editorButtons.addEventListener('click', function(e) {
+    e.stopPropagation();
+  });
+
+}
+
+// 区域编辑模式的实现
+registerEditorMode('region', {
+  init: initRegionEditor,
+  enable: function() {
+    applyEditModeToDivs();
+  },
+  disable: function() {
+    removeEditModeFromDivs();
+  },
+  hover: handleRegionHover
+});
+"""
+
+# 文本编辑
+TEXT_STYLES = """
+/* 文本和图片编辑样式 - 完全不影响布局的版本 */
+.text-editable:after {
+  content: "";
+  position: absolute;
+  top: 0;
+  left: 0;
+  right: 0;
+  bottom: 0;
+  outline: 1px dashed #34a853;
+  pointer-events: none;
+  z-index: 9998;
+}
+
+.text-editable:hover:after {
+  background-color: rgba(52, 168, 83, 0.1);
+}
+
+.text-editable:focus:after {
+  outline: 1px solid #34a853;
+  background-color: rgba(52, 168, 83, 0.05);
+}
+
+.text-editable {
+  cursor: text !important;
+}
+"""
+
+# 文本编辑模式
+TEXT_MODE = """
+// 文本编辑模式
+registerEditorMode('text', {
+  flag: 'isTextEditMode',
+  label: '启用文本编辑',
+  activeLabel: '禁用文本编辑',
+  activeColor: '#34a853',
+  restoreKeys: ['editedTexts']
+});
+"""
+
+TEXT_SCRIPTS = """
+// 使元素内的文本可编辑
+function makeElementEditable(root) {
+  editorLog.debug('[DEBUG] 使元素可编辑:', root ? root.tagName : 'null');
+  
+  if (!root) {
+    editorLog.error('[ERROR] 无法使空元素可编辑');
+    return;
+  }
+  
+  const span = editorPerf.start('scan:text');
+  let editableCount = 0;
+  
+  // 获取所有文本元素
+  const textElements = queryWithin(root, 'p, h1, h2, h3, h4, h5, h6, span, div > strong, div > em, div > u, li, td, th, button, a');
+  editorLog.debug('[DEBUG] 找到文本元素数量:', textElements.length);
+  
+  textElements.forEach(el => {
+    // 排除已经是可编辑的元素或编辑器自身的元素
+    if (el.contentEditable === 'true' || 
+        el.classList.contains('editor-button') ||
+        el.id === 'elementInspector' ||
+        el.id === 'imageUploadModal' ||
+        el.id === 'divEditorButtons' ||
+        el.parentElement && (
+          el.parentElement.id === 'elementInspector' ||
+          el.parentElement.id === 'imageUploadModal' ||
+          el.parentElement.id === 'divEditorButtons' ||
+          el.parentElement.classList.contains('editor-button')
+        )) {
+      return;
+    }
+    
+    // 检查元素是否包含实际文本内容（排除空白内容或只包含HTML元素的情况）
+    const text = el.textContent.trim();
+    if (!text) {
+      return; // 跳过没有文本内容的元素
+    }
+    
+    // 跳过包含大量子元素但自身文本内容很少的元素（可能是容器而非文本元素）
+    if (el.children.length > 5 && el.childNodes.length > 10 && text.length < 20) {
+      return;
+    }
+    
+    // 跳过包含表单元素的元素
+    if (el.querySelector('input, select, textarea, button')) {
+      return;
+    }
+    
+    try {
+      // 确保元素是相对定位，以支持伪元素
+      ensureRelativePosition(el, 'text');
+      
+      // 使元素可编辑，不修改其布局（输入和焦点事件由委托的监听处理）
+      touchAttribute('text', el, 'contenteditable', 'true');
+      touchClass('text', el, 'text-editable');
+      editableCount++;
+    } catch (error) {
+      editorLog.error('[ERROR] 使元素可编辑失败:', error);
+    }
+  });
+  
+  editorPerf.end(span, editableCount);
+  editorLog.debug('[DEBUG] 文本编辑已启用');
+}
+
+// 文本编辑的保存：输入时只把元素标记为待保存，停止输入一段时间后一次写入 localStorage，
+// 连续输入时最多间隔 TEXT_SAVE_MAX_DELAY 写入一次；失去焦点、页面隐藏或关闭、模式关闭时立即写入
+// 每个元素的文本单独保存在 'editor:页面标识:text:元素路径' 下，editedTexts 是已保存路径的索引（数组），
+// 一次写入只写有修改的元素，出现新路径时才重写索引
+const TEXT_SAVE_DELAY = 400;
+const TEXT_SAVE_MAX_DELAY = 2000;
+const textPersistence = { dirty: new Set(), timer: 0, since: 0 };
+
+// 元素路径对应的保存键
+function textStorageKey(path) {
+  return editorStorageKey('text:' + path);
+}
+
+// 读取保存的文本编辑 { 元素路径: HTML }
+// 旧版本把整个映射保存在 editedTexts 下，读取时改为按路径保存
+function loadTextEdits() {
+  const indexKey = editorStorageKey('editedTexts');
+  const saved = JSON.parse(localStorage.getItem(indexKey) || '[]');
+  if (!Array.isArray(saved)) {
+    Object.keys(saved).forEach(path => localStorage.setItem(textStorageKey(path), saved[path]));
+    localStorage.setItem(indexKey, JSON.stringify(Object.keys(saved)));
+    return saved;
+  }
+  const edits = {};
+  saved.forEach(path => {
+    const html = localStorage.getItem(textStorageKey(path));
+    if (html !== null) edits[path] = html;
+  });
+  return edits;
+}
+
+// 标记元素待保存，重新安排写入时间
+function scheduleTextSave(element) {
+  const p = textPersistence;
+  p.dirty.add(element);
+  if (!p.since) {
+    p.since = performance.now();
+  }
+  if (p.timer) {
+    stopEditorTimer(p.timer);
+  }
+  const delay = Math.max(0, Math.min(TEXT_SAVE_DELAY, p.since + TEXT_SAVE_MAX_DELAY - performance.now()));
+  p.timer = startEditorTimer('text', flushTextEdits, delay);
+}
+
+// 写入待保存的文本，返回写入的元素数
+function flushTextEdits() {
+  const p = textPersistence;
+  if (p.timer) {
+    stopEditorTimer(p.timer);
+    p.timer = 0;
+  }
+  p.since = 0;
+  if (p.dirty.size === 0) return 0;
+  
+  const v = window.editorVars;
+  const span = editorPerf.start('save:text');
+  let count = 0;
+  let added = false;
+  p.dirty.forEach(el => {
+    if (!el.isConnected) return;
+    const path = getElementPath(el);
+    if (!Object.prototype.hasOwnProperty.call(v.editedTextElements, path)) added = true;
+    v.editedTextElements[path] = el.innerHTML;
+    localStorage.setItem(textStorageKey(path), el.innerHTML);
+    count++;
+  });
+  p.dirty.clear();
+  if (added) {
+    localStorage.setItem(editorStorageKey('editedTexts'), JSON.stringify(Object.keys(v.editedTextElements)));
+  }
+  
+  // 更新页面修改时间
+  savePageState();
+  editorPerf.end(span, count);
+  return count;
+}
+
+// 文本编辑的输入事件（委托的捕获阶段监听）：标记编辑的元素待保存
+function handleTextInput(e) {
+  const el = e.target.closest && e.target.closest('.text-editable');
+  if (el) {
+    scheduleTextSave(el);
+  }
+}
+
+// 页面隐藏或关闭时立即写入（之后页面可能不再有机会执行脚本）
+function handleTextPageHidden(e) {
+  if (e.type === 'pagehide' || document.visibilityState === 'hidden') {
+    flushTextEdits();
+  }
+}
+
+// 获得焦点时的文本，用于失去焦点时判断是否有更改
+const focusedTextOriginals = new WeakMap();
+
+// 文本元素获得焦点时记录原始文本
+function handleTextFocus(e) {
+  const el = e.target.closest && e.target.closest('.text-editable');
+  if (el) {
+    focusedTextOriginals.set(el, el.innerHTML);
+  }
+}
+
+// 文本元素失去焦点时记录更改
+function handleTextBlur(e) {
+  const el = e.target.closest && e.target.closest('.text-editable');
+  if (el && focusedTextOriginals.get(el) !== el.innerHTML) {
+    editorLog.debug('[DEBUG] 文本已更改:', el.innerHTML);
+  }
+  flushTextEdits();
+}
+
+// 处理新插入的内容：正在编辑的元素内部输入产生的节点不处理
+function scanTextEditable(root) {
+  if (root.closest('[contenteditable="true"]')) return;
+  makeElementEditable(root);
+}
+
+// 移除文本编辑功能：可编辑属性、类和定位样式在模式关闭后按登记统一恢复，这里只结束正在进行的编辑
+function removeTextEditability() {
+  editorLog.debug('[DEBUG] 移除文本编辑功能');
+  
+  const active = document.activeElement;
+  if (active && active.classList && active.classList.contains('text-editable')) {
+    active.blur();
+  }
+}
+
+// 应用保存的文本编辑，返回更新的元素数
+function applyTextEdits() {
+  const v = window.editorVars;
+  editorLog.debug('[DEBUG] 应用保存的文本编辑');
+  let appliedCount = 0;
+  
+  try {
+    // 遍历所有保存的文本编辑
+    for (const path in v.editedTextElements) {
+      try {
+        // 查找元素
+        const elements = document.querySelectorAll(path);
+        if (elements && elements.length > 0) {
+          // 更新第一个匹配的元素的内容
+          elements[0].innerHTML = v.editedTextElements[path];
+          appliedCount++;
+          editorLog.debug('[DEBUG] 已更新文本元素:', path);
+        } else {
+          editorLog.warn('[WARN] 找不到路径对应的元素:', path);
+        }
+      } catch (error) {
+        editorLog.error('[ERROR] 应用文本编辑失败:', error, path);
+      }
+    }
+  } catch (error) {
+    editorLog.error('[ERROR] 应用保存的文本编辑失败:', error);
+  }
+  return appliedCount;
+}
+
+// 文本编辑模式的实现
+registerEditorMode('text', {
+  enable: function() {
+    makeElementEditable(document.body);
+    addEditorListener('text', document, 'input', handleTextInput, true);
+    addEditorListener('text', document, 'focusin', handleTextFocus, true);
+    addEditorListener('text', document, 'focusout', handleTextBlur, true);
+    addEditorListener('text', document, 'visibilitychange', handleTextPageHidden);
+    addEditorListener('text', window, 'pagehide', handleTextPageHidden);
+  },
+  disable: function() {
+    removeTextEditability();
+    flushTextEdits();
+  },
+  scan: scanTextEditable,
+  restore: function() {
+    window.editorVars.editedTextElements = loadTextEdits();
+    return applyTextEdits();
+  },
+  // 导出时把路径索引换成 html_edit.py apply 使用的 { 元素路径: HTML } 映射
+  exportEdits: function(edits) {
+    edits.editedTexts = loadTextEdits();
+    return edits;
+  }
+});
+"""
+
+# 图片编辑
+IMAGE_STYLES = """
+.image-editable:after {
+  content: "";
+  position: absolute;
+  top: 0;
+  left: 0;
+  right: 0;
+  bottom: 0;
+  outline: 2px dashed #fbbc05;
+  pointer-events: none;
+  z-index: 9998;
+}
+
+.image-editable:hover:after {
+  background-color: rgba(251, 188, 5, 0.1);
+}
+
+.image-editable {
+  cursor: pointer !important;
+}
+
+/* 带有背景图的可编辑元素样式 */
+.bg-image-editable:after {
+  content: "";
+  position: absolute;
+  top: 0;
+  left: 0;
+  right: 0;
+  bottom: 0;
+  outline: 2px dashed #fbbc05;
+  pointer-events: none;
+  z-index: 9998;
+}
+
+.bg-image-editable:hover:after {
+  background-color: rgba(251, 188, 5, 0.1);
+}
+
+.bg-image-editable:before {
+  content: "🖼️";
+  position: absolute;
+  top: 5px;
+  right: 5px;
+  background-color: rgba(251, 188, 5, 0.8);
+  color: #333;
+  padding: 2px 5px;
+  border-radius: 3px;
+  font-size: 12px;
+  z-index: 9999;
+  pointer-events: none;
+}
+
+.bg-image-editable {
+  cursor: pointer !important;
+}
+
+/* 轮播图容器样式 */
+.carousel-container-editable:after {
+  content: "";
+  position: absolute;
+  top: 0;
+  left: 0;
+  right: 0;
+  bottom: 0;
+  outline: 2px dashed #4285f4;
+  pointer-events: none;
+  z-index: 9998;
+}
+
+.carousel-container-editable:hover:after {
+  background-color: rgba(66, 133, 244, 0.1);
+}
+
+.carousel-container-editable:before {
+  content: "🎞️";
+  position: absolute;
+  top: 5px;
+  right: 5px;
+  background-color: rgba(66, 133, 244, 0.8);
+  color: white;
+  padding: 2px 5px;
+  border-radius: 3px;
+  font-size: 12px;
+  z-index: 9999;
+  pointer-events: none;
+}
+
+.carousel-container-editable {
+  cursor: pointer !important;
+}
+
+/* 图片上传模态框样式 */
+#imageUploadModal {
+  position: fixed;
+  top: 0;
+  left: 0;
+  width: 100%;
+  height: 100%;
+  background-color: rgba(0,0,0,0.7);
+  display: none;
+  align-items: center;
+  justify-content: center;
+  z-index: 10001;
+}
+
+.modal-content {
+  background-color: #fff;
+  padding: 20px;
+  border-radius: 8px;
+  width: 80%;
+  max-width: 500px;
+  max-height: 80vh;
+  overflow-y: auto;
+}
+
+.modal-title {
+  margin-top: 0;
+  color: #333;
+}
+
+.modal-buttons {
+  display: flex;
+  justify-content: flex-end;
+  margin-top: 20px;
+  gap: 10px;
+}
+
+.modal-button {
+  padding: 8px 16px;
+  border: none;
+  border-radius: 4px;
+  cursor: pointer;
+}
+
+#cancelImageUpload {
+  background-color: #f2f2f2;
+  color: #333;
+}
+
+#applyImageUpload {
+  background-color: #4285f4;
+  color: #fff;
+}
+
+#imagePreview {
+  margin-top: 15px;
+  text-align: center;
+}
+
+#imagePreview img,
+#imagePreview canvas {
+  max-width: 100%;
+  max-height: 300px;
+  border: 1px solid #ddd;
+}
+"""
+
+# 图片上传模态框
+IMAGE_ELEMENTS = """
+<!-- 图片上传模态框 -->
+<div id="imageUploadModal">
+  <div class="modal-content">
+    <h3 class="modal-title">上传新图片</h3>
+    <p id="imageUploadDescription">选择一个图片文件上传替换当前图片。</p>
+    <div id="uploadTypeToggle" style="margin-bottom: 15px; display: none;">
+      <label><input type="radio" name="uploadType" value="single" checked> 单张上传</label>
+      <label style="margin-left: 15px;"><input type="radio" name="uploadType" value="multiple"> 多张上传(轮播)</label>
+    </div>
+    <input type="file" id="imageFileInput" accept="image/*">
+    <input type="file" id="multipleImageFileInput" accept="image/*" multiple style="display: none;">
+    <div id="imagePreview"></div>
+    <div id="multipleImagePreview" style="display: none; margin-top: 15px;"></div>
+    <div class="modal-buttons">
+      <button id="cancelImageUpload" class="modal-button">取消</button>
+      <button id="applyImageUpload" class="modal-button">应用</button>
+    </div>
+  </div>
+</div>
+"""
+
+# 图片编辑模式
+IMAGE_MODE = """
+// 图片编辑模式
+registerEditorMode('image', {
+  flag: 'isImageEditMode',
+  label: '启用图片编辑',
+  activeLabel: '禁用图片编辑',
+  activeColor: '#fbbc05',
+  activeTextColor: '#000',
+  restoreKeys: ['editedImages', 'editedBackgroundImages', 'editedCarouselImages']
+});
+"""
+
+IMAGE_SCRIPTS = """
+// 完全移除图片编辑功能
+function completelyRemoveImageEditability() {
+  const v = window.editorVars;
+  editorLog.debug('[DEBUG] 完全移除图片编辑功能');
+  
+  try {
+    // 图片、背景、轮播图、图片容器和链接上的标记在模式关闭后按登记统一恢复
+    
+    // 关闭图片上传模态框
+    closeImageUploadModal();
+    
+    // 重置变量
+    v.currentEditingImage = null;
+    v.currentEditingElement = null;
+    v.currentEditingType = 'single';
+    v.containerImages = [];
+    v.selectedSingleFile = null;
+    v.selectedMultipleFiles = null;
+    v.currentImageIndex = 0;
+    
+    // 隐藏高亮
+    hideHighlight();
+    hideHoverHighlight();
+    
+    editorLog.debug('[DEBUG] 图片编辑功能已完全移除');
+  } catch (error) {
+    editorLog.error('[ERROR] 移除图片编辑功能时出错:', error);
+  }
+}
+
+// 图片编辑模式下可点击编辑的元素
+const IMAGE_EDIT_TARGETS = '.image-editable, .bg-image-editable, .carousel-container-editable, .div-image-container';
+
+// 处理图片编辑点击事件（委托的捕获阶段监听）：编辑离点击位置最近的可编辑元素
+function handleImageEditClick(e) {
+  const v = window.editorVars;
+  
+  if (!v.isImageEditMode || isEditorElement(e.target)) {
+    return;
+  }
+  
+  // 获取点击的元素，不在可编辑元素中的点击只阻止图片链接跳转
+  const element = e.target.closest(IMAGE_EDIT_TARGETS);
+  if (!element) {
+    preventLinkClick(e);
+    return;
+  }
+  editorLog.debug('[DEBUG] 处理图片编辑点击事件，点击的元素类型:', element.tagName);
+  
+  // 阻止事件传播和默认行为
+  e.preventDefault();
+  e.stopPropagation();
+  
+  // 记录当前编辑的元素
+  v.currentEditingElement = element;
+  
+  // 确定编辑类型
+  if (element.tagName === 'IMG') {
+    v.currentEditingType = 'single';
+    v.currentEditingImage = element; // 保存当前编辑的图片元素
+    editorLog.debug('[DEBUG] 识别为单图片编辑');
+  } else if (element.classList.contains('bg-image-editable')) {
+    v.currentEditingType = 'background';
+    editorLog.debug('[DEBUG] 识别为背景图片编辑');
+  } else if (element.classList.contains('carousel-container-editable')) {
+    v.currentEditingType = 'carousel';
+    editorLog.debug('[DEBUG] 识别为轮播图编辑');
+    
+    // 找到容器内的所有图片
+    v.containerImages = Array.from(element.querySelectorAll('img'));
+  } else if (element.tagName.toLowerCase() === 'div') {
+    // div容器中的图片 - 不再需要v.isEditMode检查，因为现在直接在图片编辑模式下可以点击div
+    v.currentEditingType = 'container';
+    editorLog.debug('[DEBUG] 识别为容器图片编辑');
+    
+    // 清空之前的容器图片列表
+    v.containerImages = [];
+    
+    // 直接找到当前div内的所有图片
+    const images = element.querySelectorAll('img');
+    editorLog.debug('[DEBUG] 找到原始图片数量:', images.length);
+    
+    // 转为数组并过滤掉编辑器自身的图片
+    v.containerImages = Array.from(images).filter(img => {
+      // 检查图片是否属于编辑器元素
+      const isEditorElement = img.closest('#elementInspector') || 
+                            img.closest('#divEditorButtons') || 
+                            img.closest('#imageUploadModal') ||
+                            img.closest('.editor-button');
+      return !isEditorElement;
+    });
+    
+    editorLog.debug('[DEBUG] 过滤后的图片数量:', v.containerImages.length);
+    
+    if (v.containerImages.length === 0) {
+      alert('所选区域内没有可替换的图片');
+      return;
+    }
+    
+    editorLog.debug(`[DEBUG] 发现区域内有 ${v.containerImages.length} 张图片可替换`);
+  }
+  
+  // 显示上传模态框
+  editorLog.debug('[DEBUG] 准备显示上传模态框');
+  createImageUploadModal();
+}
+
+// 阻止包含图片的链接跳转
+function preventLinkClick(e) {
+  const v = window.editorVars;
+  if (v.isImageEditMode && e.target.closest('a[data-image-editable-container="true"]')) {
+    e.preventDefault();
+    e.stopPropagation();
+    return false;
+  }
+}
+
+// 创建图片上传模态框
+// 上传模态框中选中文件的预览：不把文件读成 data URL，而是按预览高度用 createImageBitmap 异步解码成缩略图，
+// 画在 canvas 上，一次只解码一个文件；不支持时（以及动图、矢量图）用文件的 blob: 地址显示。
+// 预览清空或模态框关闭时释放这些地址，还没解码的缩略图不再处理
+const uploadPreviews = { urls: new Map(), queue: Promise.resolve() }; // blob: 地址 → 所在的预览区域
+
+// 清空预览区域并释放其中的 blob: 地址
+function clearUploadPreview(container) {
+  uploadPreviews.urls.forEach((owner, url) => {
+    if (owner === container) {
+      URL.revokeObjectURL(url);
+      uploadPreviews.urls.delete(url);
+    }
+  });
+  container.innerHTML = '';
+}
+
+// 在 placeholder（已放进预览区域的空 img）处显示文件的预览
+function showUploadPreview(placeholder, file, container, maxHeight) {
+  const showUrl = () => {
+    if (!placeholder.isConnected) return;
+    const url = URL.createObjectURL(file);
+    uploadPreviews.urls.set(url, container);
+    placeholder.decoding = 'async';
+    placeholder.src = url;
+  };
+  if (!window.createImageBitmap || IMAGE_RESIZE.keepTypes.includes(file.type)) {
+    showUrl();
+    return;
+  }
+
+  const height = Math.ceil(maxHeight * Math.min(window.devicePixelRatio || 1, IMAGE_RESIZE.maxPixelRatio));
+  uploadPreviews.queue = uploadPreviews.queue.then(() => {
+    // 解码前预览已被清空（重新选择了文件或关闭了模态框）
+    if (!placeholder.isConnected) return;
+    return createImageBitmap(file, { resizeHeight: height, resizeQuality: 'medium' }).then(bitmap => {
+      if (!placeholder.isConnected) {
+        bitmap.close();
+        return;
+      }
+      const canvas = document.createElement('canvas');
+      canvas.width = bitmap.width;
+      canvas.height = bitmap.height;
+      canvas.style.cssText = placeholder.style.cssText;
+      canvas.getContext('bitmaprenderer').transferFromImageBitmap(bitmap);
+      placeholder.replaceWith(canvas);
+    });
+  }).catch(error => {
+    editorLog.debug('[DEBUG] 缩略图解码失败，直接显示文件:', file.name, error);
+    showUrl();
+  });
+}
+
+function createImageUploadModal() {
+  const v = window.editorVars;
+  
+  const modal = document.getElementById('imageUploadModal');
+  const description = document.getElementById('imageUploadDescription');
+  const uploadTypeToggle = document.getElementById('uploadTypeToggle');
+  const singleFileInput = document.getElementById('imageFileInput');
+  const multipleFileInput = document.getElementById('multipleImageFileInput');
+  const imagePreview = document.getElementById('imagePreview');
+  const multipleImagePreview = document.getElementById('multipleImagePreview');
+  const cancelBtn = document.getElementById('cancelImageUpload');
+  const applyBtn = document.getElementById('applyImageUpload');
+  
+  // 清空文件输入和预览
+  singleFileInput.value = '';
+  multipleFileInput.value = '';
+  clearUploadPreview(imagePreview);
+  clearUploadPreview(multipleImagePreview);
+  v.selectedSingleFile = null;
+  v.selectedMultipleFiles = null;
+  
+  // 移除之前的图片预览区域
+  const oldDivPreview = document.getElementById('divImagesPreview');
+  if (oldDivPreview) {
+    oldDivPreview.remove();
+  }
+  
+  // 移除之前的选择器
+  const oldSelector = document.getElementById('carousel-image-selector');
+  if (oldSelector) {
+    oldSelector.remove();
+  }
+  
+  // 根据编辑类型设置描述和显示/隐藏元素
+  if (v.currentEditingType === 'single') {
+    description.textContent = '选择一个图片文件上传替换当前图片。';
+    uploadTypeToggle.style.display = 'none';
+    singleFileInput.style.display = 'block';
+    multipleFileInput.style.display = 'none';
+    imagePreview.style.display = 'block';
+    multipleImagePreview.style.display = 'none';
+  } else if (v.currentEditingType === 'background') {
+    description.textContent = '选择一个图片文件上传替换当前背景图片。';
+    uploadTypeToggle.style.display = 'none';
+    singleFileInput.style.display = 'block';
+    multipleFileInput.style.display = 'none';
+    imagePreview.style.display = 'block';
+    multipleImagePreview.style.display = 'none';
+  } else if (v.currentEditingType === 'carousel' || v.currentEditingType === 'container') {
+    let containerType = v.currentEditingType === 'carousel' ? '轮播图' : '区域';
+    let title = document.querySelector('.modal-title');
+    title.textContent = `上传图片替换${containerType}内容`;
+    
+    description.textContent = `选择图片上传替换${containerType}中的图片（共有${v.containerImages.length}张图片）。`;
+    uploadTypeToggle.style.display = 'block';
+    
+    // 验证containerImages是否正确
+    editorLog.debug(`[DEBUG] 准备替换的图片数量: ${v.containerImages.length}`);
+    
+    // 默认选择多张上传模式，更符合批量替换的场景
+    document.querySelector('input[name="uploadType"][value="multiple"]').checked = true;
+    singleFileInput.style.display = 'none';
+    multipleFileInput.style.display = 'block';
+    imagePreview.style.display = 'none';
+    multipleImagePreview.style.display = 'block';
+    
+    // 创建图片选择器 - 仅在单张模式下才需要
+    createImageSelector(v.containerImages);
+    
+    // 显示div中的所有图片预览
+    const divPreview = document.createElement('div');
+    divPreview.id = 'divImagesPreview';
+    divPreview.style.marginBottom = '15px';
+    divPreview.style.border = '1px solid #ddd';
+    divPreview.style.borderRadius = '4px';
+    divPreview.style.padding = '10px';
+    
+    const previewTitle = document.createElement('h4');
+    previewTitle.textContent = `${containerType}中的图片:`;
+    previewTitle.style.margin = '0 0 10px 0';
+    divPreview.appendChild(previewTitle);
+    
+    const imagesWrapper = document.createElement('div');
+    imagesWrapper.style.display = 'flex';
+    imagesWrapper.style.flexWrap = 'wrap';
+    imagesWrapper.style.gap = '10px';
+    
+    v.containerImages.forEach((img, index) => {
+      const imgContainer = document.createElement('div');
+      imgContainer.style.textAlign = 'center';
+      
+      const imgEl = document.createElement('img');
+      imgEl.src = img.src;
+      imgEl.style.maxHeight = '80px';
+      imgEl.style.maxWidth = '120px';
+      imgEl.style.objectFit = 'contain';
+      imgEl.style.border = '1px solid #eee';
+      
+      const imgLabel = document.createElement('div');
+      imgLabel.textContent = `图片 ${index + 1}`;
+      imgLabel.style.fontSize = '12px';
+      imgLabel.style.marginTop = '5px';
+      
+      imgContainer.appendChild(imgEl);
+      imgContainer.appendChild(imgLabel);
+      imagesWrapper.appendChild(imgContainer);
+    });
+    
+    divPreview.appendChild(imagesWrapper);
+    
+    // 在模态框的描述下方添加图片预览
+    description.parentNode.insertBefore(divPreview, description.nextSibling);
+  }
+  
+  // 显示模态框
+  modal.style.display = 'flex';
+  
+  // 绑定事件
+  cancelBtn.onclick = closeImageUploadModal;
+  applyBtn.onclick = applyImageUpload;
+  
+  // 单个文件输入变化事件
+  singleFileInput.onchange = function(e) {
+    const file = e.target.files[0];
+    if (file) {
+      v.selectedSingleFile = file;
+      
+      clearUploadPreview(imagePreview);
+      const img = document.createElement('img');
+      img.style.maxHeight = '200px';
+      img.style.marginBottom = '10px';
+      imagePreview.appendChild(img);
+      showUploadPreview(img, file, imagePreview, 200);
+      
+      // 显示替换信息
+      const info = document.createElement('p');
+      
+      if (v.currentEditingType === 'single' && v.currentEditingImage) {
+        const originalSrc = v.currentEditingImage.src.split('/').pop();
+        info.innerHTML = `将替换: <strong>${originalSrc}</strong> → <strong>${file.name}</strong>`;
+      } else if (v.currentEditingType === 'background') {
+        const bgUrl = getBackgroundImageUrl(v.currentEditingElement);
+        const originalSrc = bgUrl ? bgUrl.split('/').pop() : '背景图';
+        info.innerHTML = `将替换背景图: <strong>${originalSrc}</strong> → <strong>${file.name}</strong>`;
+      } else if ((v.currentEditingType === 'carousel' || v.currentEditingType === 'container') && v.selectedImageIndex >= 0) {
+        const originalImg = v.containerImages[v.selectedImageIndex];
+        const originalSrc = originalImg.src.split('/').pop();
+        info.innerHTML = `将替换第 ${v.selectedImageIndex + 1} 张图片: <strong>${originalSrc}</strong> → <strong>${file.name}</strong>`;
+      }
+      
+      imagePreview.appendChild(info);
+    }
+  };
+  
+  // 多个文件输入变化事件
+  multipleFileInput.onchange = function(e) {
+    const files = e.target.files;
+    if (files && files.length > 0) {
+      v.selectedMultipleFiles = files;
+      
+      clearUploadPreview(multipleImagePreview);
+      
+      // 检查文件数量
+      if (files.length > v.containerImages.length) {
+        const warning = document.createElement('p');
+        warning.style.color = 'red';
+        warning.textContent = `警告: 您选择了${files.length}张图片，但${v.currentEditingType === 'carousel' ? '轮播图' : '区域'}中只有${v.containerImages.length}张图片。只有前${v.containerImages.length}张将被使用。`;
+        multipleImagePreview.appendChild(warning);
+      }
+      
+      // 显示替换预览
+      const previewContainer = document.createElement('div');
+      previewContainer.style.display = 'flex';
+      previewContainer.style.flexDirection = 'column';
+      previewContainer.style.gap = '15px';
+      
+      const maxToShow = Math.min(files.length, v.containerImages.length);
+      
+      // 添加标题
+      const title = document.createElement('h4');
+      title.textContent = '替换预览:';
+      title.style.margin = '10px 0';
+      previewContainer.appendChild(title);
+      
+      for (let i = 0; i < maxToShow; i++) {
+        const file = files[i];
+        const originalImg = v.containerImages[i];
+        
+        const itemContainer = document.createElement('div');
+        itemContainer.style.width = '100%';
+        itemContainer.style.padding = '10px';
+        itemContainer.style.border = '1px solid #ddd';
+        itemContainer.style.borderRadius = '4px';
+        itemContainer.style.backgroundColor = '#f9f9f9';
+        
+        const originalSrc = originalImg.src.split('/').pop();
+        
+        itemContainer.innerHTML = `
+          <div style="display: flex; align-items: center; gap: 15px;">
+            <div style="flex: 1; text-align: center;">
+              <img src="${originalImg.src}" style="max-height: 100px; max-width: 100%; border: 1px solid #ddd;">
+              <p style="margin: 5px 0 0 0; font-size: 12px; font-weight: bold;">${originalSrc}</p>
+            </div>
+            <div style="font-size: 24px; color: #4285f4;">→</div>
+            <div style="flex: 1; text-align: center;">
+              <img class="upload-preview" style="max-height: 100px; max-width: 100%; border: 1px solid #ddd;">
+              <p style="margin: 5px 0 0 0; font-size: 12px; font-weight: bold;">${file.name}</p>
+            </div>
+          </div>
+          <p style="margin: 10px 0 0 0; text-align: center; background-color: #e8f0fe; padding: 5px; border-radius: 4px;">
+            替换第 ${i + 1} 张图片
+          </p>
+        `;
+        
+        previewContainer.appendChild(itemContainer);
+      }
+      
+      multipleImagePreview.appendChild(previewContainer);
+      
+      // 预览区域放进页面后再开始解码缩略图
+      previewContainer.querySelectorAll('img.upload-preview').forEach((img, i) => {
+        showUploadPreview(img, files[i], multipleImagePreview, 100);
+      });
+    }
+  };
+  
+  // 上传类型切换
+  const radioButtons = document.querySelectorAll('input[name="uploadType"]');
+  radioButtons.forEach(radio => {
+    radio.onchange = function() {
+      if (this.value === 'single') {
+        singleFileInput.style.display = 'block';
+        multipleFileInput.style.display = 'none';
+        imagePreview.style.display = 'block';
+        multipleImagePreview.style.display = 'none';
+        
+        // 显示图片选择器
+        const selector = document.getElementById('carousel-image-selector');
+        if (selector) selector.style.display = 'block';
+        
+        // 清空已选文件
+        multipleFileInput.value = '';
+        clearUploadPreview(multipleImagePreview);
+        v.selectedMultipleFiles = null;
+      } else {
+        singleFileInput.style.display = 'none';
+        multipleFileInput.style.display = 'block';
+        imagePreview.style.display = 'none';
+        multipleImagePreview.style.display = 'block';
+        
+        // 隐藏图片选择器
+        const selector = document.getElementById('carousel-image-selector');
+        if (selector) selector.style.display = 'none';
+        
+        // 清空已选文件
+        singleFileInput.value = '';
+        clearUploadPreview(imagePreview);
+        v.selectedSingleFile = null;
+      }
+    };
+  });
+  
+  // 如果是多张上传模式，触发change事件以初始化界面
+  if (v.currentEditingType === 'carousel' || v.currentEditingType === 'container') {
+    document.querySelector('input[name="uploadType"]:checked').dispatchEvent(new Event('change'));
+  }
+}
+
+// 创建轮播图选择器
+function createImageSelector(images) {
+  if (!images || images.length === 0) return;
+  
+  const v = window.editorVars;
+  const imagePreview = document.getElementById('imagePreview');
+  
+  // 清空选择器
+  const existingSelector = document.getElementById('carousel-image-selector');
+  if (existingSelector) {
+    existingSelector.remove();
+  }
+  
+  // 创建选择器容器
+  const selectorContainer = document.createElement('div');
+  selectorContainer.id = 'carousel-image-selector';
+  selectorContainer.style.marginBottom = '15px';
+  
+  // 添加标题
+  const title = document.createElement('p');
+  title.textContent = '选择要替换的图片:';
+  selectorContainer.appendChild(title);
+  
+  // 创建图片选择区
+  const selector = document.createElement('div');
+  selector.style.display = 'flex';
+  selector.style.flexWrap = 'wrap';
+  selector.style.gap = '10px';
+  
+  // 添加图片选项
+  images.forEach((img, index) => {
+    const option = document.createElement('div');
+    option.style.border = '2px solid transparent';
+    option.style.padding = '5px';
+    option.style.cursor = 'pointer';
+    option.style.borderRadius = '4px';
+    option.dataset.index = index;
+    
+    const thumbnail = document.createElement('img');
+    thumbnail.src = img.src;
+    thumbnail.style.height = '60px';
+    thumbnail.style.maxWidth = '100px';
+    thumbnail.style.objectFit = 'contain';
+    
+    const label = document.createElement('div');
+    label.textContent = `图片 ${index + 1}`;
+    label.style.fontSize = '12px';
+    label.style.textAlign = 'center';
+    label.style.marginTop = '5px';
+    
+    option.appendChild(thumbnail);
+    option.appendChild(label);
+    
+    // 点击事件
+    option.onclick = function() {
+      // 移除所有选中样式
+      selector.querySelectorAll('div[data-index]').forEach(el => {
+        el.style.border = '2px solid transparent';
+        el.style.backgroundColor = 'transparent';
+      });
+      
+      // 设置选中样式
+      this.style.border = '2px solid #4285f4';
+      this.style.backgroundColor = 'rgba(66, 133, 244, 0.1)';
+      
+      // 保存选中的索引
+      v.selectedImageIndex = parseInt(this.dataset.index);
+      
+      // 清空已选文件
+      document.getElementById('imageFileInput').value = '';
+      clearUploadPreview(imagePreview);
+      v.selectedSingleFile = null;
+    };
+    
+    selector.appendChild(option);
+  });
+  
+  // 添加选择器到容器
+  selectorContainer.appendChild(selector);
+  
+  // 插入到模态框中
+  const uploadTypeToggle = document.getElementById('uploadTypeToggle');
+  uploadTypeToggle.parentNode.insertBefore(selectorContainer, uploadTypeToggle.nextSibling);
+  
+  // 默认选择第一张图片
+  selector.querySelector('div[data-index="0"]').click();
+}
+
+// 关闭图片上传模态框
+function closeImageUploadModal() {
+  editorLog.debug('[DEBUG] 关闭图片上传模态框');
+  
+  const modal = document.getElementById('imageUploadModal');
+  if (modal) {
+    modal.style.display = 'none';
+  }
+  
+  // 释放预览用的 blob: 地址和缩略图
+  ['imagePreview', 'multipleImagePreview'].forEach(id => {
+    const preview = document.getElementById(id);
+    if (preview) clearUploadPreview(preview);
+  });
+  
+  // 清空状态
+  const v = window.editorVars;
+  v.currentEditingType = null;
+  v.currentEditingElement = null;
+  v.currentEditingImage = null;
+  v.selectedImageIndex = -1;
+  v.selectedSingleFile = null;
+}
+
+// 应用图片上传
+function applyImageUpload() {
+  editorLog.debug('[DEBUG] 开始应用图片上传');
+  
+  const v = window.editorVars;
+  const imageFileInput = document.getElementById('imageFileInput');
+  const multipleImageFileInput = document.getElementById('multipleImageFileInput');
+  
+  // 获取选中的单选按钮
+  const uploadType = document.querySelector('input[name="uploadType"]:checked')?.value || 'single';
+  editorLog.debug('[DEBUG] 上传类型:', uploadType);
+  
+  if (uploadType === 'single') {
+    // 检查是否有选中的单个文件
+    editorLog.debug('[DEBUG] 检查单个文件: selectedSingleFile =', v.selectedSingleFile ? v.selectedSingleFile.name : 'null');
+    
+    if (!v.selectedSingleFile) {
+      editorLog.error('[ERROR] 未选择单个文件!');
+      
+      // 检查input中是否有文件
+      if (imageFileInput && imageFileInput.files && imageFileInput.files.length > 0) {
+        v.selectedSingleFile = imageFileInput.files[0];
+        editorLog.debug('[DEBUG] 从input获取文件:', v.selectedSingleFile.name);
+      } else {
+        editorLog.debug('[DEBUG] input中也没有文件');
+        alert('请选择图片');
+        return;
+      }
+    }
+    
+    editorLog.debug('[DEBUG] 准备处理单个文件:', v.selectedSingleFile.name);
+    
+    const span = editorPerf.start('upload');
+    const file = v.selectedSingleFile;
+    let saving = null;
+    
+    // 图片写入 IndexedDB 后换成它的 blob: 地址显示；保存修改时以替换前的原地址为键
+    if (v.currentEditingType === 'single' && v.currentEditingImage) {
+      const img = v.currentEditingImage;
+      const originalSrc = rememberOriginalSource(img, img.src);
+      editorLog.debug('[DEBUG] 单图替换: 原路径 =', originalSrc);
+      saving = saveEditedImage(originalSrc, file, 'single', imageDisplayTarget(img)).then(url => {
+        img.src = url;
+        editorLog.debug('[DEBUG] 单图替换成功:', file.name);
+      });
+    } else if (v.currentEditingType === 'background') {
+      editorLog.debug('[DEBUG] 背景图替换');
+      const element = v.currentEditingElement;
+      const bgUrl = rememberOriginalSource(element, getBackgroundImageUrl(element));
+      saving = saveEditedImage(bgUrl, file, 'background', imageDisplayTarget(element)).then(url => {
+        element.style.backgroundImage = `url('${url}')`;
+        editorLog.debug('[DEBUG] 背景图替换成功');
+      });
+    } else if ((v.currentEditingType === 'carousel' || v.currentEditingType === 'container') && v.selectedImageIndex >= 0) {
+      editorLog.debug('[DEBUG] 轮播/容器图片替换: 索引 =', v.selectedImageIndex);
+      const originalImg = v.containerImages[v.selectedImageIndex];
+      const originalSrc = rememberOriginalSource(originalImg, originalImg.src);
+      editorLog.debug('[DEBUG] 轮播/容器原图路径 =', originalSrc);
+      const target = imageDisplayTarget(originalImg, v.currentEditingElement);
+      saving = saveEditedImage(originalSrc, file, v.currentEditingType, target).then(url => {
+        originalImg.src = url;
+        editorLog.debug('[DEBUG] 轮播/容器图片替换成功:', file.name);
+      });
+    } else {
+      editorLog.error('[ERROR] 无法确定要替换的图片类型或元素');
+    }
+    
+    if (saving) {
+      saving.then(() => editorPerf.end(span, 1), error => {
+        editorLog.error('[ERROR] 图片替换失败:', error);
+        editorPerf.end(span, 0);
+        alert('图片保存失败，请重试');
+      });
+    } else {
+      editorPerf.end(span, 0);
+    }
+    
+    // 关闭模态框
+    closeImageUploadModal();
+    
+  } else if (uploadType === 'multiple') {
+    // 检查是否有选中的多个文件
+    const files = multipleImageFileInput.files;
+    editorLog.debug('[DEBUG] 多文件数量:', files ? files.length : 0);
+    
+    if (!files || files.length === 0) {
+      editorLog.error('[ERROR] 未选择多个文件!');
+      alert('请选择图片');
+      return;
+    }
+    
+    // 检查选择的图片数量是否与容器图片数量匹配
+    if (files.length > v.containerImages.length) {
+      editorLog.warn('[WARN] 选择的图片数量超过容器图片数量');
+      alert(`您选择了${files.length}张图片，但${v.currentEditingType === 'carousel' ? '轮播图' : '区域'}中只有${v.containerImages.length}张图片，只会使用前${v.containerImages.length}张图片`);
+    }
+    
+    // 处理多张图片上传
+    const totalToProcess = Math.min(files.length, v.containerImages.length);
+    editorLog.debug('[DEBUG] 准备处理多文件, 总数:', totalToProcess);
+    const span = editorPerf.start('upload');
+    const editingType = v.currentEditingType;
+    const savings = [];
+    
+    for (let i = 0; i < totalToProcess; i++) {
+      const file = files[i];
+      const img = v.containerImages[i];
+      editorLog.debug('[DEBUG] 处理第', i+1, '个文件:', file.name);
+      
+      const originalSrc = rememberOriginalSource(img, img.src);
+      editorLog.debug('[DEBUG] 多图替换 #', i+1, ': 原路径 =', originalSrc);
+      const target = imageDisplayTarget(img, v.currentEditingElement);
+      savings.push(saveEditedImage(originalSrc, file, editingType, target).then(url => {
+        img.src = url;
+        editorLog.debug('[DEBUG] 多图替换 #', i+1, '成功');
+        return true;
+      }, error => {
+        editorLog.error('[ERROR] 文件', i+1, '保存失败:', error);
+        return false;
+      }));
+    }
+    
+    Promise.all(savings).then(results => {
+      const replacedCount = results.filter(Boolean).length;
+      editorLog.debug('[DEBUG] 所有图片处理完毕:', replacedCount, '/', totalToProcess);
+      editorPerf.end(span, replacedCount);
+    });
+    
+    // 关闭模态框
+    closeImageUploadModal();
+  }
+}
+
+// 背景图检测：遍历一次 document.styleSheets，收集设置了背景图的选择器，
+// 只对匹配这些选择器或带内联背景样式的元素取计算样式，不再对整棵树逐个调用 getComputedStyle。
+// 图片模式启用期间计算结果缓存在 WeakMap 中，页面变化时失效
+const backgroundDetector = {
+  selector: null, // 收集到的选择器（逗号连接），null 表示需要重新收集
+  unreadable: 0, // 无法读取规则的样式表数（如跨域样式表、file:// 页面的样式表），有这样的样式表时额外检查一批有限的元素
+  cache: new WeakMap(), // 元素 → { generation, value }
+  generation: 0, // class、id 的变化可能影响任意元素的选择器匹配，递增后之前的缓存全部失效
+  tracking: false // 是否在观察页面变化，没有观察时不使用缓存
+};
+
+// 图片编辑模式自己添加的类，这些类的变化不影响背景图
+const IMAGE_EDITOR_CLASSES = ['image-editable', 'bg-image-editable', 'carousel-container-editable', 'div-image-container', 'div-hover-highlight'];
+
+// 背景图的计算值是否是可编辑的图片（不是 none 或渐变）
+function hasBackgroundImage(value) {
+  return !!value && value !== 'none' && !value.includes('gradient');
+}
+
+// 收集样式表中设置了背景图的选择器（包括 @media、@supports 等分组规则和 @import 的样式表）
+function collectBackgroundSelectors() {
+  const selectors = new Set();
+  let unreadable = 0;
+
+  const visitRules = rules => {
+    Array.from(rules).forEach(rule => {
+      if (rule.styleSheet) {
+        visitSheet(rule.styleSheet);
+      } else if (rule.selectorText && rule.style) {
+        // background 简写中使用 var() 时 background-image 为空，要检查简写
+        const value = rule.style.getPropertyValue('background-image') || rule.style.getPropertyValue('background');
+        if (/url\(|image-set\(|var\(/.test(value)) {
+          selectors.add(rule.selectorText);
+        }
+      }
+      if (rule.cssRules) {
+        visitRules(rule.cssRules);
+      }
+    });
+  };
+  const visitSheet = sheet => {
+    let rules = null;
+    try {
+      rules = sheet.cssRules;
+    } catch (error) {
+      unreadable++;
+    }
+    if (rules) visitRules(rules);
+  };
+  Array.from(document.styleSheets).forEach(visitSheet);
+
+  // 浏览器不支持的选择器会使整个选择器列表查询失败，逐个去掉
+  let selector = Array.from(selectors).join(', ');
+  try {
+    if (selector) document.querySelector(selector);
+  } catch (error) {
+    selector = Array.from(selectors).filter(item => {
+      try {
+        document.querySelector(item);
+        return true;
+      } catch (e) {
+        return false;
+      }
+    }).join(', ');
+  }
+
+  backgroundDetector.selector = selector;
+  backgroundDetector.unreadable = unreadable;
+  editorLog.debug('[DEBUG] 设置背景图的选择器:', selectors.size, '无法读取的样式表:', unreadable);
+}
+
+// 有无法读取的样式表时额外检查的元素数上限
+const BACKGROUND_FALLBACK_LIMIT = 5000;
+// 不会有可编辑背景图的元素，连同子树跳过
+const BACKGROUND_SKIP_TAGS = new Set(['script', 'style', 'link', 'meta', 'template', 'noscript', 'svg', 'math', 'img', 'picture', 'video', 'audio', 'canvas', 'iframe', 'object', 'embed', 'br', 'input', 'select', 'textarea', 'option']);
+
+// 可能有背景图的元素：匹配收集到的选择器或带内联背景样式的元素
+// 有无法读取的样式表时，再加上 fallbackBackgroundCandidates() 找出的元素
+// 没有观察页面变化时（如恢复保存的修改）每次重新收集选择器
+function backgroundCandidates(root) {
+  if (backgroundDetector.selector === null || !backgroundDetector.tracking) {
+    collectBackgroundSelectors();
+  }
+  const selector = [backgroundDetector.selector, '[style*="background" i]'].filter(Boolean).join(', ');
+  const found = queryWithin(root, selector);
+  if (backgroundDetector.unreadable) {
+    const known = new Set(found);
+    fallbackBackgroundCandidates(root).forEach(el => {
+      if (!known.has(el)) found.push(el);
+    });
+  }
+  return found;
+}
+
+// 读不到的样式表中的背景图规则只能靠计算样式发现，只检查其中可能匹配的元素：
+// 带 class 或 id 的元素（样式表规则基本都通过它们匹配）和 body。
+// 编辑器界面、替换元素、SVG 和 display: none 的元素连同子树跳过（计算样式随后取背景图时还会用到），
+// 检查数超过上限时停止
+function fallbackBackgroundCandidates(root) {
+  const found = [];
+  const start = root.nodeType === Node.DOCUMENT_NODE ? root.body : root;
+  if (!start) return found;
+
+  const check = el => {
+    if (BACKGROUND_SKIP_TAGS.has(el.localName)) return NodeFilter.FILTER_REJECT;
+    if (el.localName !== 'body' && !el.hasAttribute('class') && !el.hasAttribute('id')) return NodeFilter.FILTER_SKIP;
+    if (el.matches(EDITOR_UI_SELECTOR) || getComputedStyle(el).display === 'none') return NodeFilter.FILTER_REJECT;
+    return NodeFilter.FILTER_ACCEPT;
+  };
+  const first = check(start);
+  if (first === NodeFilter.FILTER_REJECT) return found;
+  if (first === NodeFilter.FILTER_ACCEPT) found.push(start);
+
+  const walker = document.createTreeWalker(start, NodeFilter.SHOW_ELEMENT, { acceptNode: check });
+  while (walker.nextNode()) {
+    if (found.length >= BACKGROUND_FALLBACK_LIMIT) {
+      editorLog.warn('[WARN] 可能有背景图的元素过多，只检查前', BACKGROUND_FALLBACK_LIMIT, '个');
+      break;
+    }
+    found.push(walker.currentNode);
+  }
+  return found;
+}
+
+// 元素计算样式中的 background-image，图片模式启用期间使用缓存
+function computedBackgroundImage(element) {
+  const d = backgroundDetector;
+  if (d.tracking) {
+    const cached = d.cache.get(element);
+    if (cached && cached.generation === d.generation) return cached.value;
+  }
+  const value = window.getComputedStyle(element).backgroundImage;
+  if (d.tracking) {
+    d.cache.set(element, { generation: d.generation, value: value });
+  }
+  return value;
+}
+
+// class 的变化是否只涉及图片编辑模式自己的类
+function isEditorClassChange(mutation) {
+  if (mutation.attributeName !== 'class') return false;
+  const before = new Set((mutation.oldValue || '').split(/\s+/).filter(Boolean));
+  const after = new Set(Array.from(mutation.target.classList));
+  const changed = Array.from(before).filter(c => !after.has(c)).concat(Array.from(after).filter(c => !before.has(c)));
+  return changed.every(c => IMAGE_EDITOR_CLASSES.includes(c));
+}
+
+// 页面变化使背景图缓存失效：内联样式只影响元素自己，class、id 可能改变任意元素的选择器匹配，
+// 增删样式表需要重新收集选择器
+function handleBackgroundMutations(mutations) {
+  const d = backgroundDetector;
+  mutations.forEach(mutation => {
+    if (mutation.type === 'childList') {
+      const nodes = Array.from(mutation.addedNodes).concat(Array.from(mutation.removedNodes));
+      if (nodes.some(node => node.nodeName === 'STYLE' || node.nodeName === 'LINK')) {
+        d.selector = null;
+        d.generation++;
+      }
+    } else if (mutation.attributeName === 'style') {
+      // 只有背景和自定义属性的变化会改变背景图（编辑器设置的定位等不影响）
+      const pattern = /background|--/i;
+      if (pattern.test(mutation.oldValue || '') || pattern.test(mutation.target.getAttribute('style') || '')) {
+        d.cache.delete(mutation.target);
+      }
+    } else if (!isEditorClassChange(mutation)) {
+      d.generation++;
+    }
+  });
+}
+
+// 开始观察页面变化，之后的检测结果可以缓存
+function startBackgroundTracking() {
+  startEditorObserver('image', handleBackgroundMutations, document.documentElement, {
+    childList: true,
+    subtree: true,
+    attributes: true,
+    attributeFilter: ['class', 'id', 'style'],
+    attributeOldValue: true
+  });
+  backgroundDetector.selector = null;
+  backgroundDetector.tracking = true;
+}
+
+// 停止缓存（观察器随模式关闭释放），下次启用时重新收集选择器
+function resetBackgroundDetector() {
+  backgroundDetector.tracking = false;
+  backgroundDetector.cache = new WeakMap();
+  backgroundDetector.selector = null;
+}
+
+// 获取背景图URL
+function getBackgroundImageUrl(element) {
+  if (!element) return null;
+  
+  const bgImage = computedBackgroundImage(element);
+  if (bgImage && bgImage !== 'none') {
+    // 提取url中的实际链接
+    const match = bgImage.match(/url\(['"]?(.*?)['"]?\)/);
+    if (match && match[1]) {
+      return match[1];
+    }
+  }
+  
+  return null;
+}
+
+// 图片容器是否是编辑器自己的元素
+function isEditorImageContainer(div) {
+  return div.id === 'elementInspector' || 
+    div.id === 'divEditorButtons' ||
+    div.classList.contains('element-highlight') ||
+    div.classList.contains('editor-button') ||
+    div.id === 'imageUploadModal' ||
+    div.closest('#imageUploadModal');
+}
+
+// 使所有图片可编辑
+// root 为要处理的子树（默认整个文档），新插入页面的内容只处理它自己和包含它的容器：
+// 子树中有图片时，沿祖先向上标记还没有标记的容器，遇到已标记的容器就停止，不统计祖先中的全部图片
+function makeImagesEditable(root = document) {
+  editorLog.debug('[DEBUG] 使图片可编辑:', root === document ? 'document' : root.tagName);
+  const withAncestors = root !== document;
+  
+  // 处理普通图片
+  let span = editorPerf.start('scan:images');
+  let imageCount = 0;
+  queryWithin(root, 'img').forEach(img => {
+    // 排除编辑器元素的图片
+    if (img.closest('#elementInspector') || 
+        img.closest('#divEditorButtons') || 
+        img.closest('#imageUploadModal') ||
+        img.closest('.editor-button')) {
+      return;
+    }
+    
+    // 确保图片父元素是相对定位，以支持伪元素
+    if (img.parentElement) {
+      ensureRelativePosition(img.parentElement, 'image');
+    }
+    
+    // 仅添加类，不修改直接样式（点击由委托的监听处理）
+    touchClass('image', img, 'image-editable');
+    imageCount++;
+  });
+  
+  editorPerf.end(span, imageCount);
+  editorLog.debug(`[DEBUG] 添加了 ${imageCount} 张可编辑图片`);
+  
+  // 处理背景图片
+  span = editorPerf.start('scan:backgrounds');
+  let bgImageCount = 0;
+  backgroundCandidates(root).forEach(el => {
+    // 排除已处理的元素和编辑器元素
+    if (el.classList.contains('bg-image-editable') || 
+        el.id === 'elementInspector' || 
+        el.id === 'divEditorButtons' ||
+        el.classList.contains('element-highlight') ||
+        el.classList.contains('editor-button') ||
+        el.closest('#imageUploadModal')) {
+      return;
+    }
+    
+    if (hasBackgroundImage(computedBackgroundImage(el))) {
+      // 确保元素是相对定位，以支持伪元素
+      ensureRelativePosition(el, 'image');
+      
+      touchClass('image', el, 'bg-image-editable');
+      touchAttribute('image', el, 'data-bg-editable', 'true');
+      bgImageCount++;
+    }
+  });
+  
+  editorPerf.end(span, bgImageCount);
+  editorLog.debug(`[DEBUG] 添加了 ${bgImageCount} 个可编辑背景`);
+  
+  // 处理轮播图容器
+  span = editorPerf.start('scan:carousels');
+  const carouselContainers = [];
+  
+  // 查找可能的轮播图容器
+  const carouselSelector = '.carousel, .swiper, .slider, [id*="carousel"], [id*="slider"], [class*="carousel"], [class*="slider"]';
+  const candidates = queryWithin(root, carouselSelector);
+  if (withAncestors && imageCount > 0) {
+    // 包含新图片、还没有标记的轮播图：需要统计整个容器的图片数，这类容器按类名匹配，通常只包含轮播图本身
+    candidates.push(...unmarkedAncestors(root, carouselSelector, el => el.classList.contains('carousel-container-editable')));
+  }
+  candidates.forEach(container => {
+    // 排除编辑器元素
+    if (container.closest('#elementInspector') || 
+        container.closest('#divEditorButtons') || 
+        container.closest('#imageUploadModal') ||
+        container.classList.contains('editor-button')) {
+      return;
+    }
+    
+    if (container.querySelectorAll('img').length > 1) {
+      carouselContainers.push(container);
+    }
+  });
+  
+  editorLog.debug(`[DEBUG] 找到 ${carouselContainers.length} 个轮播图`);
+  
+  // 标记轮播图容器
+  carouselContainers.forEach(container => {
+    touchClass('image', container, 'carousel-container-editable');
+    touchAttribute('image', container, 'data-carousel-editable', 'true');
+    
+    // 添加提示标记
+    if (!container.querySelector('[data-carousel-hint]')) {
+      const hint = document.createElement('div');
+      hint.setAttribute('data-carousel-hint', 'true');
+      hint.style.position = 'absolute';
+      hint.style.top = '5px';
+      hint.style.right = '5px';
+      hint.style.backgroundColor = 'rgba(66, 133, 244, 0.8)';
+      hint.style.color = 'white';
+      hint.style.padding = '2px 5px';
+      hint.style.borderRadius = '3px';
+      hint.style.fontSize = '12px';
+      hint.style.zIndex = '1000';
+      hint.textContent = '轮播图 - 点击编辑';
+      
+      // 如果容器是相对定位，直接添加提示；否则，先设置相对定位
+      ensureRelativePosition(container, 'image');
+      
+      container.appendChild(hint);
+      touchNode('image', hint);
+    }
+  });
+  editorPerf.end(span, carouselContainers.length);
+  
+  // 处理包含图片的div容器 - 添加可点击编辑功能
+  span = editorPerf.start('scan:containers');
+  let divWithImagesCount = 0;
+  queryWithin(root, 'div').forEach(div => {
+    // 排除已处理的元素和编辑器元素
+    if (isEditorImageContainer(div)) {
+      return;
+    }
+    
+    // 检查div是否包含图片
+    const images = div.querySelectorAll('img');
+    if (images.length === 0) {
+      return; // 没有图片的div直接跳过
+    }
+    
+    // 过滤出非编辑器的图片
+    const validImages = Array.from(images).filter(img => {
+      return !(img.closest('#elementInspector') || 
+              img.closest('#divEditorButtons') || 
+              img.closest('#imageUploadModal') ||
+              img.closest('.editor-button'));
+    });
+    
+    if (validImages.length > 0) {
+      // 加上标记类，点击时按这个类找到容器
+      touchClass('image', div, 'div-image-container');
+      touchAttribute('image', div, 'data-images-count', String(validImages.length));
+      
+      divWithImagesCount++;
+    }
+  });
+  
+  // 包含新图片的外层div：没有标记的外层div之前不包含图片，图片数就是子树中的图片数
+  if (withAncestors && imageCount > 0) {
+    unmarkedAncestors(root, 'div', div => div.classList.contains('div-image-container')).forEach(div => {
+      if (isEditorImageContainer(div)) {
+        return;
+      }
+      touchClass('image', div, 'div-image-container');
+      touchAttribute('image', div, 'data-images-count', String(imageCount));
+      divWithImagesCount++;
+    });
+  }
+  
+  editorLog.debug(`[DEBUG] 添加了 ${divWithImagesCount} 个包含图片的div`);
+  
+  // 处理包含多个图片的链接容器
+  let linkCount = 0;
+  queryWithin(root, 'a').forEach(link => {
+    const images = link.querySelectorAll('img');
+    if (images.length > 0) {
+      touchAttribute('image', link, 'data-image-editable-container', 'true');
+      linkCount++;
+    }
+  });
+  if (withAncestors && imageCount > 0) {
+    unmarkedAncestors(root, 'a', link => link.hasAttribute('data-image-editable-container')).forEach(link => {
+      touchAttribute('image', link, 'data-image-editable-container', 'true');
+      linkCount++;
+    });
+  }
+  editorPerf.end(span, divWithImagesCount + linkCount);
+  
+  editorLog.debug('[DEBUG] 图片编辑已启用');
+}
+
+// 编辑后的图片保存在 IndexedDB 中：按内容哈希保存原始 Blob，一张图片一次写入，
+// localStorage 中当前页面的 editedImages 等只记录 原地址 → 'editor-blob:哈希' 的引用。
+// 页面上用 blob: 地址显示，同一内容只创建一个地址
+const EDITOR_BLOB_PREFIX = 'editor-blob:';
+const editorBlobStore = {
+  database: null, // 打开数据库的 Promise
+  urls: new Map(), // 哈希 → blob: 地址
+  writing: Promise.resolve(), // 写入队列，一次只写一个键
+
+  // 打开数据库（只打开一次）
+  open: function() {
+    if (!this.database) {
+      this.database = new Promise((resolve, reject) => {
+        const request = indexedDB.open('html-editor', 1);
+        request.onupgradeneeded = () => request.result.createObjectStore('blobs');
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+      });
+    }
+    return this.database;
+  },
+
+  // 内容哈希：安全上下文中用 SHA-256，否则（如局域网 http 地址）用 FNV-1a 加上长度
+  keyOf: function(blob) {
+    return blob.arrayBuffer().then(buffer => {
+      if (window.crypto && crypto.subtle) {
+        return crypto.subtle.digest('SHA-256', buffer).then(digest =>
+          Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join(''));
+      }
+      const bytes = new Uint8Array(buffer);
+      let hash = 0x811c9dc5;
+      for (let i = 0; i < bytes.length; i++) {
+        hash = Math.imul(hash ^ bytes[i], 0x01000193);
+      }
+      return (hash >>> 0).toString(16).padStart(8, '0') + '-' + bytes.length;
+    });
+  },
+
+  // 在一个事务中对对象仓库执行操作，事务完成后返回 fn 的请求结果
+  transact: function(mode, fn) {
+    return this.open().then(db => new Promise((resolve, reject) => {
+      const transaction = db.transaction('blobs', mode);
+      const result = fn(transaction.objectStore('blobs'));
+      transaction.oncomplete = () => resolve(result && 'result' in result ? result.result : result);
+      transaction.onerror = () => reject(transaction.error);
+      transaction.onabort = () => reject(transaction.error);
+    }));
+  },
+
+  // 排队写入一个 Blob，已有相同内容时不再写入
+  put: function(key, blob) {
+    const write = () => this.transact('readwrite', store => {
+      const existing = store.count(key);
+      existing.onsuccess = () => {
+        if (!existing.result) store.put(blob, key);
+      };
+    });
+    this.writing = this.writing.then(write, write);
+    return this.writing;
+  },
+
+  // 读取一组 Blob，返回 哈希 → Blob（找不到的不包含）
+  getMany: function(keys) {
+    const blobs = new Map();
+    return this.transact('readonly', store => {
+      keys.forEach(key => {
+        const request = store.get(key);
+        request.onsuccess = () => {
+          if (request.result) blobs.set(key, request.result);
+        };
+      });
+    }).then(() => blobs);
+  },
+
+  // 删除一个 Blob
+  remove: function(key) {
+    const url = this.urls.get(key);
+    if (url) {
+      URL.revokeObjectURL(url);
+      this.urls.delete(key);
+    }
+    return this.transact('readwrite', store => store.delete(key));
+  },
+
+  // 哈希对应的 blob: 地址
+  urlFor: function(key, blob) {
+    if (!this.urls.has(key)) {
+      this.urls.set(key, URL.createObjectURL(blob));
+    }
+    return this.urls.get(key);
+  }
+};
+
+// 把文件读成 data URL（IndexedDB 不可用时保存到 localStorage，以及导出编辑结果时使用）
+function readAsDataURL(blob) {
+  return new Promise((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onload = () => resolve(reader.result);
+    reader.onerror = () => reject(reader.error);
+    reader.readAsDataURL(blob);
+  });
+}
+
+// 上传的图片按页面上的显示尺寸缩小、重新编码后再保存：在 Web Worker 中用 createImageBitmap 解码，
+// OffscreenCanvas 缩放和编码（优先 WebP，浏览器不能编码 WebP 时 JPEG 照片仍用 JPEG），主线程只收发文件。
+// 浏览器不支持、Worker 无法创建（如页面的 CSP 禁止）或结果没有变小时保存原文件
+const IMAGE_RESIZE = {
+  quality: 0.82, // 编码质量
+  maxPixelRatio: 2, // 目标尺寸 = 显示尺寸 × 设备像素比，最多按 2 倍
+  maxEdge: 2560, // 不知道显示尺寸时长边的上限
+  keepTypes: ['image/gif', 'image/svg+xml'] // 动图和矢量图保持原样
+};
+const imageResizer = { worker: null, url: null, jobs: new Map(), nextId: 0 };
+
+// Worker 中运行的函数（转成源码后在 Worker 中执行，不能引用外部变量）
+function imageResizeWorker() {
+  const encode = (canvas, type, quality) => canvas.convertToBlob({ type: type, quality: quality })
+    .then(blob => blob.type === type ? blob : null);
+
+  self.onmessage = event => {
+    const job = event.data;
+    createImageBitmap(job.file).then(bitmap => {
+      // 显示尺寸已知时缩放到能铺满显示区域（cover）的大小，否则只限制长边；都不放大
+      const longest = Math.max(bitmap.width, bitmap.height);
+      const scale = Math.min(1, job.width && job.height ?
+        Math.max(job.width / bitmap.width, job.height / bitmap.height) : job.maxEdge / longest);
+      const canvas = new OffscreenCanvas(Math.max(1, Math.round(bitmap.width * scale)),
+        Math.max(1, Math.round(bitmap.height * scale)));
+      const context = canvas.getContext('2d');
+      context.imageSmoothingQuality = 'high';
+      context.drawImage(bitmap, 0, 0, canvas.width, canvas.height);
+      bitmap.close();
+      // 不能编码 WebP 时只有 JPEG 原图改用 JPEG，其他格式可能有透明区域
+      return encode(canvas, 'image/webp', job.quality).then(blob => blob ||
+        (job.file.type === 'image/jpeg' ? encode(canvas, 'image/jpeg', job.quality) : null));
+    }).then(
+      blob => self.postMessage({ id: job.id, blob: blob }),
+      error => self.postMessage({ id: job.id, error: String(error) })
+    );
+  };
+}
+
+// 启动缩放用的 Worker，不支持时返回 null
+function getImageResizeWorker() {
+  if (imageResizer.worker) return imageResizer.worker;
+  if (!window.Worker || !window.OffscreenCanvas || !window.createImageBitmap) return null;
+
+  try {
+    imageResizer.url = URL.createObjectURL(new Blob(['(' + imageResizeWorker.toString() + ')()'], { type: 'text/javascript' }));
+    imageResizer.worker = new Worker(imageResizer.url);
+  } catch (error) {
+    editorLog.warn('[WARN] 无法启动图片缩放 Worker，保存原图:', error);
+    stopImageResizer(true);
+    return null;
+  }
+
+  imageResizer.worker.onmessage = event => {
+    const resolve = imageResizer.jobs.get(event.data.id);
+    imageResizer.jobs.delete(event.data.id);
+    if (event.data.error) editorLog.warn('[WARN] 图片缩放失败，保存原图:', event.data.error);
+    if (resolve) resolve(event.data.blob || null);
+    stopImageResizer(false);
+  };
+  imageResizer.worker.onerror = event => {
+    editorLog.warn('[WARN] 图片缩放 Worker 出错，保存原图:', event.message || event.type);
+    stopImageResizer(true);
+  };
+  return imageResizer.worker;
+}
+
+// 没有进行中的任务时停止 Worker；force 时立即停止，进行中的任务都保存原图
+function stopImageResizer(force) {
+  if (!force && imageResizer.jobs.size > 0) return;
+  imageResizer.jobs.forEach(resolve => resolve(null));
+  imageResizer.jobs.clear();
+  if (imageResizer.worker) imageResizer.worker.terminate();
+  if (imageResizer.url) URL.revokeObjectURL(imageResizer.url);
+  imageResizer.worker = null;
+  imageResizer.url = null;
+}
+
+// 图片在页面上显示的像素尺寸；元素没有显示（如轮播中隐藏的一张）时用容器的尺寸，都没有时为 0。
+// 按原始尺寸显示的图片（background-size: auto、object-fit: none）缩小后显示效果会变，返回 null 表示不缩放
+function imageDisplayTarget(element, container) {
+  if (!element) return null;
+  const style = getComputedStyle(element);
+  if (element.tagName === 'IMG' ? /^(none|scale-down)$/.test(style.objectFit) :
+    /^auto( auto)?$/.test(style.backgroundSize)) {
+    return null;
+  }
+
+  const ratio = Math.min(window.devicePixelRatio || 1, IMAGE_RESIZE.maxPixelRatio);
+  for (const candidate of [element, container]) {
+    const rect = candidate ? candidate.getBoundingClientRect() : null;
+    if (rect && rect.width && rect.height) {
+      return { width: Math.ceil(rect.width * ratio), height: Math.ceil(rect.height * ratio) };
+    }
+  }
+  return { width: 0, height: 0 };
+}
+
+// 按显示尺寸缩小图片，返回要保存的 Blob（不缩放、无法处理或没有变小时返回原文件）
+function downscaleImage(file, target) {
+  const worker = target && !IMAGE_RESIZE.keepTypes.includes(file.type) ? getImageResizeWorker() : null;
+  if (!worker) return Promise.resolve(file);
+
+  const span = editorPerf.start('resize');
+  return new Promise(resolve => {
+    const id = ++imageResizer.nextId;
+    imageResizer.jobs.set(id, resolve);
+    worker.postMessage({ id: id, file: file, width: target.width, height: target.height,
+      maxEdge: IMAGE_RESIZE.maxEdge, quality: IMAGE_RESIZE.quality });
+  }).then(blob => {
+    const smaller = !!blob && blob.size < file.size;
+    editorLog.debug('[DEBUG] 图片缩放:', file.name, file.size, '→', blob ? blob.size : '-', blob ? blob.type : '', smaller ? '' : '（保存原图）');
+    editorPerf.end(span, smaller ? 1 : 0);
+    return smaller ? blob : file;
+  });
+}
+
+// 被替换过的图片和背景的原地址：页面上显示的是 blob: 地址，再次替换时仍以原地址保存
+const replacedImageSources = new WeakMap();
+
+// 记录元素替换前的地址（只记录第一次），返回原地址
+function rememberOriginalSource(element, currentUrl) {
+  if (!replacedImageSources.has(element)) {
+    replacedImageSources.set(element, currentUrl);
+  }
+  return replacedImageSources.get(element);
+}
+
+// 编辑类型对应的保存位置
+function editedImageStorage(editingType) {
+  const v = window.editorVars;
+  if (editingType === 'background') {
+    return { map: v.editedBackgroundImages, key: 'editedBackgroundImages' };
+  }
+  if (editingType === 'carousel' || editingType === 'container') {
+    return { map: v.editedCarouselImages, key: 'editedCarouselImages' };
+  }
+  return { map: v.editedImages, key: 'editedImages' };
+}
+
+// 引用是否还在任何保存的修改中使用（同一内容可能被多处、多个页面引用，所以检查所有页面）
+function isBlobReferenced(reference) {
+  for (let i = 0; i < localStorage.length; i++) {
+    const value = localStorage.getItem(localStorage.key(i));
+    if (value && value.includes(reference)) return true;
+  }
+  return false;
+}
+
+// 保存编辑的图片：按 target（imageDisplayTarget 的结果）缩小后写入 IndexedDB，在 localStorage 中记录引用
+// 返回页面上显示用的地址；IndexedDB 不可用时退回保存 data URL
+function saveEditedImage(originalSrc, file, editingType, target) {
+  const storage = editedImageStorage(editingType);
+  const record = value => {
+    const previous = storage.map[originalSrc];
+    storage.map[originalSrc] = value;
+    localStorage.setItem(editorStorageKey(storage.key), JSON.stringify(storage.map));
+    // 更新页面修改时间
+    savePageState();
+    editorLog.debug('[DEBUG] 图片编辑已保存:', originalSrc);
+    // 不再使用的旧图片从 IndexedDB 中删除
+    if (previous && previous !== value && previous.startsWith(EDITOR_BLOB_PREFIX) && !isBlobReferenced(previous)) {
+      editorBlobStore.remove(previous.slice(EDITOR_BLOB_PREFIX.length)).catch(() => {});
+    }
+  };
+
+  return downscaleImage(file, target).then(image =>
+    editorBlobStore.keyOf(image).then(key =>
+      editorBlobStore.put(key, image).then(() => {
+        record(EDITOR_BLOB_PREFIX + key);
+        return editorBlobStore.urlFor(key, image);
+      })
+    ).catch(error => {
+      editorLog.warn('[WARN] 图片无法保存到 IndexedDB，改为保存到 localStorage:', error);
+      return readAsDataURL(image).then(dataUrl => {
+        record(dataUrl);
+        return dataUrl;
+      });
+    })
+  );
+}
+
+// 把保存的引用换成可以显示的地址（blob: 地址），找不到图片的引用被去掉
+function resolveImageReferences(maps) {
+  const keys = new Set();
+  maps.forEach(map => Object.values(map).forEach(value => {
+    if (typeof value === 'string' && value.startsWith(EDITOR_BLOB_PREFIX)) {
+      keys.add(value.slice(EDITOR_BLOB_PREFIX.length));
+    }
+  }));
+  if (keys.size === 0) return Promise.resolve(maps);
+
+  return editorBlobStore.getMany(Array.from(keys)).then(blobs => maps.map(map => {
+    const resolved = {};
+    Object.keys(map).forEach(originalSrc => {
+      const value = map[originalSrc];
+      if (typeof value !== 'string' || !value.startsWith(EDITOR_BLOB_PREFIX)) {
+        resolved[originalSrc] = value;
+        return;
+      }
+      const key = value.slice(EDITOR_BLOB_PREFIX.length);
+      if (blobs.has(key)) {
+        resolved[originalSrc] = editorBlobStore.urlFor(key, blobs.get(key));
+      } else {
+        editorLog.warn('[WARN] 找不到保存的图片:', originalSrc);
+      }
+    });
+    return resolved;
+  }));
+}
+
+// 导出保存的图片编辑：把引用换成 data URL，得到 html_edit.py apply 可以使用的编辑结果
+function exportImageEdits(edits) {
+  const keys = ['editedImages', 'editedBackgroundImages', 'editedCarouselImages'];
+  const pending = [];
+  keys.forEach(storageKey => {
+    const map = edits[storageKey] || {};
+    Object.keys(map).forEach(originalSrc => {
+      const value = map[originalSrc];
+      if (typeof value !== 'string' || !value.startsWith(EDITOR_BLOB_PREFIX)) return;
+      const key = value.slice(EDITOR_BLOB_PREFIX.length);
+      pending.push(editorBlobStore.getMany([key]).then(blobs => {
+        if (blobs.has(key)) {
+          return readAsDataURL(blobs.get(key)).then(dataUrl => {
+            map[originalSrc] = dataUrl;
+          });
+        }
+        editorLog.warn('[WARN] 找不到保存的图片:', originalSrc);
+        delete map[originalSrc];
+      }));
+    });
+  });
+  return Promise.all(pending).then(() => edits);
+}
+
+// 建立 URL → 元素 的索引，只遍历一次图片和可能有背景图的元素
+// 图片按 src 属性和解析后的地址各登记一次，背景按计算样式中的每个 url() 登记
+function buildImageUrlIndex(withImages, withBackgrounds) {
+  const index = { images: new Map(), backgrounds: new Map() };
+  const add = (map, url, element) => {
+    if (!url) return;
+    if (!map.has(url)) map.set(url, new Set());
+    map.get(url).add(element);
+  };
+
+  if (withImages) {
+    document.querySelectorAll('img').forEach(img => {
+      add(index.images, img.getAttribute('src'), img);
+      add(index.images, img.src, img);
+    });
+  }
+  if (withBackgrounds) {
+    backgroundCandidates(document).forEach(el => {
+      const bgImage = computedBackgroundImage(el);
+      if (!bgImage || bgImage === 'none') return;
+      for (const match of bgImage.matchAll(/url\(['"]?(.*?)['"]?\)/g)) {
+        add(index.backgrounds, match[1], el);
+      }
+    });
+  }
+  return index;
+}
+
+// 应用图片编辑，返回更新的元素数的 Promise（保存在 IndexedDB 中的图片需要先异步读出）
+function applyImageEdits() {
+  const v = window.editorVars;
+  editorLog.debug('[DEBUG] 应用保存的图片编辑');
+  
+  const maps = [v.editedImages, v.editedCarouselImages, v.editedBackgroundImages];
+  return resolveImageReferences(maps).then(([images, carouselImages, backgroundImages]) => {
+    let appliedCount = 0;
+    // 轮播图/容器图片和普通图片一样按原地址替换，同一地址以轮播图的编辑为准
+    const imageEdits = Object.assign({}, images, carouselImages);
+    const hasImageEdits = Object.keys(imageEdits).length > 0;
+    const hasBackgroundEdits = Object.keys(backgroundImages).length > 0;
+    if (!hasImageEdits && !hasBackgroundEdits) return 0;
+    
+    const index = buildImageUrlIndex(hasImageEdits, hasBackgroundEdits);
+    editorLog.debug('[DEBUG] 图片地址索引:', index.images.size, '背景地址索引:', index.backgrounds.size);
+    
+    // 应用普通图片和轮播图/容器图片编辑
+    for (const originalSrc in imageEdits) {
+      (index.images.get(originalSrc) || []).forEach(img => {
+        rememberOriginalSource(img, originalSrc);
+        img.src = imageEdits[originalSrc];
+        appliedCount++;
+      });
+    }
+    
+    // 应用背景图片编辑
+    for (const originalSrc in backgroundImages) {
+      (index.backgrounds.get(originalSrc) || []).forEach(el => {
+        rememberOriginalSource(el, originalSrc);
+        el.style.backgroundImage = `url('${backgroundImages[originalSrc]}')`;
+        appliedCount++;
+      });
+    }
+    
+    editorLog.debug('[DEBUG] 图片编辑已应用');
+    return appliedCount;
+  }).catch(error => {
+    editorLog.error('[ERROR] 应用图片编辑失败:', error);
+    return 0;
+  });
+}
+
+// 指针下的元素变化 - 图片编辑模式
+function handleImageEditHover(element) {
+  const v = window.editorVars;
+  
+  if (!v.isImageEditMode) {
+    return;
+  }
+  
+  // 忽略编辑器自身的元素
+  if (element && (
+      element.id === 'elementInspector' || 
+      element.id === 'divEditorButtons' || 
+      element.classList.contains('element-highlight') ||
+      element.classList.contains('editor-button') ||
+      element === document.getElementById('editDuplicateBtn') ||
+      element === document.getElementById('editRemoveBtn') ||
+      element.closest('#imageUploadModal'))) {
+    hideHoverHighlight();
+    return;
+  }
+  
+  // 查找最近的div元素
+  let targetDiv = element;
+  while (targetDiv && targetDiv.tagName.toLowerCase() !== 'div' && targetDiv !== document.body) {
+    targetDiv = targetDiv.parentElement;
+  }
+  
+  if (!targetDiv || targetDiv === document.body) {
+    hideHoverHighlight();
+    return;
+  }
+  
+  // 检查div是否包含图片（排除编辑器元素的图片）
+  const images = targetDiv.querySelectorAll('img');
+  let containsImages = false;
+  
+  for (const img of images) {
+    // 检查图片是否属于编辑器元素
+    const isEditorElement = img.closest('#elementInspector') || 
+                           img.closest('#divEditorButtons') || 
+                           img.closest('#imageUploadModal') ||
+                           img.closest('.editor-button');
+    if (!isEditorElement) {
+      containsImages = true;
+      break;
+    }
+  }
+  
+  if (!containsImages) {
+    hideHoverHighlight();
+    return;
+  }
+  
+  // 更新当前悬停元素
+  v.hoverElement = targetDiv;
+  
+  // 特殊标记，标明此div可编辑图片
+  if (!targetDiv.classList.contains('div-hover-highlight')) {
+    touchClass('image', targetDiv, 'div-hover-highlight');
+    touchStyle('image', targetDiv, 'cursor', 'pointer');
+  }
+  
+  // 显示高亮
+  highlightHoverElement(v.hoverElement);
+}
+
+// 图片编辑模式的实现
+registerEditorMode('image', {
+  enable: function() {
+    editorLog.debug('[DEBUG] 正在启用图片编辑模式...');
+
+    // 背景图的检测结果在模式启用期间缓存
+    startBackgroundTracking();
+
+    // 使所有图片元素可编辑
+    makeImagesEditable();
+
+    // 图片、背景、轮播图、图片容器的点击和图片链接的跳转由一个委托的监听处理
+    addEditorListener('image', document, 'click', handleImageEditClick, true);
+
+    editorLog.debug('[DEBUG] 图片编辑模式已启用，可以点击div或图片');
+  },
+  disable: function() {
+    // 使用增强的清理函数
+    completelyRemoveImageEditability();
+    resetBackgroundDetector();
+
+    // 隐藏高亮
+    hideHoverHighlight();
+  },
+  hover: handleImageEditHover,
+  scan: makeImagesEditable,
+  restore: function() {
+    const v = window.editorVars;
+    v.editedImages = JSON.parse(localStorage.getItem(editorStorageKey('editedImages')) || '{}');
+    v.editedBackgroundImages = JSON.parse(localStorage.getItem(editorStorageKey('editedBackgroundImages')) || '{}');
+    v.editedCarouselImages = JSON.parse(localStorage.getItem(editorStorageKey('editedCarouselImages')) || '{}');
+    return applyImageEdits();
+  },
+  exportEdits: exportImageEdits
+});
+"""
+
+# 各模块的 (样式, 元素, 启动脚本, 按需加载的脚本块)
+MODULES = {
+    'core': (CORE_STYLES, '', CORE_SCRIPTS, ''),
+    'inspect': (INSPECT_STYLES, INSPECT_ELEMENTS, INSPECT_MODE, INSPECT_SCRIPTS),
+    'region': (REGION_STYLES, REGION_ELEMENTS, REGION_MODE, REGION_SCRIPTS),
+    'text': (TEXT_STYLES, '', TEXT_MODE, TEXT_SCRIPTS),
+    'image': (IMAGE_STYLES, IMAGE_ELEMENTS, IMAGE_MODE, IMAGE_SCRIPTS),
+}
+
+# 脚本块的类型：浏览器不会解析和执行未知类型的脚本，由启动脚本在模式首次启用时执行
+CHUNK_TYPE = 'text/x-editor-chunk'
+
+# 已组装的载荷 {功能组合: (样式, 元素, 脚本)}
+_PAYLOADS = {}
+
+
+# 脚本块的指纹：内容的sha1前12位
+def chunk_fingerprint(name):
+    import hashlib
+    return hashlib.sha1(MODULES[name][3].encode('utf-8')).hexdigest()[:12]
+
+
+# 一个模式的脚本块
+def chunk_tag(name):
+    return (f'<script type="{CHUNK_TYPE}" id="editor-chunk-{name}" data-editor-chunk="{chunk_fingerprint(name)}">'
+            + MODULES[name][3] + '</script>\n')
+
+
+# 用所选功能的模块组装载荷 (样式, 元素, 脚本)，每种组合只组装一次
+# 脚本由启动脚本和各模式的脚本块组成；不认识的功能名称会被忽略，由调用方负责检查
+def build_payload(features=FEATURES):
+    key = tuple(name for name in FEATURES if name in features)
+    if key not in _PAYLOADS:
+        modules = [MODULES['core']] + [MODULES[name] for name in key]
+        styles = '\n<style id="editor-styles">' + ''.join(m[0] for m in modules) + '</style>\n'
+        elements = ''.join(m[1] for m in modules)
+        scripts = ('\n<script id="editor-script">' + ''.join(m[2] for m in modules) + '</script>\n'
+                   + ''.join(chunk_tag(name) for name in key))
+        _PAYLOADS[key] = (styles, elements, scripts)
+    return _PAYLOADS[key]
+
+# 包含全部功能的载荷
+EDITOR_STYLES, EDITOR_ELEMENTS, EDITOR_SCRIPTS = build_payload()
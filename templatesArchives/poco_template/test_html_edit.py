@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+test_html_edit.py - html_edit.py 的测试
+
+覆盖流式注入的分块边界、管道输入输出、非UTF-8页面的往返、同一版本重复注入、功能切换、str 形式的页面、页面标识，以及移除编辑器和写回编辑结果。
+
+用法:
+    python -m pytest -q test_html_edit.py
+"""
+
+import io
+import os
+import re
+import sys
+import subprocess
+
+import pytest
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+import html_edit
+
+TEXT = '你好，世界'
+# 填充内容，使 </head>、</body> 和编辑器块都落在识别编码时读取的开头部分之后，由分块扫描处理
+FILLER = '<p>' + 'x' * html_edit.SNIFF_BYTES + '</p>\n'
+# 流式注入测试的分块大小：逐字节到若干字节，以及HOLD、识别编码读取长度附近的值
+CHUNK_SIZES = list(range(1, 33)) + [63, 64, 65, 511, 512, 513, 4095, 4096, 4097, 1 << 16]
+
+
+# 测试页面，charset 为 <meta charset> 中声明的编码
+def make_page(charset='utf-8'):
+    return ('<!DOCTYPE html>\n<html>\n<head>\n'
+            f'<meta charset="{charset}">\n<title>{TEXT}</title>\n<meta name="filler" content="{"x" * 64}">\n'
+            '</head>\n<body>\n'
+            f'<p>{TEXT}</p>\n{FILLER}'
+            '</body>\n</html>\n')
+
+
+# 按编码生成页面的字节：(页面, 解码用的编解码器, <meta>中应声明的编码)
+# UTF-16 页面带字节序标记，声明中只写 utf-16
+def encoded_page(charset):
+    if charset in ('utf-16-le', 'utf-16-be'):
+        bom = b'\xff\xfe' if charset == 'utf-16-le' else b'\xfe\xff'
+        return bom + make_page('utf-16').encode(charset), charset, 'utf-16'
+    return make_page(charset).encode(charset), charset, charset
+
+
+# 流式注入，返回输出的bytes
+def stream(data, chunk_size=1 << 16, features=None, input_path=None):
+    writer = html_edit.BytesWriter()
+    html_edit.run_stream(io.BytesIO(data), writer, chunk_size, features, input_path)
+    return writer.getvalue()
+
+
+# 去掉标签之间的空白：移除编辑器时页面原有的换行可能随注入时加入的换行一起去掉（见 strip_editor()）
+def squeeze(text):
+    return re.sub(r'>\s+<', '><', text)
+
+
+# 注入到不再变化为止：文档树方式首次注入后重新解析时空白会有变化，再注入一次后输出固定
+def settled(mode, data, features=None):
+    instrumenter = html_edit.Instrumenter(mode=mode, features=features)
+    return instrumenter.instrument(instrumenter.instrument(data))
+
+
+# 输出中启动脚本标签上的页面标识
+def written_identity(text):
+    return re.search(r'data-editor-page="([^"]*)"', text).group(1)
+
+
+@pytest.mark.parametrize('kind', ['plain', 'gbk', 'instrumented'])
+def test_stream_output_does_not_depend_on_chunk_size(kind):
+    if kind == 'instrumented':
+        # 页面中已有编辑器块，分块边界会落在旧块和注释的中间
+        data = stream(make_page().encode('utf-8'))
+    else:
+        data = encoded_page('gbk' if kind == 'gbk' else 'utf-8')[0]
+    expected = stream(data)
+    for chunk_size in CHUNK_SIZES:
+        assert stream(data, chunk_size) == expected, chunk_size
+
+
+@pytest.mark.parametrize('charset', ['gbk', 'big5', 'utf-16-le', 'utf-16-be'])
+@pytest.mark.parametrize('mode', html_edit.INJECT_MODES)
+def test_charset_round_trip(charset, mode):
+    data, codec, declared = encoded_page(charset)
+    output = html_edit.Instrumenter(mode=mode).instrument(data)
+
+    if codec.startswith('utf-16'):
+        assert output[:2] == data[:2]
+    text = output.decode(codec)
+    assert text.count(TEXT) == 2
+    assert f'<meta charset="{declared}"' in text
+    assert 'id="editor-script"' in text
+
+    # 移除编辑器后与直接解析、序列化原页面的结果相同
+    stripped = html_edit.Instrumenter().strip(output).decode(codec)
+    assert squeeze(stripped) == squeeze(html_edit.Instrumenter().strip(data).decode(codec))
+    assert '<!--' not in stripped
+
+
+@pytest.mark.parametrize('args', [[], ['--mode', 'tree'], ['--features', 'text']])
+def test_pipe_matches_in_process(args):
+    data = encoded_page('gbk')[0]
+    proc = subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, 'html_edit.py'), '-', '-'] + args,
+                          input=data, capture_output=True, check=True)
+    # 使用管道时默认为流式注入
+    mode = args[1] if args[:1] == ['--mode'] else 'stream'
+    features = args[1] if args[:1] == ['--features'] else None
+    assert proc.stdout == html_edit.Instrumenter(mode=mode, features=features).instrument(data)
+    assert proc.stderr == b''
+
+
+@pytest.mark.parametrize('failing, message', [
+    ('parse_document', '解析页面时出错'),
+    ('inject_editor', '注入编辑器时出错'),
+    ('stream_html', '写入文件时出错'),
+])
+def test_tree_errors_name_the_failing_step(tmp_path, monkeypatch, capsys, failing, message):
+    source = tmp_path / 'index.html'
+    source.write_bytes(make_page().encode('utf-8'))
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('boom')
+    monkeypatch.setattr(html_edit, failing, fail)
+    monkeypatch.setattr(sys, 'argv', ['html_edit.py', str(source), str(tmp_path / 'out.html')])
+    with pytest.raises(SystemExit) as exc:
+        html_edit.main()
+    assert exc.value.code == 1
+    assert capsys.readouterr().out.strip() == f"{message}: boom"
+    assert not (tmp_path / 'out.html').exists()
+
+
+@pytest.mark.parametrize('mode', html_edit.INJECT_MODES)
+def test_str_source_is_utf8(mode):
+    # str 已经解码，页面中声明的编码不再适用，页面和载荷都按UTF-8输出
+    output = html_edit.instrument(make_page('gbk'), mode=mode)
+    text = output.decode('utf-8')
+    assert text.count(TEXT) == 2
+    assert '<meta charset="utf-8"' in text
+    assert '上传新图片' in text
+    assert html_edit.instrument(text, mode=mode) == html_edit.instrument(output, mode=mode)
+
+
+@pytest.mark.parametrize('charset', ['utf-8', 'gbk', 'big5'])
+@pytest.mark.parametrize('input_path', [None, 'poco_template/index.html'])
+def test_stream_reinject_is_identical(charset, input_path):
+    data = encoded_page(charset)[0]
+    output = stream(data, input_path=input_path)
+    for chunk_size in (1, 7, 512, 1 << 16):
+        assert stream(output, chunk_size, input_path=input_path) == output, chunk_size
+    # 页面中已有的标识优先于输入路径
+    assert stream(output, input_path='other/page.html') == output
+
+
+@pytest.mark.parametrize('charset', ['utf-8', 'gbk'])
+def test_tree_reinject_is_identical(charset):
+    data = encoded_page(charset)[0]
+    output = settled('tree', data)
+    assert html_edit.Instrumenter().instrument(output) == output
+    assert output.count(b'id="editor-script"') == 1
+
+
+@pytest.mark.parametrize('charset', ['utf-8', 'gbk', 'utf-16-le'])
+def test_page_identity_same_in_both_modes(charset):
+    data, codec, _ = encoded_page(charset)
+    for input_path in (None, 'a/public/index.html'):
+        identities = {written_identity(html_edit.instrument(data, mode=mode, input_path=input_path).decode(codec))
+                      for mode in html_edit.INJECT_MODES}
+        assert len(identities) == 1, identities
+
+
+def test_page_identity_separates_paths_and_contents():
+    data = make_page().encode('utf-8')
+    other = data.replace(TEXT.encode('utf-8'), b'other', 1)
+    identities = {
+        html_edit.page_identity(data, 'a/public/index.html'),
+        html_edit.page_identity(data, 'b/public/index.html'),
+        html_edit.page_identity(data, 'dist/index.html'),
+        html_edit.page_identity(other, 'a/public/index.html'),
+        html_edit.page_identity(data),
+    }
+    assert len(identities) == 5
+    assert all('public' not in identity for identity in identities)
+
+
+@pytest.mark.parametrize('mode', html_edit.INJECT_MODES)
+def test_feature_switch_all_text_all(mode):
+    data = make_page().encode('utf-8')
+    full = settled(mode, data)
+    text_only = settled(mode, full, 'text')
+    assert text_only == settled(mode, data, 'text')
+    assert b'id="elementInspector"' not in text_only
+    assert settled(mode, text_only) == full
+    if mode == 'stream':
+        instrumenter = html_edit.Instrumenter(mode=mode)
+        assert instrumenter.instrument(html_edit.Instrumenter(mode=mode, features='text').instrument(full)) == full
+
+
+# 写回编辑结果用的页面：图片和背景都用相对地址
+APPLY_PAGE = ('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+              '<style>.hero { background: url("img/hero.jpg") }</style>\n</head>\n<body>\n'
+              '<div><p>old</p><p>keep</p></div>\n'
+              '<img src="./img/a.png"><img src="img/b.png">\n'
+              '<div style="background-image: url(img/bg.jpg)"></div>\n'
+              '</body>\n</html>\n')
+
+
+@pytest.mark.parametrize('mode', html_edit.INJECT_MODES)
+def test_strip_removes_every_editor_block(mode):
+    data = make_page().encode('utf-8')
+    output = html_edit.Instrumenter(mode=mode).instrument(data)
+    soup, _ = html_edit.parse_document(output)
+    assert html_edit.strip_editor(soup) == len(html_edit.EDITOR_BLOCK_IDS)
+    text = str(soup)
+    assert all(f'id="{block_id}"' not in text for block_id in html_edit.EDITOR_BLOCK_IDS)
+    assert all(comment not in text for comment in html_edit.EDITOR_COMMENTS)
+    assert squeeze(text) == squeeze(html_edit.Instrumenter().strip(data).decode('utf-8'))
+    # 没有编辑器的页面不受影响
+    assert html_edit.strip_editor(soup) == 0
+
+
+def test_apply_edits_writes_texts_images_and_backgrounds():
+    soup, _ = html_edit.parse_document(APPLY_PAGE)
+    edits = {
+        # 编辑器记录的元素路径和浏览器解析后的绝对地址
+        'editedTexts': {'body:nth-of-type(1) > div:nth-of-type(1) > p:nth-of-type(1)': '<b>new</b> text',
+                        'body > section': 'missing'},
+        'editedImages': {'http://example.com/site/img/a.png': 'data:image/png;base64,AAAA'},
+        'editedCarouselImages': {'http://example.com/site/img/b.png': 'data:image/png;base64,BBBB'},
+        'editedBackgroundImages': {'http://example.com/site/img/bg.jpg': 'data:image/jpeg;base64,CCCC',
+                                   'http://example.com/site/img/hero.jpg': 'data:image/jpeg;base64,DDDD'},
+    }
+    assert html_edit.apply_edits(soup, edits) == {'texts': 1, 'images': 2, 'backgrounds': 2}
+    text = str(soup)
+    assert '<p><b>new</b> text</p><p>keep</p>' in text
+    assert '<img src="data:image/png;base64,AAAA"/><img src="data:image/png;base64,BBBB"/>' in text
+    assert "url('data:image/jpeg;base64,CCCC')" in text
+    assert "url('data:image/jpeg;base64,DDDD')" in text
+
+
+def test_apply_skips_indexeddb_references(capsys):
+    soup, _ = html_edit.parse_document(APPLY_PAGE)
+    edits = {'editedImages': {'http://example.com/site/img/a.png': html_edit.BLOB_REFERENCE_PREFIX + 'abc'}}
+    assert html_edit.apply_edits(soup, edits)['images'] == 0
+    assert 'src="./img/a.png"' in str(soup)
+    assert 'exportEditorEdits' in capsys.readouterr().err
+
+
+def test_apply_and_strip_keep_the_page_charset():
+    data = APPLY_PAGE.replace('utf-8', 'gbk').replace('old', TEXT).encode('gbk')
+    edits = {'editedTexts': {'body:nth-of-type(1) > div:nth-of-type(1) > p:nth-of-type(2)': '世界'}}
+    output = html_edit.Instrumenter().apply(html_edit.instrument(data), edits)
+    text = output.decode('gbk')
+    assert f'<p>{TEXT}</p><p>世界</p>' in text
+    assert 'id="editor-script"' not in text
+    kept = html_edit.Instrumenter().apply(html_edit.instrument(data), edits, strip=False)
+    assert b'id="editor-script"' in kept
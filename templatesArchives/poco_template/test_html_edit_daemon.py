@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+test_html_edit_daemon.py - html_edit_daemon.py 的测试
+
+覆盖消息帧协议、工作进程中的任务执行，以及启动服务后通过客户端发送任务。
+
+用法:
+    python -m pytest -q test_html_edit_daemon.py
+"""
+
+import os
+import sys
+import json
+import socket
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import html_edit
+import html_edit_daemon as daemon
+
+PAGE = ('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>测试</title>\n</head>\n<body>\n'
+        '<div><p>old</p></div>\n</body>\n</html>\n').encode('utf-8')
+TEXT_PATH = 'body:nth-of-type(1) > div:nth-of-type(1) > p:nth-of-type(1)'
+
+
+@pytest.fixture
+def pair():
+    left, right = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    yield left, right
+    left.close()
+    right.close()
+
+
+def test_messages_round_trip(pair):
+    left, right = pair
+    daemon.send_message(left, {'job': 'instrument', 'input': None}, PAGE)
+    daemon.send_message(left, {'job': 'ping', '说明': '中文'})
+    assert daemon.recv_message(right) == ({'job': 'instrument', 'input': None}, PAGE)
+    assert daemon.recv_message(right) == ({'job': 'ping', '说明': '中文'}, b'')
+    # 在消息之间关闭连接表示没有更多请求
+    left.close()
+    assert daemon.recv_message(right) is None
+
+
+def test_frame_has_big_endian_length(pair):
+    left, right = pair
+    daemon.send_frame(left, b'abc')
+    assert right.recv(7) == b'\x00\x00\x00\x03abc'
+
+
+def test_connection_closed_mid_message(pair):
+    left, right = pair
+    left.sendall(daemon.FRAME_HEADER.pack(10) + b'abc')
+    left.close()
+    with pytest.raises(ConnectionError):
+        daemon.recv_frame(right)
+
+
+def test_header_without_body_frame(pair):
+    left, right = pair
+    daemon.send_frame(left, b'{}')
+    left.close()
+    with pytest.raises(ConnectionError):
+        daemon.recv_message(right)
+
+
+def test_oversized_frame_is_rejected(pair):
+    left, right = pair
+    left.sendall(daemon.FRAME_HEADER.pack(daemon.MAX_FRAME + 1))
+    with pytest.raises(ValueError):
+        daemon.recv_frame(right)
+
+
+@pytest.mark.parametrize('mode', html_edit.INJECT_MODES)
+def test_run_job_instrument(mode):
+    response, output = daemon.run_job({'job': 'instrument', 'mode': mode}, PAGE)
+    assert response['ok'] and response['bytes'] == len(output)
+    assert output == html_edit.instrument(PAGE, mode=mode)
+
+
+def test_run_job_files_apply_and_strip(tmp_path):
+    source = tmp_path / 'index.html'
+    source.write_bytes(PAGE)
+    instrumented = tmp_path / 'index-editable.html'
+    response, output = daemon.run_job({'job': 'instrument', 'input': str(source), 'output': str(instrumented)}, b'')
+    assert output == b'' and response['output'] == str(instrumented)
+    assert instrumented.read_bytes() == html_edit.instrument(PAGE, input_path=str(source))
+
+    edits = tmp_path / 'edits.json'
+    edits.write_text(json.dumps({'editedTexts': {TEXT_PATH: 'new'}}), encoding='utf-8')
+    _, output = daemon.run_job({'job': 'apply', 'input': str(instrumented), 'edits_path': str(edits)}, b'')
+    assert b'<p>new</p>' in output and b'editor-script' not in output
+
+    _, output = daemon.run_job({'job': 'apply', 'edits': {'editedTexts': {TEXT_PATH: 'inline'}}, 'strip': False},
+                               instrumented.read_bytes())
+    assert b'<p>inline</p>' in output and b'editor-script' in output
+
+    _, output = daemon.run_job({'job': 'strip'}, instrumented.read_bytes())
+    assert output == html_edit.Instrumenter().strip(instrumented.read_bytes())
+
+
+def test_client_rejects_unknown_mode(capsys):
+    assert daemon.INJECT_MODES == html_edit.INJECT_MODES
+    with pytest.raises(SystemExit):
+        daemon.build_parser().parse_args(['instrument', 'index.html', '--mode', 'steam'])
+    assert "invalid choice: 'steam'" in capsys.readouterr().err
+
+
+def test_run_job_rejects_unknown_job():
+    with pytest.raises(ValueError):
+        daemon.run_job({'job': 'compress'}, PAGE)
+
+
+def test_server_runs_jobs(tmp_path):
+    socket_path = str(tmp_path / 'html_edit.sock')
+    pool, _ = daemon.start_pool(1)
+    server = daemon.DaemonServer(socket_path, pool, 1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        # 套接字只有当前用户可以连接
+        assert os.stat(socket_path).st_mode & 0o077 == 0
+        with daemon.Client(socket_path) as client:
+            assert client.request({'job': 'ping'}) == ({'ok': True, 'workers': 1}, b'')
+            # 同一个连接上连续发送多条请求
+            for mode in html_edit.INJECT_MODES:
+                response, output = client.request({'job': 'instrument', 'input': None, 'output': None,
+                                                   'mode': mode}, PAGE)
+                assert response['ok'] and output == html_edit.instrument(PAGE, mode=mode)
+            response, _ = client.request({'job': 'compress'})
+            assert response == {'ok': False, 'error': '未知的任务: compress'}
+            response, _ = client.request({'job': 'instrument', 'input': str(tmp_path / 'missing.html')})
+            assert not response['ok'] and 'FileNotFoundError' in response['error']
+            assert client.request({'job': 'stop'}) == ({'ok': True}, b'')
+        thread.join(5)
+        assert not thread.is_alive()
+    finally:
+        server.shutdown()
+        server.server_close()
+        pool.shutdown()
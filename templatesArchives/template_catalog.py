@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+template_catalog.py - 模板目录索引工具
+
+扫描 templatesArchives/ 下的每个模板目录，一次性记录：
+1. 入口HTML文件
+2. 各类资源（CSS/JS/图片/字体）的数量和字节数，以及页面总重量
+3. 图片数量、轮播图候选和背景图候选
+4. 编辑器载荷状态（未处理 / 已注入编辑器 / 已生成 -editable 副本）
+
+结果保存在本地SQLite目录库中。再次扫描时先比较文件大小和mtime，
+变化的文件再比较内容哈希，只有内容真正改变的模板才会被重新解析。
+
+用法:
+    python template_catalog.py scan [--force]
+    python template_catalog.py list [--carousel] [--background] [--payload STATUS] [--min-bytes N] [--json]
+    python template_catalog.py show <template_name>
+    python template_catalog.py stats
+
+通用参数 --root 指定模板根目录，--db 指定目录库文件（默认为本目录下的 catalog.sqlite3）
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, unquote
+
+# 默认路径
+ARCHIVE_ROOT = os.path.dirname(os.path.abspath(__file__))
+CATALOG_PATH = os.path.join(ARCHIVE_ROOT, 'catalog.sqlite3')
+
+# 遍历时跳过的目录
+SKIP_DIRS = {'.git', 'node_modules', '__pycache__', '.venv', 'venv'}
+
+# 资源分类
+ASSET_KINDS = {
+    'css': {'.css'},
+    'js': {'.js', '.mjs'},
+    'image': {'.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.avif', '.ico', '.bmp'},
+    'font': {'.woff', '.woff2', '.ttf', '.otf', '.eot'},
+    'html': {'.html', '.htm'},
+}
+
+# 编辑器注入后留下的标记（与 html_edit_payload.py 中的载荷保持一致）
+EDITOR_MARKERS = ('id="editor-script"', 'id="editor-styles"')
+
+# 与编辑器运行时一致的轮播图候选规则
+CAROUSEL_CLASSES = {'carousel', 'swiper', 'slider'}
+CAROUSEL_KEYWORDS = ('carousel', 'slider')
+
+# HTML中没有结束标签的元素
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr',
+}
+
+# 背景图相关正则
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+CSS_RULE_RE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+BACKGROUND_DECL_RE = re.compile(r'background(?:-image)?\s*:([^;]*)', re.I)
+CSS_URL_RE = re.compile(r'url\(\s*[\'"]?([^\'")]+?)[\'"]?\s*\)', re.I)
+
+# 记录详情时截断的最大长度/条数
+MAX_DETAIL_URL = 120
+MAX_DETAIL_ITEMS = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS templates (
+  name TEXT PRIMARY KEY,
+  path TEXT NOT NULL,
+  entry_html TEXT,
+  file_count INTEGER NOT NULL DEFAULT 0,
+  total_bytes INTEGER NOT NULL DEFAULT 0,
+  css_count INTEGER NOT NULL DEFAULT 0,
+  css_bytes INTEGER NOT NULL DEFAULT 0,
+  js_count INTEGER NOT NULL DEFAULT 0,
+  js_bytes INTEGER NOT NULL DEFAULT 0,
+  image_count INTEGER NOT NULL DEFAULT 0,
+  image_bytes INTEGER NOT NULL DEFAULT 0,
+  font_count INTEGER NOT NULL DEFAULT 0,
+  font_bytes INTEGER NOT NULL DEFAULT 0,
+  page_bytes INTEGER NOT NULL DEFAULT 0,
+  img_tags INTEGER NOT NULL DEFAULT 0,
+  carousel_count INTEGER NOT NULL DEFAULT 0,
+  background_count INTEGER NOT NULL DEFAULT 0,
+  carousels TEXT NOT NULL DEFAULT '[]',
+  backgrounds TEXT NOT NULL DEFAULT '[]',
+  editor_payload TEXT NOT NULL DEFAULT 'none',
+  editable_html TEXT,
+  fingerprint TEXT NOT NULL,
+  scanned_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+  template TEXT NOT NULL,
+  relpath TEXT NOT NULL,
+  size INTEGER NOT NULL,
+  mtime_ns INTEGER NOT NULL,
+  sha1 TEXT NOT NULL,
+  PRIMARY KEY (template, relpath)
+);
+CREATE INDEX IF NOT EXISTS idx_templates_carousel ON templates(carousel_count);
+CREATE INDEX IF NOT EXISTS idx_templates_background ON templates(background_count);
+CREATE INDEX IF NOT EXISTS idx_templates_payload ON templates(editor_payload);
+CREATE INDEX IF NOT EXISTS idx_templates_page_bytes ON templates(page_bytes);
+"""
+
+
+# 打开（必要时创建）目录库
+def open_catalog(db_path=CATALOG_PATH):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# 计算文件内容哈希
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# 获取文件的资源分类
+def asset_kind(path):
+    ext = os.path.splitext(path)[1].lower()
+    for kind, exts in ASSET_KINDS.items():
+        if ext in exts:
+            return kind
+    return 'other'
+
+
+# 判断引用是否指向模板内的本地文件
+def is_local_ref(ref):
+    if not ref:
+        return False
+    ref = ref.strip()
+    if ref.startswith(('#', '//', 'data:', 'javascript:', 'mailto:')):
+        return False
+    return not urlsplit(ref).scheme
+
+
+# 把引用解析为模板内的相对路径（找不到时返回None）
+def resolve_ref(template_dir, base_dir, ref):
+    path = unquote(urlsplit(ref.strip()).path)
+    if not path:
+        return None
+    if path.startswith('/'):
+        full = os.path.join(template_dir, path.lstrip('/'))
+    else:
+        full = os.path.join(base_dir, path)
+    full = os.path.normpath(full)
+    if not full.startswith(template_dir + os.sep) or not os.path.isfile(full):
+        return None
+    return os.path.relpath(full, template_dir)
+
+
+# 远程引用按文件名匹配模板中归档的本地副本（文件名唯一时才匹配）
+def resolve_archived_copy(names, ref):
+    ref = ref.strip()
+    if not ref.startswith(('http://', 'https://', '//')):
+        return None
+    basename = os.path.basename(unquote(urlsplit(ref).path))
+    matches = names.get(basename, [])
+    return matches[0] if len(matches) == 1 else None
+
+
+# 提取背景声明中的非渐变图片URL
+def background_urls(value):
+    urls = [u for u in CSS_URL_RE.findall(value)]
+    if not urls and 'gradient' in value:
+        return []
+    return urls
+
+
+# 截断详情中的URL，避免data URL撑大目录库
+def short_url(url):
+    return url if len(url) <= MAX_DETAIL_URL else url[:MAX_DETAIL_URL] + '...'
+
+
+# 扫描CSS文本中的背景图规则
+def scan_css(css_text):
+    rules = []
+    refs = []
+    css_text = CSS_COMMENT_RE.sub('', css_text)
+    for selector, body in CSS_RULE_RE.findall(css_text):
+        for decl in BACKGROUND_DECL_RE.findall(body):
+            urls = background_urls(decl)
+            if urls:
+                rules.append({'selector': ' '.join(selector.split())[-MAX_DETAIL_URL:], 'url': short_url(urls[0])})
+                refs.extend(urls)
+    return rules, refs
+
+
+# 入口HTML解析器：统计图片、轮播图和背景图候选以及本地资源引用
+class PageScanner(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.img_tags = 0
+        self.carousels = []
+        self.backgrounds = []
+        self.refs = []
+        self.stylesheets = []
+        self.inline_css = []
+        self._in_style = False
+
+    # 判断元素是否为轮播图候选
+    @staticmethod
+    def _is_carousel(attrs):
+        classes = (attrs.get('class') or '').split()
+        elem_id = attrs.get('id') or ''
+        if CAROUSEL_CLASSES.intersection(classes):
+            return True
+        class_attr = attrs.get('class') or ''
+        return any(k in elem_id or k in class_attr for k in CAROUSEL_KEYWORDS)
+
+    # 生成便于阅读的元素描述
+    @staticmethod
+    def _describe(tag, attrs):
+        desc = tag
+        if attrs.get('id'):
+            desc += '#' + attrs['id']
+        classes = (attrs.get('class') or '').split()
+        if classes:
+            desc += '.' + '.'.join(classes)
+        return desc
+
+    def handle_starttag(self, tag, attr_list):
+        attrs = {k: (v or '') for k, v in attr_list}
+
+        if tag == 'img':
+            self.img_tags += 1
+            self.refs.append(attrs.get('src', ''))
+            # 统计所有未关闭的轮播图候选中的图片
+            for _, info in self.stack:
+                if info is not None:
+                    info['images'] += 1
+        elif tag == 'link' and 'stylesheet' in attrs.get('rel', '').lower():
+            self.stylesheets.append(attrs.get('href', ''))
+        elif tag == 'script' and attrs.get('src'):
+            self.refs.append(attrs['src'])
+        elif tag == 'style':
+            self._in_style = True
+
+        # 内联样式中的背景图
+        style = attrs.get('style', '')
+        if 'background' in style:
+            for decl in BACKGROUND_DECL_RE.findall(style):
+                urls = background_urls(decl)
+                if urls:
+                    self.backgrounds.append({'selector': self._describe(tag, attrs), 'url': short_url(urls[0])})
+                    self.refs.extend(urls)
+
+        if tag in VOID_TAGS:
+            return
+
+        info = None
+        if self._is_carousel(attrs):
+            info = {'selector': self._describe(tag, attrs), 'images': 0}
+        self.stack.append((tag, info))
+
+    def handle_startendtag(self, tag, attr_list):
+        self.handle_starttag(tag, attr_list)
+        if tag not in VOID_TAGS and self.stack and self.stack[-1][0] == tag:
+            self._close(len(self.stack) - 1)
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self._in_style = False
+        # 容错：找到最近的同名元素再关闭，忽略多余的结束标签
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                self._close(i)
+                return
+
+    def handle_data(self, data):
+        if self._in_style:
+            self.inline_css.append(data)
+
+    def close(self):
+        super().close()
+        if self.stack:
+            self._close(0)
+
+    # 关闭stack[index]及其之后的元素，并登记轮播图候选
+    def _close(self, index):
+        for _, info in self.stack[index:]:
+            if info is not None and info['images'] > 1:
+                self.carousels.append(info)
+        del self.stack[index:]
+
+
+# 选择模板的入口HTML
+def find_entry_html(relpaths):
+    pages = [p for p in relpaths if asset_kind(p) == 'html' and '-editable.' not in os.path.basename(p)]
+    if not pages:
+        return None
+    for p in pages:
+        if p.lower() in ('index.html', 'index.htm'):
+            return p
+    return min(pages, key=lambda p: (p.count(os.sep), p != 'index.html', p))
+
+
+# 收集模板目录中的文件，并复用未变化文件的哈希
+def collect_files(conn, name, template_dir, force=False):
+    known = {}
+    if not force:
+        for row in conn.execute('SELECT relpath, size, mtime_ns, sha1 FROM files WHERE template = ?', (name,)):
+            known[row['relpath']] = (row['size'], row['mtime_ns'], row['sha1'])
+
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(template_dir):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        for filename in sorted(filenames):
+            full = os.path.join(dirpath, filename)
+            if os.path.abspath(full) == os.path.abspath(CATALOG_PATH):
+                continue
+            st = os.stat(full)
+            relpath = os.path.relpath(full, template_dir)
+            old = known.get(relpath)
+            if old and old[0] == st.st_size and old[1] == st.st_mtime_ns:
+                sha1 = old[2]
+            else:
+                sha1 = file_sha1(full)
+            files[relpath] = (st.st_size, st.st_mtime_ns, sha1)
+    return files
+
+
+# 计算模板指纹
+def template_fingerprint(files):
+    h = hashlib.sha1()
+    for relpath in sorted(files):
+        h.update(relpath.encode('utf-8'))
+        h.update(b'\0')
+        h.update(files[relpath][2].encode('ascii'))
+        h.update(b'\n')
+    return h.hexdigest()
+
+
+# 读取文本文件（容忍编码错误）
+def read_text(path):
+    with open(path, 'rb') as f:
+        return f.read().decode('utf-8', errors='replace')
+
+
+# 解析模板，生成目录记录
+def analyze_template(name, template_dir, files):
+    record = {
+        'name': name,
+        'path': template_dir,
+        'entry_html': None,
+        'file_count': len(files),
+        'total_bytes': sum(size for size, _, _ in files.values()),
+        'page_bytes': 0,
+        'img_tags': 0,
+        'carousels': [],
+        'backgrounds': [],
+        'editor_payload': 'none',
+        'editable_html': None,
+    }
+    for kind in ('css', 'js', 'image', 'font'):
+        sizes = [size for relpath, (size, _, _) in files.items() if asset_kind(relpath) == kind]
+        record[kind + '_count'] = len(sizes)
+        record[kind + '_bytes'] = sum(sizes)
+
+    entry = find_entry_html(files)
+    record['entry_html'] = entry
+    if entry is None:
+        return record
+
+    entry_path = os.path.join(template_dir, entry)
+    entry_dir = os.path.dirname(entry_path)
+    html = read_text(entry_path)
+
+    scanner = PageScanner()
+    scanner.feed(html)
+    scanner.close()
+
+    # 编辑器载荷状态
+    base_name, ext = os.path.splitext(entry)
+    editable = base_name + '-editable' + ext
+    if any(marker in html for marker in EDITOR_MARKERS):
+        record['editor_payload'] = 'instrumented'
+    elif editable in files:
+        record['editor_payload'] = 'editable-copy'
+        record['editable_html'] = editable
+
+    # 页面引用的本地资源（入口HTML + CSS + JS + 图片 + CSS中的url）
+    names = {}
+    for relpath in files:
+        names.setdefault(os.path.basename(relpath), []).append(relpath)
+
+    def resolve(base_dir, ref):
+        if is_local_ref(ref):
+            return resolve_ref(template_dir, base_dir, ref)
+        return resolve_archived_copy(names, ref)
+
+    page_files = {entry}
+    backgrounds = list(scanner.backgrounds)
+    for ref in scanner.refs:
+        resolved = resolve(entry_dir, ref)
+        if resolved:
+            page_files.add(resolved)
+
+    css_sources = [(css, entry_dir) for css in scanner.inline_css]
+    for href in scanner.stylesheets:
+        resolved = resolve(entry_dir, href)
+        if resolved:
+            page_files.add(resolved)
+            css_path = os.path.join(template_dir, resolved)
+            css_sources.append((read_text(css_path), os.path.dirname(css_path)))
+
+    for css_text, css_dir in css_sources:
+        rules, refs = scan_css(css_text)
+        backgrounds.extend(rules)
+        for ref in refs:
+            resolved = resolve(css_dir, ref)
+            if resolved:
+                page_files.add(resolved)
+
+    record['page_bytes'] = sum(files[p][0] for p in page_files if p in files)
+    record['img_tags'] = scanner.img_tags
+    record['carousels'] = scanner.carousels[:MAX_DETAIL_ITEMS]
+    record['backgrounds'] = backgrounds[:MAX_DETAIL_ITEMS]
+    record['carousel_count'] = len(scanner.carousels)
+    record['background_count'] = len(backgrounds)
+    return record
+
+
+# 写入模板记录
+def save_template(conn, record, files, fingerprint):
+    row = dict(record)
+    row['carousel_count'] = row.get('carousel_count', len(row['carousels']))
+    row['background_count'] = row.get('background_count', len(row['backgrounds']))
+    row['carousels'] = json.dumps(row['carousels'], ensure_ascii=False)
+    row['backgrounds'] = json.dumps(row['backgrounds'], ensure_ascii=False)
+    row['fingerprint'] = fingerprint
+    row['scanned_at'] = time.time()
+    columns = ', '.join(row)
+    placeholders = ', '.join(':' + key for key in row)
+    conn.execute(f'INSERT OR REPLACE INTO templates ({columns}) VALUES ({placeholders})', row)
+    save_files(conn, record['name'], files)
+
+
+# 写入文件清单
+def save_files(conn, name, files):
+    conn.execute('DELETE FROM files WHERE template = ?', (name,))
+    conn.executemany(
+        'INSERT INTO files (template, relpath, size, mtime_ns, sha1) VALUES (?, ?, ?, ?, ?)',
+        [(name, relpath, size, mtime_ns, sha1) for relpath, (size, mtime_ns, sha1) in files.items()],
+    )
+
+
+# 扫描所有模板，返回 (已更新, 未变化, 已删除) 的模板名列表
+def scan(conn, root=ARCHIVE_ROOT, force=False):
+    updated, unchanged = [], []
+    names = sorted(
+        d for d in os.listdir(root)
+        if os.path.isdir(os.path.join(root, d)) and d not in SKIP_DIRS and not d.startswith('.')
+    )
+
+    with conn:
+        for name in names:
+            template_dir = os.path.abspath(os.path.join(root, name))
+            files = collect_files(conn, name, template_dir, force)
+            fingerprint = template_fingerprint(files)
+            row = conn.execute('SELECT fingerprint FROM templates WHERE name = ?', (name,)).fetchone()
+            if row and row['fingerprint'] == fingerprint and not force:
+                # 内容未变，只刷新mtime等文件信息
+                save_files(conn, name, files)
+                unchanged.append(name)
+                continue
+            save_template(conn, analyze_template(name, template_dir, files), files, fingerprint)
+            updated.append(name)
+
+        # 清理已经不存在的模板
+        removed = [row['name'] for row in conn.execute('SELECT name FROM templates') if row['name'] not in names]
+        for name in removed:
+            conn.execute('DELETE FROM templates WHERE name = ?', (name,))
+            conn.execute('DELETE FROM files WHERE template = ?', (name,))
+
+    return updated, unchanged, removed
+
+
+# 按条件查询模板
+def find_templates(conn, carousel=False, background=False, payload=None, min_bytes=None):
+    clauses, params = [], []
+    if carousel:
+        clauses.append('carousel_count > 0')
+    if background:
+        clauses.append('background_count > 0')
+    if payload:
+        clauses.append('editor_payload = ?')
+        params.append(payload)
+    if min_bytes is not None:
+        clauses.append('page_bytes >= ?')
+        params.append(min_bytes)
+    sql = 'SELECT * FROM templates'
+    if clauses:
+        sql += ' WHERE ' + ' AND '.join(clauses)
+    sql += ' ORDER BY name'
+    return [row_to_dict(row) for row in conn.execute(sql, params)]
+
+
+# 把数据库行转换为字典
+def row_to_dict(row):
+    data = dict(row)
+    data['carousels'] = json.loads(data['carousels'])
+    data['backgrounds'] = json.loads(data['backgrounds'])
+    return data
+
+
+# 格式化字节数
+def format_bytes(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f"{n:.0f}{unit}" if unit == 'B' else f"{n:.1f}{unit}"
+        n /= 1024
+
+
+# 构建命令行参数解析器
+def build_parser():
+    parser = argparse.ArgumentParser(description='模板目录索引工具')
+    parser.add_argument('--root', default=ARCHIVE_ROOT, help='模板根目录')
+    parser.add_argument('--db', default=CATALOG_PATH, help='目录库文件')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    scan_parser = sub.add_parser('scan', help='扫描模板并增量更新目录库')
+    scan_parser.add_argument('--force', action='store_true', help='忽略缓存，重新哈希并解析所有模板')
+
+    list_parser = sub.add_parser('list', help='列出模板')
+    list_parser.add_argument('--carousel', action='store_true', help='只列出包含轮播图的模板')
+    list_parser.add_argument('--background', action='store_true', help='只列出包含背景图的模板')
+    list_parser.add_argument('--payload', choices=('none', 'instrumented', 'editable-copy'), help='按编辑器载荷状态过滤')
+    list_parser.add_argument('--min-bytes', type=int, help='只列出页面重量不小于N字节的模板')
+    list_parser.add_argument('--json', action='store_true', help='以JSON格式输出')
+
+    show_parser = sub.add_parser('show', help='显示单个模板的详细信息')
+    show_parser.add_argument('name')
+
+    sub.add_parser('stats', help='汇总统计')
+    return parser
+
+
+# 主函数
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    conn = open_catalog(args.db)
+
+    if args.command == 'scan':
+        start = time.perf_counter()
+        updated, unchanged, removed = scan(conn, args.root, args.force)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"扫描完成: 更新 {len(updated)} 个, 未变化 {len(unchanged)} 个, 删除 {len(removed)} 个 ({elapsed:.1f} ms)")
+        for name in updated:
+            print(f"  已更新: {name}")
+        return
+
+    start = time.perf_counter()
+    if args.command == 'list':
+        rows = find_templates(conn, args.carousel, args.background, args.payload, args.min_bytes)
+        elapsed = (time.perf_counter() - start) * 1000
+        if args.json:
+            print(json.dumps(rows, ensure_ascii=False, indent=2))
+        else:
+            for row in rows:
+                print(f"{row['name']}\t{row['entry_html'] or '-'}\t{format_bytes(row['page_bytes'])}\t"
+                      f"图片:{row['img_tags']}\t轮播图:{row['carousel_count']}\t"
+                      f"背景图:{row['background_count']}\t载荷:{row['editor_payload']}")
+        print(f"共 {len(rows)} 个模板 ({elapsed:.2f} ms)", file=sys.stderr)
+    elif args.command == 'show':
+        row = conn.execute('SELECT * FROM templates WHERE name = ?', (args.name,)).fetchone()
+        if row is None:
+            print(f"目录库中没有模板: {args.name}")
+            sys.exit(1)
+        print(json.dumps(row_to_dict(row), ensure_ascii=False, indent=2))
+    elif args.command == 'stats':
+        row = conn.execute(
+            'SELECT COUNT(*) AS templates, SUM(total_bytes) AS total_bytes, SUM(page_bytes) AS page_bytes, '
+            'SUM(img_tags) AS img_tags, SUM(carousel_count > 0) AS with_carousel, '
+            'SUM(background_count > 0) AS with_background, '
+            "SUM(editor_payload != 'none') AS with_payload FROM templates"
+        ).fetchone()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"模板数量: {row['templates']}")
+        print(f"文件总大小: {format_bytes(row['total_bytes'] or 0)}")
+        print(f"页面总重量: {format_bytes(row['page_bytes'] or 0)}")
+        print(f"图片标签总数: {row['img_tags'] or 0}")
+        print(f"包含轮播图: {row['with_carousel'] or 0}")
+        print(f"包含背景图: {row['with_background'] or 0}")
+        print(f"带编辑器载荷: {row['with_payload'] or 0}")
+        print(f"查询耗时: {elapsed:.2f} ms", file=sys.stderr)
+
+
+# 运行主函数
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+test_template_catalog.py - template_catalog.py 的测试
+
+在临时目录中生成模板，覆盖首次扫描的统计结果、按条件查询，以及重新扫描时跳过未变化的文件和模板。
+
+用法:
+    python -m pytest -q test_template_catalog.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import template_catalog as catalog
+
+SHOP_PAGE = '''<!DOCTYPE html>
+<html>
+<head>
+<link rel="stylesheet" href="css/main.css">
+<style>.banner { background: url(img/banner.jpg) }</style>
+</head>
+<body>
+<div class="swiper" id="hero"><img src="img/a.png"><img src="img/b.png"></div>
+<div class="slider-single"><img src="img/a.png"></div>
+<section style="background-image: url('img/bg.jpg')"></section>
+<img src="https://cdn.example.com/assets/logo.svg">
+<script src="js/app.js"></script>
+</body>
+</html>
+'''
+SHOP_CSS = '/* .old { background: url(img/old.jpg) } */\n.card { background-image: url(../img/card.jpg) }\n'
+
+
+# 写入模板文件 {相对路径: 内容}
+def write_files(template_dir, files):
+    for relpath, content in files.items():
+        path = os.path.join(template_dir, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content.encode('utf-8') if isinstance(content, str) else content)
+
+
+@pytest.fixture
+def root(tmp_path):
+    write_files(str(tmp_path / 'shop'), {
+        'index.html': SHOP_PAGE,
+        'css/main.css': SHOP_CSS,
+        'js/app.js': 'console.log(1);\n',
+        'img/a.png': b'a' * 100,
+        'img/b.png': b'b' * 200,
+        'img/bg.jpg': b'c' * 300,
+        'img/banner.jpg': b'd' * 400,
+        'img/card.jpg': b'e' * 500,
+        'img/unused.png': b'f' * 600,
+        'vendor/logo.svg': '<svg/>',
+        'fonts/x.woff2': b'g' * 50,
+    })
+    write_files(str(tmp_path / 'blog'), {
+        'home.html': '<html><body><p>hi</p></body></html>',
+        'home-editable.html': '<html><body><script id="editor-script"></script></body></html>',
+    })
+    write_files(str(tmp_path / 'landing'), {
+        'pages/index.html': '<html><head><style id="editor-styles"></style></head><body></body></html>',
+    })
+    os.makedirs(str(tmp_path / 'node_modules'))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = catalog.open_catalog(str(tmp_path / 'catalog.sqlite3'))
+    yield conn
+    conn.close()
+
+
+# 目录库中的模板记录 {模板名: 记录}
+def records(conn):
+    return {record['name']: record for record in catalog.find_templates(conn)}
+
+
+def test_scan_records_templates(root, conn):
+    updated, unchanged, removed = catalog.scan(conn, root)
+    assert (updated, unchanged, removed) == (['blog', 'landing', 'shop'], [], [])
+
+    shop = records(conn)['shop']
+    assert shop['entry_html'] == 'index.html'
+    assert shop['file_count'] == 11
+    assert (shop['css_count'], shop['js_count'], shop['image_count'], shop['font_count']) == (1, 1, 7, 1)
+    assert shop['image_bytes'] == 100 + 200 + 300 + 400 + 500 + 600 + len('<svg/>')
+    # 页面引用的文件：入口、样式表、脚本、图片、CSS中的背景图，以及按文件名匹配的远程资源副本
+    page_files = [SHOP_PAGE, SHOP_CSS, 'console.log(1);\n', '<svg/>']
+    assert shop['page_bytes'] == sum(len(f.encode('utf-8')) for f in page_files) + 100 + 200 + 300 + 400 + 500
+    assert shop['img_tags'] == 4
+    # 只有一张图片的轮播图候选不算
+    assert shop['carousels'] == [{'selector': 'div#hero.swiper', 'images': 2}]
+    assert sorted(b['url'] for b in shop['backgrounds']) == ['../img/card.jpg', 'img/banner.jpg', 'img/bg.jpg']
+    assert shop['editor_payload'] == 'none'
+
+    blog = records(conn)['blog']
+    assert blog['entry_html'] == 'home.html'
+    assert (blog['editor_payload'], blog['editable_html']) == ('editable-copy', 'home-editable.html')
+    assert records(conn)['landing']['editor_payload'] == 'instrumented'
+    assert records(conn)['landing']['entry_html'] == os.path.join('pages', 'index.html')
+
+
+def test_find_templates_filters(root, conn):
+    catalog.scan(conn, root)
+    assert [r['name'] for r in catalog.find_templates(conn, carousel=True)] == ['shop']
+    assert [r['name'] for r in catalog.find_templates(conn, background=True)] == ['shop']
+    assert [r['name'] for r in catalog.find_templates(conn, payload='instrumented')] == ['landing']
+    assert [r['name'] for r in catalog.find_templates(conn, min_bytes=1000)] == ['shop']
+
+
+def test_rescan_skips_unchanged_files_and_templates(root, conn, monkeypatch):
+    catalog.scan(conn, root)
+    hashed = []
+    analyzed = []
+    file_sha1 = catalog.file_sha1
+    analyze_template = catalog.analyze_template
+    monkeypatch.setattr(catalog, 'file_sha1', lambda path: hashed.append(path) or file_sha1(path))
+    monkeypatch.setattr(catalog, 'analyze_template',
+                        lambda name, *args: analyzed.append(name) or analyze_template(name, *args))
+
+    # 没有变化：不重新计算哈希，也不重新解析
+    assert catalog.scan(conn, root) == ([], ['blog', 'landing', 'shop'], [])
+    assert hashed == [] and analyzed == []
+
+    # 只改了mtime：重新计算这个文件的哈希，内容没变，模板不重新解析
+    css = os.path.join(root, 'shop', 'css', 'main.css')
+    st = os.stat(css)
+    os.utime(css, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert catalog.scan(conn, root) == ([], ['blog', 'landing', 'shop'], [])
+    assert hashed == [css] and analyzed == []
+
+    # 内容变化：只重新解析这个模板
+    with open(css, 'a', encoding='utf-8') as f:
+        f.write('.more { background: url(../img/unused.png) }\n')
+    assert catalog.scan(conn, root)[0] == ['shop']
+    assert analyzed == ['shop']
+    assert records(conn)['shop']['background_count'] == 4
+
+    # --force 重新计算所有哈希并重新解析所有模板
+    hashed.clear()
+    assert catalog.scan(conn, root, force=True)[0] == ['blog', 'landing', 'shop']
+    assert len(hashed) == 14
+
+
+def test_rescan_removes_deleted_templates(root, conn):
+    catalog.scan(conn, root)
+    for dirpath, _, filenames in os.walk(os.path.join(root, 'blog'), topdown=False):
+        for filename in filenames:
+            os.remove(os.path.join(dirpath, filename))
+        os.rmdir(dirpath)
+    assert catalog.scan(conn, root) == ([], ['landing', 'shop'], ['blog'])
+    assert sorted(records(conn)) == ['landing', 'shop']
+    assert conn.execute("SELECT COUNT(*) FROM files WHERE template = 'blog'").fetchone()[0] == 0